@@ -0,0 +1,171 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PREFIX = "/api/v3"
+
+
+class FakeMEXCServer:
+    """Локальный HTTP-сервер с подмножеством REST API MEXC для бенчмарков.
+
+    latency - задержка каждого ответа в секундах, error_rate - доля ответов
+    500, rate_limit_rate - доля ответов 429. Счётчик requests хранит число
+    запросов по эндпоинтам. Размещённые ордера остаются открытыми (NEW),
+    пока их не отменят.
+    """
+
+    def __init__(self, prices, balances=None, latency=0.0, error_rate=0.0, rate_limit_rate=0.0,
+                 host="127.0.0.1", port=0, seed=1):
+        self.prices = dict(prices)
+        self.balances = balances or {"USDT": {"free": "100000", "locked": "0"}}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.requests = Counter()
+        self._rng = random.Random(seed)
+        self._order_id = 0
+        self.orders = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{PREFIX}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-mexc", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _new_order(self, params):
+        """Запоминает размещённый ордер; ответ в формате POST /order"""
+        with self._lock:
+            self._order_id += 1
+            order = {
+                "orderId": f"FAKE{self._order_id}",
+                "symbol": params.get("symbol", ""),
+                "side": params.get("side"),
+                "type": params.get("type"),
+                "price": str(params.get("price", "0")),
+                "origQty": str(params.get("quantity", "0")),
+                "executedQty": "0",
+                "cummulativeQuoteQty": "0",
+                "status": "NEW",
+            }
+            self.orders[order["orderId"]] = order
+            return dict(order)
+
+    def _fault(self):
+        """Случайный сбой: код ответа или None"""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    def _route(self, method, path, query):
+        """Ответ (код, тело) по эндпоинту"""
+        if method == "GET" and path == "/ticker/price":
+            if "symbol" in query:
+                symbol = query["symbol"][0]
+                return 200, {"symbol": symbol, "price": str(self.prices.get(symbol, 0))}
+            return 200, [{"symbol": symbol, "price": str(price)} for symbol, price in self.prices.items()]
+        if method == "GET" and path == "/account":
+            return 200, {"balances": [{"asset": asset, **values} for asset, values in self.balances.items()]}
+        if method == "GET" and path == "/exchangeInfo":
+            return 200, {"symbols": [
+                {"symbol": symbol, "quotePrecision": 8, "baseAssetPrecision": 6} for symbol in self.prices
+            ]}
+        if method == "POST" and path == "/order":
+            return 200, self._new_order({key: values[0] for key, values in query.items()})
+        if method == "POST" and path == "/batchOrders":
+            orders = json.loads(query.get("batchOrders", ["[]"])[0])
+            return 200, [self._new_order(order) for order in orders]
+        if path == "/order" and method in ("GET", "DELETE"):
+            with self._lock:
+                order = self.orders.get(query.get("orderId", [""])[0])
+                if order is None:
+                    return 400, {"code": -2013, "msg": "Order does not exist."}
+                if method == "DELETE":
+                    order["status"] = "CANCELED"
+                return 200, dict(order)
+        if method == "GET" and path == "/openOrders":
+            symbol = query.get("symbol", [""])[0]
+            with self._lock:
+                return 200, [
+                    dict(order) for order in self.orders.values()
+                    if order["symbol"] == symbol and order["status"] == "NEW"
+                ]
+        if method == "GET" and path == "/myTrades":
+            return 200, []
+        if method == "POST" and path == "/userDataStream":
+            return 200, {"listenKey": "fake-listen-key"}
+        if method == "PUT" and path == "/userDataStream":
+            return 200, {}
+        return 404, {"code": 404, "msg": f"{method} {path} не поддерживается"}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self, method):
+                parsed = urlparse(self.path)
+                path = parsed.path[len(PREFIX):] if parsed.path.startswith(PREFIX) else parsed.path
+                query = parse_qs(parsed.query)
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    query.update(parse_qs(self.rfile.read(length).decode()))
+                server.requests[f"{method} {path}"] += 1
+
+                if server.latency:
+                    time.sleep(server.latency)
+                fault = server._fault()
+                if fault is not None:
+                    status, body = fault, {"code": fault, "msg": "Сбой, заданный бенчмарком"}
+                else:
+                    status, body = server._route(method, path, query)
+
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_PUT(self):
+                self._serve("PUT")
+
+            def do_DELETE(self):
+                self._serve("DELETE")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,193 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from benchmarks.fake_mexc import FakeMEXCServer
+from benchmarks.workbook_generator import generate
+from core.state_store import state_path
+
+
+def measure(fn, repeat, setup=None):
+    """Время выполнения fn в секундах для каждого повтора; setup не учитывается"""
+    runs = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        fn(state) if setup else fn()
+        runs.append(time.perf_counter() - started)
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.mean(runs),
+        "max": max(runs),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_keys(directory):
+    """Зашифрованные ключи API для полного прогона main(); None без cryptography"""
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        return None
+    key = Fernet.generate_key()
+    key_path = os.path.join(directory, "secret.key")
+    api_keys_path = os.path.join(directory, "api_keys.json")
+    with open(key_path, "wb") as f:
+        f.write(key)
+    with open(api_keys_path, "wb") as f:
+        f.write(Fernet(key).encrypt(json.dumps({"api_key": "bench", "secret_key": "bench"}).encode()))
+    return api_keys_path, key_path
+
+
+def run(rows, tickers, repeat, latency, error_rate, rate_limit_rate, include_main=True):
+    from core.balance_calculator import BalanceCalculator
+    from core.excel_manager import ExcelManager
+    from core.signal_processor import SignalProcessor
+    from strategies.allocation import FundAllocator
+    from utils.api_client import MEXCClient
+    from utils.metrics import metrics
+    from utils.price_cache import PriceCache, price_cache
+
+    workdir = tempfile.mkdtemp(prefix="mexc-bench-")
+    source = os.path.join(workdir, "source.xlsx")
+    prices = generate(source, rows=rows, tickers=tickers)
+    coins = list(prices)[:50]
+    balances = {"USDT": {"free": "100000", "locked": "250"}}
+    balances.update({symbol[:-4]: {"free": "1.5", "locked": "0"} for symbol in coins})
+
+    # Побочные файлы бота - во временном каталоге
+    config.SYMBOL_FILTERS_PATH = os.path.join(workdir, "exchange_info.json")
+    config.HISTORY_DIR = os.path.join(workdir, "history")
+    config.METRICS_PATH = os.path.join(workdir, "metrics.prom")
+    config.EXCEL_BACKGROUND_SAVE = False
+
+    def fresh_copy():
+        path = os.path.join(workdir, "bench.xlsx")
+        shutil.copyfile(source, path)
+        # Снимок и хранилище состояния прошлого повтора не должны влиять на замер
+        state = state_path(path, config.SHEET_NAME)
+        for side_file in (path + ".cache.sqlite", state, state + "-wal", state + "-shm"):
+            if os.path.exists(side_file):
+                os.remove(side_file)
+        return path
+
+    scenarios = {}
+    server = FakeMEXCServer(
+        prices, balances=balances, latency=latency, error_rate=error_rate, rate_limit_rate=rate_limit_rate
+    ).start()
+    try:
+        config.WORKBOOK_CACHE_ENABLED = False
+        scenarios["excel_load"] = measure(lambda path: ExcelManager(path), repeat, setup=fresh_copy)
+
+        config.WORKBOOK_CACHE_ENABLED = True
+        path = fresh_copy()
+        ExcelManager(path)
+        scenarios["excel_load_snapshot"] = measure(lambda: ExcelManager(path), repeat)
+
+        def edited_workbook():
+            excel = ExcelManager(fresh_copy())
+            excel.write_column("I", sorted(excel.records)[:1000], [1.0] * 1000)
+            return excel
+        scenarios["excel_save"] = measure(lambda excel: excel.save(background=False), repeat, setup=edited_workbook)
+
+        excel = ExcelManager(fresh_copy())
+        processor = SignalProcessor(excel)
+        scenarios["get_active_signals"] = measure(processor.get_active_signals, repeat)
+
+        signals = processor.get_active_signals()
+        scenarios["calculate_allocations"] = measure(
+            lambda: FundAllocator.calculate_allocations(signals, 100000), repeat
+        )
+
+        def calculator():
+            client = MEXCClient(base_url=server.url, api_key="bench", secret_key="bench", price_cache=PriceCache())
+            return BalanceCalculator(client)
+        scenarios["calculate_total_deposit"] = measure(
+            lambda portfolio: portfolio.calculate_total_deposit(), repeat, setup=calculator
+        )
+
+        keys = write_keys(workdir) if include_main else None
+        if keys:
+            import main
+
+            config.API_BASE_URL = server.url
+            config.API_KEYS_PATH, config.SECRET_KEY_PATH = keys
+            config.DRY_RUN = True
+
+            def pipeline_setup():
+                config.EXCEL_PATH = fresh_copy()
+                price_cache.invalidate()
+            scenarios["main_pipeline"] = measure(lambda _: main.main(), repeat, setup=pipeline_setup)
+        else:
+            scenarios["main_pipeline"] = {"skipped": "нет cryptography для ключей API"}
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {
+            "rows": rows, "tickers": tickers, "repeat": repeat,
+            "latency": latency, "error_rate": error_rate, "rate_limit_rate": rate_limit_rate,
+        },
+        "requests": dict(server.requests),
+        "scenarios": scenarios,
+        "metrics": metrics.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки бота на синтетической книге и фейковом MEXC")
+    parser.add_argument("--rows", type=int, default=1000, help="Строк сигналов (1000-100000)")
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа сервера, секунд")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Доля ответов 429")
+    parser.add_argument("--no-main", action="store_true", help="Без полного прогона main()")
+    parser.add_argument("--output", help="Файл для JSON результатов; по умолчанию stdout")
+    args = parser.parse_args()
+
+    # Логи бота не должны влиять на замеры
+    logging.disable(logging.WARNING)
+    results = run(
+        args.rows, args.tickers, args.repeat, args.latency, args.error_rate, args.rate_limit_rate,
+        include_main=not args.no_main
+    )
+    logging.disable(logging.NOTSET)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import random
+from datetime import datetime, timedelta
+import openpyxl
+import config
+
+# Доли статусов в колонке B: активные, закрытые, пустые и с опечатками регистра
+STATUS_WEIGHTS = (
+    ("в работе", 0.35),
+    ("В работе ", 0.05),
+    ("active", 0.02),
+    ("закрыта", 0.40),
+    ("отменена", 0.08),
+    (None, 0.10),
+)
+QUOTE = "USDT"
+HEADER_ROWS = 5
+
+
+def make_tickers(count, rng):
+    """Тикеры и базовые цены: несколько дорогих монет и длинный хвост дешёвых"""
+    tickers = {}
+    for i in range(count):
+        price = 10 ** rng.uniform(-4, 4.8)
+        tickers[f"T{i:04d}{QUOTE}"] = round(price, 8)
+    return tickers
+
+
+def generate(path, rows=1000, tickers=200, seed=1):
+    """Создаёт книгу с листом сигналов SHEET_NAME; возвращает словарь тикер -> цена"""
+    rng = random.Random(seed)
+    prices = make_tickers(tickers, rng)
+    symbols = list(prices)
+    # Частота тикеров по закону Ципфа: у популярных монет по многу сигналов
+    weights = [1 / (rank + 1) for rank in range(len(symbols))]
+    statuses = [status for status, _ in STATUS_WEIGHTS]
+    status_weights = [weight for _, weight in STATUS_WEIGHTS]
+    started = datetime(2024, 1, 1)
+
+    wb = openpyxl.Workbook(write_only=True)
+    sheet = wb.create_sheet(config.SHEET_NAME)
+    for i in range(HEADER_ROWS):
+        sheet.append(["Сигналы" if i == 0 else None])
+    for i in range(rows):
+        symbol = rng.choices(symbols, weights)[0]
+        price = prices[symbol]
+        entry = round(price * rng.uniform(0.9, 1.0), 8)
+        exit_ = round(entry * rng.uniform(1.02, 1.3), 8)
+        status = rng.choices(statuses, status_weights)[0]
+        closed = status in ("закрыта", "отменена")
+        row = [
+            started + timedelta(minutes=17 * i),  # A дата
+            status,  # B статус
+            symbol,  # C тикер
+            price,  # D текущая цена
+            None,  # E
+            entry,  # F вход
+            exit_,  # G выход
+            None,  # H
+            round(rng.uniform(5, 200), 2),  # I план
+        ]
+        if closed:
+            # Исполненные сигналы с заполненными колонками ордера L-V
+            quantity = round(row[8] / entry, 6)
+            filled = started + timedelta(minutes=17 * i + 5)
+            row += [None, None, "Купить", filled, entry, quantity, entry * quantity, "Закрыта", "Спот",
+                    filled, exit_, quantity, exit_ * quantity]
+        sheet.append(row)
+    wb.save(path)
+    return prices
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Синтетическая книга сигналов для бенчмарков")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    generate(args.path, args.rows, args.tickers, args.seed)
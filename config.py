@@ -1,13 +1,112 @@
-# Режим работы
-DRY_RUN = True  # Тестовый режим без реальных ордеров
-
-# Минимальные балансы
-MIN_BALANCE = 10.0  # Минимальный USDT для торговли
-MIN_EQUIVALENT = 0.0  # Минимальный эквивалент в USDT
-
-# Настройки API
-API_TIMEOUT = 10  # Таймаут запросов в секундах
-
-# Настройки Decimal
-DECIMAL_PRECISION = 8  # Количество знаков после запятой
+import os
+
+# Режим работы
+DRY_RUN = True  # Тестовый режим без реальных ордеров
+PAPER_TRADING = True  # В тестовом режиме исполнять ордера по рыночным ценам (core/paper_exchange.py)
+
+# Пути по умолчанию (один аккаунт)
+BASE_DIR = r"D:\mexc_trading_bot"  # Каталог установки бота
+CONFIG_DIR = os.path.join(BASE_DIR, "config")  # Ключи API и ключ шифрования
+DATA_DIR = os.path.join(BASE_DIR, "data")  # Книги Excel
+EXCEL_PATH = os.path.join(DATA_DIR, "Fiba.xlsx")  # Рабочая книга сигналов
+API_KEYS_PATH = os.path.join(CONFIG_DIR, "api_keys.json")  # Зашифрованные ключи API
+SECRET_KEY_PATH = os.path.join(CONFIG_DIR, "secret.key")  # Ключ шифрования Fernet
+
+# Несколько книг и аккаунтов (python main.py --manifest manifest.json)
+MANIFEST_WORKERS = 4  # Процессов в пуле
+MANIFEST_PRICE_TTL = 120  # Время жизни общего снимка цен в процессах пула, секунд
+
+# Минимальные балансы
+MIN_BALANCE = 10.0  # Минимальный USDT для торговли
+MIN_EQUIVALENT = 0.0  # Минимальный эквивалент в USDT
+
+# Настройки API
+API_BASE_URL = "https://api.mexc.com/api/v3"  # Адрес REST API
+API_TIMEOUT = 10  # Таймаут запросов в секундах
+HTTP_POOL_SIZE = 10  # Размер пула постоянных соединений
+HTTP_MAX_RETRIES = 3  # Повторов при 429/5xx и сбоях соединения
+HTTP_BACKOFF_BASE = 0.5  # Базовая пауза экспоненциального отката в секундах
+HTTP_BACKOFF_MAX = 8.0  # Максимальная пауза отката в секундах
+LATENCY_HISTORY_SIZE = 1000  # Сколько последних замеров хранить на эндпоинт
+# Бюджет веса запросов (MEXC: 500 на эндпоинт за 10 секунд)
+API_WEIGHT_CAPACITY = 500  # Общий бюджет веса ключа
+API_WEIGHT_REFILL = 50  # Пополнение общего бюджета в секунду
+API_ENDPOINT_WEIGHT_CAPACITY = 500  # Бюджет одного эндпоинта (пополняется пропорционально)
+# Доля общего бюджета, которую полоса не может тратить (оставляется полосам выше)
+API_LANE_RESERVES = {"orders": 0.0, "cancels": 0.1, "account": 0.2, "market": 0.4}
+API_SCHEDULER_MIN_WAIT = 0.01  # Минимальная пауза ожидания веса в секундах
+ORDER_CONCURRENCY = 10  # Одновременных запросов при размещении ордеров
+BATCH_ORDERS = True  # Отправлять ордера прогона пакетами через /batchOrders
+BATCH_ORDER_MAX_SIZE = 20  # Максимум ордеров одного символа в пакете MEXC
+PRICE_CACHE_TTL = 5  # Время жизни снимка цен в секундах
+
+# Фильтры символов (exchangeInfo)
+SYMBOL_FILTERS_PATH = os.path.join("data", "exchange_info.json")  # Кэш фильтров на диске
+SYMBOL_FILTERS_TTL = 86400  # Секунд до обновления фильтров
+SYMBOL_FILTERS_RETRY = 60  # Пауза перед повторной загрузкой после ошибки
+
+# Локальное состояние аккаунта
+ACCOUNT_RECONCILE_INTERVAL = 300  # Секунд между сверками балансов с биржей
+USER_DATA_STREAM_ENABLED = True  # Получать изменения балансов из приватного потока (демон)
+LISTEN_KEY_KEEPALIVE = 1800  # Секунд между продлениями ключа приватного потока
+
+# Режим демона (python main.py --daemon)
+PRICE_STREAM_URL = "wss://wbs.mexc.com/ws"  # Публичный websocket или локальная заглушка
+PRICE_STREAM_CHANNEL = "spot@public.deals.v3.api@{symbol}"  # Канал сделок по символу
+PRICE_STREAM_PING_INTERVAL = 20  # Секунд тишины до PING
+DAEMON_IDLE_TIMEOUT = 60  # Секунд ожидания срабатывания до следующей проверки
+
+# Снимок книги Excel
+WORKBOOK_CACHE_ENABLED = True  # Читать лист из SQLite-снимка, если книга не менялась
+WORKBOOK_CACHE_VERIFY_HASH = True  # Сверять хэш содержимого, а не только mtime
+EXCEL_BACKGROUND_SAVE = False  # Сохранять книгу в фоновом потоке
+
+# Хранилище состояния ордеров (core/state_store.py)
+STATE_STORE_ENABLED = True  # Ордера и исполнения - в SQLite рядом с книгой (<книга>.<лист>.state.sqlite)
+STATE_STORE_SYNCHRONOUS = "NORMAL"  # PRAGMA synchronous: NORMAL (WAL) или FULL
+
+# Сверка ордеров (core/order_reconciler.py)
+RECONCILE_TRADES_LIMIT = 100  # Сделок в одном запросе /myTrades (максимум MEXC)
+RECONCILE_INTERVAL = 60  # Секунд между сверками в режиме демона
+
+# Распределение средств
+DEPOSIT_PERCENTAGE = 0.1  # Доля депозита на один тикер
+# Коэффициенты по числу сигналов на тикер; для размеров вне таблицы - поровну
+ALLOCATION_RATIOS = {
+    1: [1],
+    2: [0.5, 0.5],
+    3: [0.2, 0.3, 0.5],
+}
+TICKER_ALLOCATION_RATIOS = {}  # Свои коэффициенты тикера по размеру группы, остальные - из общей таблицы: {"BTCUSDT": {2: [0.4, 0.6]}}
+MAX_TOTAL_EXPOSURE = None  # Максимальная доля депозита под все сигналы; None - без ограничения
+
+# История цен (core/history_store.py)
+HISTORY_DIR = os.path.join("data", "history")  # Каталог файлов истории
+HISTORY_KLINE_LIMIT = 1000  # Свечей в одном запросе /klines
+HISTORY_SYNC_DAYS = 30  # Глубина первой загрузки свечей, дней
+HISTORY_RECORD_TICKS = True  # Сохранять цены потока в режиме демона
+
+# Источник сигналов (core/signal_sources.py)
+SHEET_NAME = "Litvinoff"  # Лист сигналов в книге Excel
+SIGNAL_SOURCE = None  # Файл .csv/.jsonl/.sqlite/.xlsx с сигналами; None - лист рабочей книги
+SIGNAL_POLL_INTERVAL = 1.0  # Пауза между проверками файла в режиме слежения, секунд
+SIGNAL_FETCH_SIZE = 1000  # Строк SQLite за одну выборку
+
+# Бэктест (strategies/backtest.py)
+BACKTEST_BLOCK_SIZE = 4096  # Свечей в блоке индекса минимумов/максимумов
+
+# Метрики (utils/metrics.py)
+METRICS_FORMAT = "prometheus"  # prometheus, json или None - без экспорта
+METRICS_PATH = os.path.join("logs", "metrics.prom")  # Файл экспорта метрик
+METRICS_EXPORT_INTERVAL = 60  # Период экспорта в режиме демона, секунд
+METRICS_PREFIX = "mexc_bot"  # Префикс имён метрик
+
+# Логирование (utils/logger.py)
+LOG_DIR = "logs"  # Каталог файлов лога
+LOG_LEVEL = "INFO"  # Уровень корневого логгера
+LOG_JSON = False  # Дополнительно писать trading_YYYYMMDD.jsonl (JSON по строке)
+LOG_DEBUG_RATE = 10  # DEBUG-сообщений в секунду с одной строки кода; 0 - без ограничения
+
+# Фиксированная точка (utils/fixed_point.py)
+DECIMAL_PRECISION = 8  # Количество знаков после запятой
 QUANTIZE_FORMAT = '0.00000000'  # Формат округления
\ No newline at end of file
@@ -0,0 +1,151 @@
+import threading
+import time
+from utils.exceptions import InsufficientBalanceError
+from utils.fixed_point import FixedPoint
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+QUOTE_ASSET = "USDT"
+# Канал приватного потока MEXC с абсолютными значениями балансов
+ACCOUNT_CHANNEL = "spot@private.account.v3.api"
+
+
+class AccountState:
+    """Локальная копия балансов аккаунта.
+
+    Балансы загружаются один раз и дальше обновляются событиями
+    приватного потока и собственными резервами под ордера. Средства под ордер
+    резервируются локально, поэтому проверка достаточности баланса - это
+    поиск в памяти. Раз в ACCOUNT_RECONCILE_INTERVAL секунд состояние
+    сверяется с биржей.
+    """
+
+    def __init__(self, api_client, reconcile_interval=None, clock=time.monotonic):
+        self.api = api_client
+        self.reconcile_interval = config.ACCOUNT_RECONCILE_INTERVAL if reconcile_interval is None else reconcile_interval
+        self._clock = clock
+        self._balances = {}
+        self._reservations = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+        self.listen_key = None
+        self._listen_key_at = None
+        self._stream = None
+
+    def load(self):
+        """Загружает балансы с биржи; незавершённые резервы сохраняются"""
+        raw = self.api.get_account_balance()
+        if not raw:
+            raise ConnectionError("Не удалось получить баланс аккаунта")
+        with self._lock:
+            self._balances = {
+                asset: {
+                    'free': FixedPoint.from_value(values.get('free', '0')),
+                    'locked': FixedPoint.from_value(values.get('locked', '0'))
+                }
+                for asset, values in raw.items()
+            }
+            self._loaded_at = self._clock()
+        logger.debug(f"Балансы загружены: {len(raw)} активов")
+        return raw
+
+    def reconcile_if_due(self):
+        """Сверка с биржей, если с прошлой загрузки прошёл интервал"""
+        if self._loaded_at is None or self._clock() - self._loaded_at >= self.reconcile_interval:
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning(f"Ошибка сверки балансов: {str(e)}")
+        self.keepalive_if_due()
+
+    def keepalive_if_due(self):
+        """Продление ключа приватного потока; демон вызывает и между проходами"""
+        if self.listen_key and self._clock() - self._listen_key_at >= config.LISTEN_KEY_KEEPALIVE:
+            try:
+                self.api.keepalive_listen_key(self.listen_key)
+                self._listen_key_at = self._clock()
+            except Exception as e:
+                logger.warning(f"Ошибка продления ключа потока: {str(e)}")
+
+    def get_balances(self):
+        """Балансы в формате MEXCClient.get_account_balance"""
+        self.reconcile_if_due()
+        with self._lock:
+            return {
+                asset: {'free': str(values['free']), 'locked': str(values['locked'])}
+                for asset, values in self._balances.items()
+            }
+
+    def _asset(self, asset):
+        return self._balances.setdefault(asset, {'free': FixedPoint(), 'locked': FixedPoint()})
+
+    def available(self, asset=QUOTE_ASSET):
+        """Свободный баланс за вычетом локальных резервов"""
+        self.reconcile_if_due()
+        with self._lock:
+            free = self._balances.get(asset, {}).get('free', FixedPoint())
+            reserved = sum(
+                (amount for key_asset, amount in self._reservations.values() if key_asset == asset),
+                FixedPoint()
+            )
+            return free - reserved
+
+    def reserve(self, key, asset, amount):
+        """Резервирует средства под ордер или бросает InsufficientBalanceError"""
+        amount = FixedPoint.from_value(amount)
+        with self._lock:
+            available = self.available(asset)
+            if available < amount:
+                raise InsufficientBalanceError(
+                    f"Недостаточно {asset}. Нужно: {amount}, есть: {available}"
+                )
+            self._reservations[key] = (asset, amount)
+        return amount
+
+    def commit(self, key):
+        """Ордер принят биржей: резерв переходит в заблокированные средства"""
+        with self._lock:
+            reservation = self._reservations.pop(key, None)
+            if reservation:
+                asset, amount = reservation
+                balance = self._asset(asset)
+                balance['free'] -= amount
+                balance['locked'] += amount
+
+    def release(self, key):
+        """Ордер не размещён: резерв снимается"""
+        with self._lock:
+            self._reservations.pop(key, None)
+
+    def apply_balance_update(self, asset, free, locked):
+        """Абсолютные значения баланса из события биржи"""
+        with self._lock:
+            self._balances[asset] = {
+                'free': FixedPoint.from_value(free),
+                'locked': FixedPoint.from_value(locked)
+            }
+
+    def handle_stream_message(self, data):
+        """Разбор события приватного потока MEXC"""
+        payload = data.get("d") if isinstance(data, dict) else None
+        if not isinstance(payload, dict):
+            return
+        if data.get("c") == ACCOUNT_CHANNEL and "a" in payload:
+            self.apply_balance_update(payload["a"], payload.get("f", "0"), payload.get("l", "0"))
+
+    def start_user_stream(self):
+        """Запускает приватный поток событий аккаунта"""
+        from utils.price_stream import UserDataStream
+
+        self.listen_key = self.api.create_listen_key()
+        self._listen_key_at = self._clock()
+        url = f"{config.PRICE_STREAM_URL}?listenKey={self.listen_key}"
+        self._stream = UserDataStream([ACCOUNT_CHANNEL], self.handle_stream_message, url=url)
+        self._stream.start()
+
+    def stop_user_stream(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
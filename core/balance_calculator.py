@@ -1,86 +1,100 @@
-from utils.logger import setup_logger
-from decimal import Decimal, InvalidOperation
-from decimal import Decimal, getcontext
-from config import DECIMAL_PRECISION, QUANTIZE_FORMAT
-import config
-
-# Установка точности вычислений
-getcontext().prec = DECIMAL_PRECISION
-logger = setup_logger()
-
-class BalanceCalculator:
-	
-	@staticmethod
-	def calculate_balance(transactions):
-		balance = Decimal('0')
-		for tx in transactions:
-			amount = Decimal(str(tx['amount'])).quantize(Decimal(QUANTIZE_FORMAT))
-			if tx['type'] == 'deposit':
-				balance += amount
-			elif tx['type'] == 'withdrawal':
-				balance -= amount
-		return balance.quantize(Decimal(QUANTIZE_FORMAT))
-		
-	@staticmethod
-	def calculate_asset_balance(transactions, asset):
-		asset_balance = Decimal('0')
-		for tx in transactions:
-			if tx['asset'] == asset:
-				amount = Decimal(str(tx['amount'])).quantize(Decimal(QUANTIZE_FORMAT))
-				if tx['type'] == 'deposit':
-					asset_balance += amount
-				elif tx['type'] == 'withdrawal':
-					asset_balance -= amount
-		return asset_balance.quantize(Decimal(QUANTIZE_FORMAT))
-		
-	def __init__(self, api_client):
-		self.api = api_client
-	
-	def calculate_total_deposit(self):
-		"""Расчет депозита с правильной обработкой структуры баланса"""
-		try:
-			account = self.api.get_account_balance()
-			
-			# Инициализация
-			usdt_free = Decimal('0')
-			usdt_locked = Decimal('0')
-			equivalent = Decimal('0')
-			
-			# Обработка USDT баланса
-			if 'USDT' in account:
-				usdt_free = Decimal(account['USDT'].get('free', '0'))
-				usdt_locked = Decimal(account['USDT'].get('locked', '0'))
-			
-			# Обработка других монет
-			for coin, balance in account.items():
-				if coin == 'USDT':
-					continue
-					
-				try:
-					free = Decimal(balance.get('free', '0'))
-					locked = Decimal(balance.get('locked', '0'))
-					amount = free + locked
-					
-					if amount > 0:
-						prices = self.api.get_prices([f"{coin}USDT"])
-						if prices and f"{coin}USDT" in prices:
-							equivalent += amount * Decimal(str(prices[f"{coin}USDT"]))
-				except Exception as e:
-					logger.warning(f"Ошибка обработки {coin}: {str(e)}")
-					continue
-			
-			return {
-				"total": float(usdt_free + usdt_locked + equivalent),
-				"free_usdt": float(usdt_free),
-				"locked_usdt": float(usdt_locked),
-				"equivalent": float(equivalent)
-			}
-			
-		except Exception as e:
-			logger.error(f"Ошибка расчета депозита: {str(e)}")
-			return {
-				"total": 0.0,
-				"free_usdt": 0.0,
-				"locked_usdt": 0.0,
-				"equivalent": 0.0
+from utils.logger import setup_logger
+from utils.fixed_point import FixedPoint, to_units, from_units
+from core.ledger import Ledger, TX_SIGNS
+import config
+
+logger = setup_logger()
+
+class BalanceCalculator:
+	
+	@staticmethod
+	def calculate_balance(transactions):
+		"""Баланс по транзакциям, суммирование в целых единицах 1e-8"""
+		balance = 0
+		for tx in transactions:
+			sign = TX_SIGNS.get(tx['type'])
+			if sign:
+				balance += sign * to_units(tx['amount'])
+		return from_units(balance)
+		
+	@staticmethod
+	def calculate_asset_balance(transactions, asset):
+		"""Баланс актива по транзакциям за один проход (для повторных запросов - Ledger)"""
+		asset_balance = 0
+		for tx in transactions:
+			if tx['asset'] == asset:
+				sign = TX_SIGNS.get(tx['type'])
+				if sign:
+					asset_balance += sign * to_units(tx['amount'])
+		return from_units(asset_balance)
+		
+	def __init__(self, api_client, account_state=None):
+		self.api = api_client
+		self.account = account_state
+		self.ledger = Ledger()
+	
+	def ingest_transactions(self, transactions):
+		"""Добавляет новые транзакции в журнал без пересчёта с нуля"""
+		self.ledger.extend(transactions)
+	
+	def get_asset_balance(self, asset, timestamp=None):
+		"""Баланс актива по журналу: текущий или на момент timestamp"""
+		if timestamp is None:
+			return self.ledger.balance(asset)
+		return self.ledger.balance_at(asset, timestamp)
+	
+	def calculate_total_deposit(self):
+		"""Расчет депозита с правильной обработкой структуры баланса"""
+		try:
+			# Локальное состояние аккаунта избавляет от лишнего запроса /account
+			account = self.account.get_balances() if self.account else self.api.get_account_balance()
+			
+			# Инициализация
+			usdt_free = FixedPoint()
+			usdt_locked = FixedPoint()
+			equivalent = FixedPoint()
+			
+			# Обработка USDT баланса
+			if 'USDT' in account:
+				usdt_free = FixedPoint.from_value(account['USDT'].get('free', '0'))
+				usdt_locked = FixedPoint.from_value(account['USDT'].get('locked', '0'))
+			
+			# Сбор ненулевых монет
+			amounts = {}
+			for coin, balance in account.items():
+				if coin == 'USDT':
+					continue
+					
+				try:
+					free = FixedPoint.from_value(balance.get('free', '0'))
+					locked = FixedPoint.from_value(balance.get('locked', '0'))
+					amount = free + locked
+					
+					if amount > 0:
+						amounts[coin] = amount
+				except Exception as e:
+					logger.warning(f"Ошибка обработки {coin}: {str(e)}")
+					continue
+			
+			# Оценка всех монет по одному снимку цен
+			prices = self.api.get_prices([f"{coin}USDT" for coin in amounts])
+			for coin, amount in amounts.items():
+				symbol = f"{coin}USDT"
+				if symbol in prices:
+					equivalent += amount * prices[symbol]
+			
+			return {
+				"total": float(usdt_free + usdt_locked + equivalent),
+				"free_usdt": float(usdt_free),
+				"locked_usdt": float(usdt_locked),
+				"equivalent": float(equivalent)
+			}
+			
+		except Exception as e:
+			logger.error(f"Ошибка расчета депозита: {str(e)}")
+			return {
+				"total": 0.0,
+				"free_usdt": 0.0,
+				"locked_usdt": 0.0,
+				"equivalent": 0.0
 			}
\ No newline at end of file
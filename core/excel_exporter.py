@@ -0,0 +1,82 @@
+from collections import defaultdict
+from utils.fixed_point import from_units
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+SIDE_LABELS = {"BUY": "Купить", "SELL": "Продать"}
+STATUS_LABELS = {"PARTIALLY_FILLED": "Частично", "PARTIALLY_CANCELED": "Частично", "CANCELED": "Отменена"}
+
+
+def order_label(order):
+    """Статус ордера для колонки Q: исполненный BUY открывает позицию, SELL - закрывает"""
+    if order["status"] in STATUS_LABELS:
+        return STATUS_LABELS[order["status"]]
+    if order["side"] == "SELL" and order["status"] == "FILLED":
+        return "Закрыта"
+    return "Открыта"
+
+
+class ExcelExporter:
+    """Выгрузка изменённых строк из StateStore в книгу.
+
+    Книга - представление состояния: за один вызов переносятся только
+    строки из таблицы changes, значения пишутся по колонкам пакетно,
+    а отметки снимаются после успешного сохранения книги.
+    """
+
+    def __init__(self, state_store, excel_manager):
+        self.state = state_store
+        self.excel = excel_manager
+
+    def row_values(self, state):
+        """Значения колонок книги по состоянию строки"""
+        values = {}
+        if state["signal_status"] is not None:
+            values["B"] = state["signal_status"]
+        order = state["order"]
+        if order is not None:
+            price = float(from_units(order["price_units"]))
+            quantity = float(from_units(order["quantity_units"]))
+            values.update({
+                "L": SIDE_LABELS.get(order["side"], order["side"]),
+                "M": order["created_at"],
+                "N": price,
+                "O": quantity,
+                "P": price * quantity,
+                "Q": order_label(order),
+                "R": "Спот",
+            })
+        fill = state["fill"]
+        if fill is not None:
+            quantity = from_units(fill["quantity_units"])
+            cost = from_units(fill["cost_units"])
+            values.update({
+                "S": fill["time"],
+                "T": float(cost / quantity),
+                "U": float(quantity),
+                "V": float(cost),
+            })
+        return values
+
+    def sync(self, save=True):
+        """Переносит изменённые строки в книгу; возвращает число строк"""
+        changes = self.state.pending_changes()
+        if changes:
+            columns = defaultdict(lambda: ([], []))
+            for row, state in self.state.row_states(sorted(changes)).items():
+                for column, value in self.row_values(state).items():
+                    rows, values = columns[column]
+                    rows.append(row)
+                    values.append(value)
+            for column, (rows, values) in sorted(columns.items()):
+                self.excel.write_column(column, rows, values)
+            logger.debug(f"Выгружено строк из хранилища состояния: {len(changes)}")
+        if not save:
+            return len(changes)
+
+        # Ошибка записи файла пробрасывается до снятия отметок: строки выгрузятся снова
+        self.excel.save(background=False)
+        if changes:
+            self.state.mark_exported(changes)
+        return len(changes)
@@ -1,75 +1,308 @@
-import openpyxl
-from openpyxl.utils import get_column_letter
-from datetime import datetime
-import os
-from utils.logger import setup_logger
-
-logger = setup_logger()
-
-class ExcelManager:
-    def __init__(self, file_path):
-        self.file_path = file_path
-        self._validate_file_path()
-        self.wb = openpyxl.load_workbook(file_path)
-        self.sheet = self.wb["Litvinoff"]
-        logger.info(f"Excel файл загружен: {file_path}")
-    
-    def _validate_file_path(self):
-        if not os.path.exists(self.file_path):
-            raise FileNotFoundError(f"Файл не найден: {self.file_path}")
-        if not self.file_path.endswith('.xlsx'):
-            raise ValueError("Файл должен быть в формате .xlsx")
-
-    def update_header(self, usdt_balance, deposit):
-        """Обновляет шапку с балансами"""
-        self.sheet["H1"] = float(usdt_balance)
-        self.sheet["H2"] = float(deposit)
-        logger.debug(f"Обновлены балансы: USDT={usdt_balance}, Депозит={deposit}")
-
-    def get_active_tickers(self):
-        """Получает список активных тикеров"""
-        active_tickers = set()
-        for row in range(6, self.sheet.max_row + 1):
-            status = self.sheet[f"B{row}"].value
-            if status == "в работе":
-                ticker = self.sheet[f"C{row}"].value
-                if ticker:
-                    active_tickers.add(ticker)
-        return list(active_tickers)
-
-    def update_prices(self, prices):
-        """Обновляет текущие цены"""
-        updated = 0
-        for row in range(6, self.sheet.max_row + 1):
-            ticker = self.sheet[f"C{row}"].value
-            status = self.sheet[f"B{row}"].value
-            if status == "в работе" and ticker in prices:
-                self.sheet[f"D{row}"] = float(prices[ticker])
-                updated += 1
-        logger.debug(f"Обновлено цен: {updated}")
-
-    def simulate_order(self, order_type, row, price, quantity):
-        """Симуляция ордера для тестового режима"""
-        if order_type == "BUY":
-            self.sheet[f"L{row}"] = "Купить"
-            self.sheet[f"Q{row}"] = "Открыта"
-            self.sheet[f"R{row}"] = "Спот"
-        elif order_type == "SELL":
-            self.sheet[f"L{row}"] = "Продать"
-            self.sheet[f"Q{row}"] = "Закрыта"
-        
-        self.sheet[f"M{row}"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.sheet[f"N{row}"] = float(price)
-        self.sheet[f"O{row}"] = float(quantity)
-        self.sheet[f"P{row}"] = float(price) * float(quantity)
-        self.sheet[f"S{row}"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.sheet[f"T{row}"] = float(price)
-        self.sheet[f"U{row}"] = float(quantity)
-        self.sheet[f"V{row}"] = float(price) * float(quantity)
-        
-        logger.info(f"[SIMULATED] Ордер {order_type} в строке {row}: {quantity}@{price}")
-
-    def save(self):
-        """Сохраняет изменения в файл"""
-        self.wb.save(self.file_path)
-        logger.debug("Файл Excel сохранён")
\ No newline at end of file
+import openpyxl
+from openpyxl.utils import get_column_letter
+from bisect import insort
+from collections import defaultdict
+from datetime import datetime
+import os
+import tempfile
+import threading
+from core.workbook_cache import WorkbookCache
+from utils.logger import setup_logger
+from utils.metrics import metrics
+import config
+
+logger = setup_logger()
+
+FIRST_DATA_ROW = 6  # Первая строка с сигналами
+INDEXED_COLUMNS = [get_column_letter(i) for i in range(1, 23)]  # Колонки A..V
+ACTIVE_STATUS = "в работе"
+
+
+def normalize_status(value):
+    """Приводит статус к виду, по которому ведётся индекс"""
+    return str(value).strip().lower()
+
+
+class ExcelManager:
+    def __init__(self, file_path, sheet_name=None):
+        self.file_path = file_path
+        self.sheet_name = sheet_name or config.SHEET_NAME
+        self._validate_file_path()
+        self._wb = None
+        self._sheet = None
+        self._pending = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._saving = False
+        self._save_thread = None
+        self.cache = WorkbookCache(file_path, self.sheet_name, INDEXED_COLUMNS) if config.WORKBOOK_CACHE_ENABLED else None
+
+        records = self.cache.load() if self.cache else None
+        if self.cache:
+            metrics.inc("cache_requests_total", cache="workbook", result="miss" if records is None else "hit")
+        if records is not None:
+            self._index_records(records)
+            logger.info(f"Excel файл загружен из снимка: {file_path}")
+        else:
+            self._load_workbook()
+            self._build_index()
+            if self.cache:
+                self.cache.store(self.records)
+            logger.info(f"Excel файл загружен: {file_path}")
+
+    @property
+    def wb(self):
+        if self._wb is None:
+            self._load_workbook()
+        return self._wb
+
+    @property
+    def sheet(self):
+        if self._sheet is None:
+            self._load_workbook()
+        return self._sheet
+
+    def _load_workbook(self):
+        """Полная загрузка книги openpyxl с применением отложенных записей"""
+        with self._lock:
+            self._wb = openpyxl.load_workbook(self.file_path)
+            self._sheet = self._wb[self.sheet_name]
+            self._apply_pending()
+
+    def _apply_pending(self):
+        """Переносит отложенные записи в лист"""
+        for (row, column), value in self._pending.items():
+            self._sheet[f"{column}{row}"] = value
+        self._pending.clear()
+
+    def _validate_file_path(self):
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"Файл не найден: {self.file_path}")
+        if not self.file_path.endswith('.xlsx'):
+            raise ValueError("Файл должен быть в формате .xlsx")
+
+    def _build_index(self):
+        """Строит индекс строк за один проход по листу"""
+        self.records = {}
+        self.status_rows = defaultdict(list)
+        self.ticker_rows = defaultdict(list)
+        rows = self.sheet.iter_rows(
+            min_row=FIRST_DATA_ROW, max_col=len(INDEXED_COLUMNS), values_only=True
+        )
+        for row, values in enumerate(rows, start=FIRST_DATA_ROW):
+            self._index_row(row, dict(zip(INDEXED_COLUMNS, values)))
+        metrics.inc("rows_scanned_total", len(self.records))
+        logger.debug(f"Проиндексировано строк: {len(self.records)}")
+
+    def _index_records(self, records):
+        """Строит индекс из готовых записей снимка"""
+        self.records = {}
+        self.status_rows = defaultdict(list)
+        self.ticker_rows = defaultdict(list)
+        for row in sorted(records):
+            self._index_row(row, records[row])
+        logger.debug(f"Проиндексировано строк из снимка: {len(self.records)}")
+
+    def _index_row(self, row, record):
+        self.records[row] = record
+        self.status_rows[normalize_status(record["B"])].append(row)
+        if record["C"]:
+            self.ticker_rows[record["C"]].append(row)
+
+    def get_value(self, row, column):
+        """Значение ячейки из индекса"""
+        record = self.records.get(row)
+        return record.get(column) if record else None
+
+    def rows_with_status(self, *statuses):
+        """Номера строк с указанными статусами в порядке возрастания"""
+        rows = []
+        for status in statuses:
+            rows.extend(self.status_rows.get(normalize_status(status), []))
+        return sorted(rows)
+
+    def set_cell(self, row, column, value):
+        """Записывает ячейку, помечает её изменённой и обновляет индекс"""
+        with self._lock:
+            record = self.records.get(row)
+            if record is not None and column in record and record[column] == value:
+                return
+
+            if self._sheet is None or self._saving:
+                # Книга не загружена или сохраняется в фоне: запись применится позже
+                self._pending[(row, column)] = value
+            else:
+                self._sheet[f"{column}{row}"] = value
+            self._dirty.add((row, column))
+            if row >= FIRST_DATA_ROW and column in INDEXED_COLUMNS:
+                self._update_index(row, column, value)
+
+    def _update_index(self, row, column, value):
+        """Обновляет индекс после записи ячейки"""
+        record = self.records.get(row)
+        if record is None:
+            # Новая строка под индексом: статус пока пустой
+            record = self.records[row] = dict.fromkeys(INDEXED_COLUMNS)
+            insort(self.status_rows[normalize_status(None)], row)
+
+        if column == "B" and normalize_status(record["B"]) != normalize_status(value):
+            self._unindex(self.status_rows, normalize_status(record["B"]), row)
+            insort(self.status_rows[normalize_status(value)], row)
+        elif column == "C" and record["C"] != value:
+            if record["C"]:
+                self._unindex(self.ticker_rows, record["C"], row)
+            if value:
+                insort(self.ticker_rows[value], row)
+        record[column] = value
+
+    def write_column(self, column, rows, values):
+        """Пакетная запись значений колонки по списку строк"""
+        with self._lock:
+            for row, value in zip(rows, values):
+                self.set_cell(row, column, value)
+
+    @property
+    def is_dirty(self):
+        """Есть ли несохранённые изменения"""
+        return bool(self._dirty)
+
+    @staticmethod
+    def _unindex(index, key, row):
+        """Удаляет строку из списка индекса"""
+        rows = index.get(key)
+        if rows and row in rows:
+            rows.remove(row)
+            if not rows:
+                del index[key]
+
+    def update_header(self, usdt_balance, deposit):
+        """Обновляет шапку с балансами"""
+        self.set_cell(1, "H", float(usdt_balance))
+        self.set_cell(2, "H", float(deposit))
+        logger.debug(f"Обновлены балансы: USDT={usdt_balance}, Депозит={deposit}")
+
+    def get_active_tickers(self):
+        """Получает список активных тикеров"""
+        active_tickers = set()
+        for row in self.rows_with_status(ACTIVE_STATUS):
+            ticker = self.records[row]["C"]
+            if ticker:
+                active_tickers.add(ticker)
+        return list(active_tickers)
+
+    def update_prices(self, prices):
+        """Обновляет текущие цены"""
+        updated = 0
+        active_rows = set(self.status_rows.get(ACTIVE_STATUS, []))
+        for ticker, price in prices.items():
+            for row in self.ticker_rows.get(ticker, []):
+                if row in active_rows:
+                    self.set_cell(row, "D", float(price))
+                    updated += 1
+        logger.debug(f"Обновлено цен: {updated}")
+
+    def simulate_order(self, order_type, row, price, quantity):
+        """Симуляция ордера для тестового режима"""
+        if order_type == "BUY":
+            self.set_cell(row, "L", "Купить")
+            self.set_cell(row, "Q", "Открыта")
+            self.set_cell(row, "R", "Спот")
+        elif order_type == "SELL":
+            self.set_cell(row, "L", "Продать")
+            self.set_cell(row, "Q", "Закрыта")
+
+        self.set_cell(row, "M", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self.set_cell(row, "N", float(price))
+        self.set_cell(row, "O", float(quantity))
+        self.set_cell(row, "P", float(price) * float(quantity))
+        self.set_cell(row, "S", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self.set_cell(row, "T", float(price))
+        self.set_cell(row, "U", float(quantity))
+        self.set_cell(row, "V", float(price) * float(quantity))
+
+        logger.info(f"[SIMULATED] Ордер {order_type} в строке {row}: {quantity}@{price}")
+
+    def record_order(self, order_type, row, price, quantity):
+        """Записывает размещённый на бирже ордер"""
+        self.set_cell(row, "L", "Купить" if order_type == "BUY" else "Продать")
+        self.set_cell(row, "M", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        self.set_cell(row, "N", float(price))
+        self.set_cell(row, "O", float(quantity))
+        self.set_cell(row, "P", float(price) * float(quantity))
+        self.set_cell(row, "Q", "Открыта")
+        self.set_cell(row, "R", "Спот")
+        logger.debug(f"Записан ордер {order_type} в строке {row}")
+
+    def record_fill(self, order_type, row, price, quantity, filled_at=None):
+        """Записывает исполнение ордера в колонки S-V"""
+        filled_at = filled_at or datetime.now()
+        self.set_cell(row, "S", filled_at.strftime("%Y-%m-%d %H:%M:%S"))
+        self.set_cell(row, "T", float(price))
+        self.set_cell(row, "U", float(quantity))
+        self.set_cell(row, "V", float(price) * float(quantity))
+        if order_type == "SELL":
+            self.set_cell(row, "Q", "Закрыта")
+        logger.debug(f"Записано исполнение {order_type} в строке {row}")
+
+    def save(self, background=None):
+        """Сохраняет изменения в файл, если они есть.
+
+        Запись идёт во временный файл с атомарной заменой. В фоновом режиме
+        сериализация выполняется в отдельном потоке, а новые записи до её
+        окончания копятся в очереди отложенных. Ошибка записи без фонового
+        режима пробрасывается, в фоновом - только логируется.
+        """
+        background = config.EXCEL_BACKGROUND_SAVE if background is None else background
+        self.wait_for_save()
+        with self._lock:
+            if not self._dirty:
+                logger.debug("Нет изменений, сохранение Excel пропущено")
+                return False
+            wb = self.wb
+            changed = self._dirty
+            self._dirty = set()
+            self._saving = True
+            records = {row: dict(record) for row, record in self.records.items()} if self.cache else None
+
+        if background:
+            self._save_thread = threading.Thread(
+                target=self._write, args=(wb, changed, records, True), name="excel-save", daemon=True
+            )
+            self._save_thread.start()
+        else:
+            self._write(wb, changed, records)
+        return True
+
+    def _write(self, wb, changed, records, background=False):
+        """Атомарная запись книги и снимка"""
+        try:
+            directory = os.path.dirname(os.path.abspath(self.file_path))
+            fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+            os.close(fd)
+            try:
+                wb.save(tmp_path)
+                os.chmod(tmp_path, os.stat(self.file_path).st_mode)
+                os.replace(tmp_path, self.file_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            if self.cache:
+                self.cache.store(records)
+            logger.debug(f"Файл Excel сохранён, изменено ячеек: {len(changed)}")
+        except Exception as e:
+            logger.error(f"Ошибка сохранения Excel: {str(e)}")
+            with self._lock:
+                self._dirty |= changed
+            if not background:
+                raise
+        finally:
+            with self._lock:
+                self._saving = False
+                self._apply_pending()
+
+    def wait_for_save(self):
+        """Дожидается завершения фонового сохранения"""
+        if self._save_thread is not None:
+            self._save_thread.join()
+            self._save_thread = None
\ No newline at end of file
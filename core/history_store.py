@@ -0,0 +1,165 @@
+import os
+import struct
+import threading
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+# Записи фиксированной длины, little-endian; время - мс от эпохи
+KLINE_FORMAT = struct.Struct("<qddddd")  # open_time, open, high, low, close, volume
+TICK_FORMAT = struct.Struct("<qdd")  # time, price, quantity
+KLINE_FIELDS = ("time", "open", "high", "low", "close", "volume")
+TICK_FIELDS = ("time", "price", "quantity")
+
+# Длительность свечи в мс для интервалов MEXC
+INTERVAL_MS = {
+    "1m": 60000,
+    "5m": 300000,
+    "15m": 900000,
+    "30m": 1800000,
+    "60m": 3600000,
+    "4h": 14400000,
+    "1d": 86400000,
+}
+
+
+def _numpy():
+    # NumPy нужен только для чтения окон, запись обходится struct
+    import numpy
+    return numpy
+
+
+def _dtype(fields):
+    np = _numpy()
+    return np.dtype([(fields[0], "<i8")] + [(name, "<f8") for name in fields[1:]])
+
+
+class HistoryStore:
+    """Локальная история цен: по файлу на символ и интервал.
+
+    Файлы только дописываются записями фиксированной длины в порядке
+    времени, поэтому колонка времени и есть индекс: окно находится
+    бинарным поиском по отображённому в память файлу. Чтение отдаёт
+    представления NumPy поверх mmap без копирования и без загрузки файла
+    целиком.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or config.HISTORY_DIR
+        self._last_times = {}
+        self._handles = {}
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, name):
+        return os.path.join(self.root, symbol, name)
+
+    def kline_path(self, symbol, interval):
+        return self._path(symbol, f"klines_{interval}.bin")
+
+    def tick_path(self, symbol):
+        return self._path(symbol, "ticks.bin")
+
+    def _last_time(self, path, record):
+        """Время последней целой записи файла; обрезает недописанный хвост"""
+        if path in self._last_times:
+            return self._last_times[path]
+        last = None
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+            if size % record.size:
+                logger.warning(f"Обрезана неполная запись в {path}")
+                with open(path, "r+b") as f:
+                    f.truncate(size - size % record.size)
+                size -= size % record.size
+            if size:
+                with open(path, "rb") as f:
+                    f.seek(size - record.size)
+                    last = record.unpack(f.read(record.size))[0]
+        self._last_times[path] = last
+        return last
+
+    def _append(self, path, record, rows, strict=True):
+        """Дописывает записи новее последней; возвращает число записанных.
+
+        Для сделок (strict=False) допускается то же время, что у последней записи.
+        """
+        with self._lock:
+            last = self._last_time(path, record)
+            data = bytearray()
+            for row in rows:
+                if last is not None and (row[0] < last or strict and row[0] == last):
+                    continue
+                data += record.pack(*row)
+                last = row[0]
+            if not data:
+                return 0
+            handle = self._handles.get(path)
+            if handle is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handle = self._handles[path] = open(path, "ab")
+            handle.write(data)
+            handle.flush()
+            self._last_times[path] = last
+        return len(data) // record.size
+
+    def append_klines(self, symbol, interval, klines):
+        """Свечи в формате /klines: [open_time, open, high, low, close, volume, ...]"""
+        rows = (
+            (int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]))
+            for k in klines
+        )
+        return self._append(self.kline_path(symbol, interval), KLINE_FORMAT, rows)
+
+    def append_ticks(self, symbol, ticks):
+        """Сделки (time_ms, price, quantity) в порядке времени"""
+        rows = ((int(t), float(p), float(q)) for t, p, q in ticks)
+        return self._append(self.tick_path(symbol), TICK_FORMAT, rows, strict=False)
+
+    def last_kline_time(self, symbol, interval):
+        with self._lock:
+            return self._last_time(self.kline_path(symbol, interval), KLINE_FORMAT)
+
+    def _map(self, path, fields):
+        """Отображение файла в память; пересоздаётся, когда файл вырос"""
+        np = _numpy()
+        dtype = _dtype(fields)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        count = size // dtype.itemsize
+        cached = self._maps.get(path)
+        if cached is not None and len(cached) == count:
+            return cached
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        mapped = np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+        self._maps[path] = mapped
+        return mapped
+
+    @staticmethod
+    def _window(records, start=None, end=None):
+        np = _numpy()
+        times = records["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+        hi = len(records) if end is None else int(np.searchsorted(times, end, side="right"))
+        return records[lo:hi]
+
+    def klines(self, symbol, interval, start=None, end=None):
+        """Свечи за окно [start, end] - структурный массив поверх mmap"""
+        return self._window(self._map(self.kline_path(symbol, interval), KLINE_FIELDS), start, end)
+
+    def ticks(self, symbol, start=None, end=None):
+        """Сделки за окно [start, end] - структурный массив поверх mmap"""
+        return self._window(self._map(self.tick_path(symbol), TICK_FIELDS), start, end)
+
+    def history(self, symbol, interval, start=None, end=None):
+        """Свечи в виде словаря колонок, как у strategies.backtest.load_history"""
+        records = self.klines(symbol, interval, start, end)
+        return {name: records[name] for name in ("time", "open", "high", "low", "close")}
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                handle.close()
+            self._handles.clear()
+            self._maps.clear()
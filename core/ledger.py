@@ -0,0 +1,110 @@
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from utils.fixed_point import to_units, from_units
+
+# Знак транзакции в балансе
+TX_SIGNS = {'deposit': 1, 'withdrawal': -1}
+
+
+class AssetHistory:
+    """Контрольные точки одного актива: время и баланс после каждой транзакции"""
+
+    __slots__ = ('times', 'balances', 'deposits', 'withdrawals')
+
+    def __init__(self):
+        self.times = array('q')
+        self.balances = array('q')
+        self.deposits = 0
+        self.withdrawals = 0
+
+    @property
+    def balance(self):
+        return self.balances[-1] if self.balances else 0
+
+
+class Ledger:
+    """Инкрементальный индекс транзакций по активам.
+
+    Транзакции добавляются по одной или пачками, агрегаты пересчитываются
+    только для затронутого актива. Текущий баланс актива - O(1), баланс на
+    момент времени - O(log n) по контрольным точкам. Суммы хранятся в целых
+    единицах 1e-8.
+    """
+
+    def __init__(self, transactions=None):
+        self._assets = defaultdict(AssetHistory)
+        self._total = 0
+        self.count = 0
+        if transactions:
+            self.extend(transactions)
+
+    @staticmethod
+    def _timestamp(tx, default):
+        for key in ('timestamp', 'time'):
+            if tx.get(key) is not None:
+                return int(tx[key])
+        return default
+
+    def append(self, tx):
+        """Учитывает одну транзакцию"""
+        sign = TX_SIGNS.get(tx['type'])
+        if not sign:
+            return
+        units = to_units(tx['amount'])
+        delta = sign * units
+        history = self._assets[tx['asset']]
+        # Транзакция без времени идёт в конец истории актива, а не в её начало
+        timestamp = self._timestamp(tx, history.times[-1] if history.times else self.count)
+
+        if not history.times or timestamp >= history.times[-1]:
+            history.times.append(timestamp)
+            history.balances.append(history.balance + delta)
+        else:
+            # Запоздавшая транзакция: сдвигаем только последующие точки
+            position = bisect_right(history.times, timestamp)
+            previous = history.balances[position - 1] if position else 0
+            history.times.insert(position, timestamp)
+            history.balances.insert(position, previous + delta)
+            for i in range(position + 1, len(history.balances)):
+                history.balances[i] += delta
+
+        if sign > 0:
+            history.deposits += units
+        else:
+            history.withdrawals += units
+        self._total += delta
+        self.count += 1
+
+    def extend(self, transactions):
+        """Учитывает пачку транзакций"""
+        for tx in transactions:
+            self.append(tx)
+
+    def assets(self):
+        return list(self._assets)
+
+    def balance(self, asset):
+        """Текущий баланс актива"""
+        history = self._assets.get(asset)
+        return from_units(history.balance if history else 0)
+
+    def balance_at(self, asset, timestamp):
+        """Баланс актива с учётом транзакций не позже timestamp"""
+        history = self._assets.get(asset)
+        if not history:
+            return from_units(0)
+        position = bisect_right(history.times, timestamp)
+        return from_units(history.balances[position - 1] if position else 0)
+
+    def deposits(self, asset):
+        history = self._assets.get(asset)
+        return from_units(history.deposits if history else 0)
+
+    def withdrawals(self, asset):
+        history = self._assets.get(asset)
+        return from_units(history.withdrawals if history else 0)
+
+    def total(self):
+        """Баланс по всем активам"""
+        return from_units(self._total)
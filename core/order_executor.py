@@ -1,76 +1,289 @@
-from utils.logger import setup_logger
-from utils.exceptions import InsufficientBalanceError, APIError
-from decimal import Decimal
-
-logger = setup_logger()
-
-class OrderExecutor:
-    def __init__(self, api_client, excel_manager, dry_run=True):
-        self.api = api_client
-        self.excel = excel_manager
-        self.dry_run = dry_run
-        logger.info(f"Инициализирован OrderExecutor (режим {'тестовый' if dry_run else 'боевой'})")
-
-    def place_take_profit_buy(self, symbol, price, quantity, row):
-        """Размещение тейк-профит ордера на покупку"""
-        try:
-            logger.info(f"Обработка TP BUY: {symbol} {quantity}@{price} (строка {row})")
-            
-            if self.dry_run:
-                self.excel.simulate_order("BUY", row, price, quantity)
-                return {"status": "simulated", "orderId": f"SIM_{symbol}_{row}"}
-            
-            # Реальная логика (не выполняется в тестовом режиме)
-            usdt_balance = self._get_usdt_balance()
-            required = Decimal(price) * Decimal(quantity)
-            
-            if usdt_balance < required:
-                raise InsufficientBalanceError(
-                    f"Недостаточно USDT. Нужно: {required}, есть: {usdt_balance}"
-                )
-            
-            response = self.api.place_order(
-                symbol=symbol,
-                side="BUY",
-                type="TAKE_PROFIT",
-                quantity=quantity,
-                price=price,
-                stopPrice=price
-            )
-            
-            logger.info(f"Ордер размещен: {response}")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Ошибка при размещении TP BUY: {str(e)}")
-            raise APIError(f"Ошибка ордера: {str(e)}")
-
-    def place_limit_sell(self, symbol, price, quantity, row):
-        """Размещение лимитного ордера на продажу"""
-        try:
-            logger.info(f"Обработка SELL: {symbol} {quantity}@{price} (строка {row})")
-            
-            if self.dry_run:
-                self.excel.simulate_order("SELL", row, price, quantity)
-                return {"status": "simulated", "orderId": f"SIM_{symbol}_{row}"}
-            
-            # Реальная логика (не выполняется в тестовом режиме)
-            response = self.api.place_order(
-                symbol=symbol,
-                side="SELL",
-                type="LIMIT",
-                quantity=quantity,
-                price=price
-            )
-            
-            logger.info(f"Ордер размещен: {response}")
-            return response
-            
-        except Exception as e:
-            logger.error(f"Ошибка при размещении SELL: {str(e)}")
-            raise APIError(f"Ошибка ордера: {str(e)}")
-
-    def _get_usdt_balance(self):
-        """Получает баланс USDT"""
-        balance = self.api.get_account_balance()
-        return Decimal(balance["USDT"]["free"])
\ No newline at end of file
+import asyncio
+from utils.logger import setup_logger
+from utils.exceptions import InsufficientBalanceError, APIError, OrderValidationError
+from utils.async_api_client import AsyncMEXCClient
+from utils.fixed_point import FixedPoint
+from utils.symbol_filters import SymbolFilterCache
+from core.account_state import AccountState, QUOTE_ASSET
+import config
+
+logger = setup_logger()
+
+class OrderExecutor:
+    def __init__(self, api_client, excel_manager, dry_run=True, account_state=None, symbol_filters=None,
+                 paper_exchange=None, state_store=None):
+        self.api = api_client
+        self.excel = excel_manager
+        self.dry_run = dry_run
+        self.account = account_state or AccountState(api_client)
+        self.symbol_filters = symbol_filters or SymbolFilterCache(api_client)
+        self.paper = paper_exchange
+        self.state = state_store
+        if self.paper is not None:
+            self.paper.on_fill = self._on_paper_fill
+        self.async_api = None
+        self._queue = []
+        logger.info(f"Инициализирован OrderExecutor (режим {'тестовый' if dry_run else 'боевой'})")
+
+    def place_take_profit_buy(self, symbol, price, quantity, row):
+        """Размещение тейк-профит ордера на покупку"""
+        try:
+            logger.info(f"Обработка TP BUY: {symbol} {quantity}@{price} (строка {row})")
+            price, quantity = self._prepare(symbol, "BUY", price, quantity)
+            
+            if self.dry_run:
+                if self.paper is not None:
+                    response = self.paper.place_order(
+                        symbol=symbol, side="BUY", type="TAKE_PROFIT",
+                        quantity=quantity, price=price, stopPrice=price, row=row
+                    )
+                    self._record_order(symbol, "BUY", "TAKE_PROFIT", row, price, quantity, response)
+                    return response
+                return self._simulate(symbol, "BUY", row, price, quantity)
+            
+            # Реальная логика (не выполняется в тестовом режиме)
+            self._reserve(row, price, quantity)
+            try:
+                response = self.api.place_order(
+                    symbol=symbol,
+                    side="BUY",
+                    type="TAKE_PROFIT",
+                    quantity=quantity,
+                    price=price,
+                    stopPrice=price
+                )
+            except Exception:
+                self.account.release(row)
+                raise
+            self.account.commit(row)
+            
+            logger.info(f"Ордер размещен: {response}")
+            self._record_order(symbol, "BUY", "TAKE_PROFIT", row, price, quantity, response)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Ошибка при размещении TP BUY: {str(e)}")
+            raise APIError(f"Ошибка ордера: {str(e)}")
+
+    def place_limit_sell(self, symbol, price, quantity, row):
+        """Размещение лимитного ордера на продажу"""
+        try:
+            logger.info(f"Обработка SELL: {symbol} {quantity}@{price} (строка {row})")
+            price, quantity = self._prepare(symbol, "SELL", price, quantity)
+            
+            if self.dry_run:
+                if self.paper is not None:
+                    response = self.paper.place_order(
+                        symbol=symbol, side="SELL", type="LIMIT",
+                        quantity=quantity, price=price, row=row
+                    )
+                    self._record_order(symbol, "SELL", "LIMIT", row, price, quantity, response)
+                    return response
+                return self._simulate(symbol, "SELL", row, price, quantity)
+            
+            # Реальная логика (не выполняется в тестовом режиме)
+            response = self.api.place_order(
+                symbol=symbol,
+                side="SELL",
+                type="LIMIT",
+                quantity=quantity,
+                price=price
+            )
+            
+            logger.info(f"Ордер размещен: {response}")
+            self._record_order(symbol, "SELL", "LIMIT", row, price, quantity, response)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Ошибка при размещении SELL: {str(e)}")
+            raise APIError(f"Ошибка ордера: {str(e)}")
+
+    def queue_take_profit_buy(self, symbol, price, quantity, row):
+        """Добавляет TP BUY в пакет прогона; отправка - submit_queued()"""
+        self._queue.append({'side': 'BUY', 'symbol': symbol, 'price': price, 'quantity': quantity, 'row': row})
+
+    def queue_limit_sell(self, symbol, price, quantity, row):
+        """Добавляет лимитный SELL в пакет прогона; отправка - submit_queued()"""
+        self._queue.append({'side': 'SELL', 'symbol': symbol, 'price': price, 'quantity': quantity, 'row': row})
+
+    @staticmethod
+    def _order_params(order):
+        """Параметры ордера для API по записи очереди"""
+        if order['side'] == 'BUY':
+            return {
+                'symbol': order['symbol'], 'side': 'BUY', 'type': 'TAKE_PROFIT',
+                'quantity': order['quantity'], 'price': order['price'], 'stopPrice': order['price']
+            }
+        return {
+            'symbol': order['symbol'], 'side': 'SELL', 'type': 'LIMIT',
+            'quantity': order['quantity'], 'price': order['price']
+        }
+
+    def submit_queued(self):
+        """Отправляет накопленные ордера пакетами.
+
+        Возвращает результаты в порядке строк: {'row', 'result'} или {'row', 'error'};
+        ошибка одного ордера не влияет на остальные.
+        """
+        queued = sorted(self._queue, key=lambda o: o['row'])
+        self._queue = []
+        if not queued:
+            return []
+
+        if self.dry_run:
+            results = []
+            for order in queued:
+                place = self.place_take_profit_buy if order['side'] == 'BUY' else self.place_limit_sell
+                try:
+                    result = place(order['symbol'], order['price'], order['quantity'], order['row'])
+                    results.append({'row': order['row'], 'result': result})
+                except Exception as e:
+                    results.append({'row': order['row'], 'error': e})
+            return results
+
+        results = []
+        accepted = []
+        for order in queued:
+            try:
+                order['price'], order['quantity'] = self._prepare(
+                    order['symbol'], order['side'], order['price'], order['quantity']
+                )
+                if order['side'] == 'BUY':
+                    self._reserve(order['row'], order['price'], order['quantity'])
+            except (InsufficientBalanceError, OrderValidationError) as e:
+                logger.error(f"Ошибка ордера {order['side']} (строка {order['row']}): {str(e)}")
+                results.append({'row': order['row'], 'error': e})
+                continue
+            accepted.append(order)
+
+        logger.info(f"Пакетная отправка ордеров: {len(accepted)}")
+        responses = self.api.place_batch_orders([self._order_params(order) for order in accepted])
+        for order, response in zip(accepted, responses):
+            if 'result' in response:
+                self.account.commit(order['row'])
+                self._record_order(
+                    order['symbol'], order['side'], 'TAKE_PROFIT' if order['side'] == 'BUY' else 'LIMIT',
+                    order['row'], order['price'], order['quantity'], response['result']
+                )
+                results.append({'row': order['row'], 'result': response['result']})
+            else:
+                self.account.release(order['row'])
+                logger.error(f"Ошибка ордера {order['side']} (строка {order['row']}): {str(response['error'])}")
+                results.append({'row': order['row'], 'error': response['error']})
+
+        return sorted(results, key=lambda r: r['row'])
+
+    def _prepare(self, symbol, side, price, quantity):
+        """Цена и количество по фильтрам символа; без фильтров - как есть"""
+        filters = self.symbol_filters.get(symbol)
+        if filters is None:
+            logger.debug(f"Нет фильтров для {symbol}, ордер без локального округления")
+            return price, quantity
+        return filters.prepare(side, price, quantity)
+
+    def _record_order(self, symbol, side, order_type, row, price, quantity, response):
+        """Размещённый ордер - в хранилище состояния, без него - сразу в таблицу"""
+        if self.state is not None:
+            order_id = response.get('orderId') if isinstance(response, dict) else None
+            self.state.record_order(order_id, row, symbol, side, order_type, price, quantity)
+        else:
+            self.excel.record_order(side, row, price, quantity)
+
+    def _simulate(self, symbol, side, row, price, quantity):
+        """Ордер без биржи: сразу размещён и исполнен"""
+        order_id = f"SIM_{symbol}_{row}"
+        if self.state is not None:
+            self.state.record_order(order_id, row, symbol, side, "SIMULATED", price, quantity)
+            self.state.record_fill(order_id, price, quantity)
+            logger.info(f"[SIMULATED] Ордер {side} в строке {row}: {quantity}@{price}")
+        else:
+            self.excel.simulate_order(side, row, price, quantity)
+        return {"status": "simulated", "orderId": order_id}
+
+    def _on_paper_fill(self, fill):
+        """Исполнение на бумажной бирже записывается в хранилище состояния или в таблицу"""
+        if self.state is not None:
+            self.state.record_fill(fill['orderId'], fill['price'], fill['quantity'], fill['time'])
+        elif fill['row'] is not None:
+            self.excel.record_fill(fill['side'], fill['row'], fill['price'], fill['quantity'], fill['time'])
+
+    def _get_usdt_balance(self):
+        """Свободный баланс USDT из локального состояния аккаунта"""
+        return self.account.available(QUOTE_ASSET)
+
+    def _reserve(self, row, price, quantity):
+        """Резервирует USDT под ордер строки или бросает InsufficientBalanceError"""
+        required = FixedPoint.from_value(price) * quantity
+        return self.account.reserve(row, QUOTE_ASSET, required)
+
+    async def place_take_profit_buys(self, orders, concurrency=None):
+        """Конкурентное размещение TP BUY ордеров.
+
+        orders - список словарей с ключами symbol, price, quantity, row.
+        Возвращает результаты в порядке строк: {'row', 'result'} или {'row', 'error'}.
+        """
+        if self.dry_run:
+            results = []
+            for order in sorted(orders, key=lambda o: o['row']):
+                try:
+                    results.append({'row': order['row'], 'result': self.place_take_profit_buy(**order)})
+                except Exception as e:
+                    results.append({'row': order['row'], 'error': e})
+            return results
+
+        if self.async_api is None:
+            self.async_api = AsyncMEXCClient(self.api)
+        semaphore = asyncio.Semaphore(concurrency or config.ORDER_CONCURRENCY)
+
+        # Средства резервируются локально в порядке строк,
+        # чтобы параллельные ордера не рассчитывали на одни и те же средства
+
+        async def dispatch(order):
+            async with semaphore:
+                try:
+                    logger.info(
+                        f"Обработка TP BUY: {order['symbol']} {order['quantity']}@{order['price']} "
+                        f"(строка {order['row']})"
+                    )
+                    response = await self.async_api.place_order(
+                        symbol=order['symbol'],
+                        side="BUY",
+                        type="TAKE_PROFIT",
+                        quantity=order['quantity'],
+                        price=order['price'],
+                        stopPrice=order['price']
+                    )
+                    self.account.commit(order['row'])
+                    logger.info(f"Ордер размещен: {response}")
+                    return {'row': order['row'], 'result': response}
+                except Exception as e:
+                    self.account.release(order['row'])
+                    logger.error(f"Ошибка при размещении TP BUY (строка {order['row']}): {str(e)}")
+                    return {'row': order['row'], 'error': APIError(f"Ошибка ордера: {str(e)}")}
+
+        tasks = []
+        rejected = []
+        prepared = {}
+        for order in sorted(orders, key=lambda o: o['row']):
+            try:
+                price, quantity = self._prepare(order['symbol'], "BUY", order['price'], order['quantity'])
+                order = dict(order, price=price, quantity=quantity)
+                self._reserve(order['row'], order['price'], order['quantity'])
+            except (InsufficientBalanceError, OrderValidationError) as e:
+                logger.error(f"Ошибка при размещении TP BUY (строка {order['row']}): {str(e)}")
+                rejected.append({'row': order['row'], 'error': e})
+                continue
+            prepared[order['row']] = order
+            tasks.append(dispatch(order))
+
+        results = sorted(list(await asyncio.gather(*tasks)) + rejected, key=lambda r: r['row'])
+
+        # Запись в таблицу после завершения всех запросов, строго по порядку строк
+        for result in results:
+            if 'result' in result:
+                order = prepared[result['row']]
+                self._record_order(
+                    order['symbol'], "BUY", "TAKE_PROFIT", order['row'], order['price'], order['quantity'],
+                    result['result']
+                )
+        return results
\ No newline at end of file
@@ -0,0 +1,115 @@
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from core.state_store import TIME_FORMAT
+from utils.fixed_point import format_units, to_units
+from utils.logger import setup_logger
+from utils.metrics import metrics
+import config
+
+logger = setup_logger()
+
+# Статусы MEXC, после которых ордер больше не исполнится; PARTIALLY_CANCELED хранится
+# отдельно: часть позиции уже куплена
+CANCELED_STATUSES = ("CANCELED", "EXPIRED", "REJECTED")
+
+
+def _to_ms(text):
+    """Время из хранилища состояния в миллисекундах"""
+    return int(datetime.strptime(text, TIME_FORMAT).timestamp() * 1000)
+
+
+class OrderReconciler:
+    """Сверка открытых ордеров из StateStore с биржей.
+
+    На символ с открытыми ордерами уходит один запрос открытых ордеров и
+    один запрос сделок с момента размещения самого раннего из них. Ответы
+    сравниваются с индексом orderId в памяти, и в хранилище попадают только
+    изменившиеся ордера: новые исполнения, частичные исполнения и отмены.
+    С бумажной биржей сверка идёт по её книге.
+    """
+
+    def __init__(self, api_client, state_store, paper_exchange=None, clock=time.monotonic):
+        self.api = api_client
+        self.state = state_store
+        self.paper = paper_exchange
+        self._clock = clock
+        self._reconciled_at = None
+
+    def reconcile(self):
+        """Один проход сверки; возвращает счётчики изменений"""
+        index = defaultdict(dict)
+        for order in self.state.open_orders():
+            index[order["symbol"]][order["order_id"]] = order
+
+        summary = Counter()
+        for symbol, orders in index.items():
+            try:
+                if self.paper is not None:
+                    self._reconcile_paper(symbol, orders, summary)
+                else:
+                    self._reconcile_symbol(symbol, orders, summary)
+            except Exception as e:
+                logger.warning(f"Ошибка сверки ордеров {symbol}: {str(e)}")
+                summary["errors"] += 1
+
+        for kind, value in summary.items():
+            metrics.inc("orders_reconciled_total", value, result=kind)
+        self._reconciled_at = self._clock()
+        logger.info(
+            f"Сверка ордеров: символов {len(index)}, исполнений {summary['fills']}, "
+            f"отмен {summary['cancelled']}, ошибок {summary['errors']}"
+        )
+        return dict(summary)
+
+    def reconcile_if_due(self, interval=None):
+        """Сверка в режиме демона не чаще RECONCILE_INTERVAL"""
+        interval = config.RECONCILE_INTERVAL if interval is None else interval
+        if self._reconciled_at is None or self._clock() - self._reconciled_at >= interval:
+            return self.reconcile()
+        return None
+
+    def _reconcile_symbol(self, symbol, orders, summary):
+        open_orders = {str(order["orderId"]): order for order in self.api.get_open_orders(symbol) or []}
+        # Время в хранилище с точностью до секунды: окно сделок берётся с запасом
+        since = min(_to_ms(order["created_at"]) for order in orders.values()) - 1000
+        for trade in self.api.get_my_trades(symbol, start_time=since) or []:
+            order_id = str(trade.get("orderId"))
+            if order_id not in orders:
+                continue
+            filled_at = datetime.fromtimestamp(int(trade["time"]) / 1000)
+            if self.state.record_fill(order_id, trade["price"], trade["qty"], filled_at, trade_id=str(trade["id"])):
+                summary["fills"] += 1
+
+        for order_id in orders:
+            # Ордер пропал из открытых: статус и исполнение уточняются отдельным запросом
+            remote = open_orders.get(order_id) or self.api.get_order(symbol, order_id)
+            self._apply(order_id, remote, summary)
+
+    def _apply(self, order_id, remote, summary):
+        """Догоняет исполнение и статус ордера по ответу биржи"""
+        order = self.state.get_order(order_id)
+        missing = to_units(remote.get("executedQty") or 0) - order["filled_units"]
+        if missing > 0:
+            # Сделки вне окна myTrades: остаток executedQty по средней цене ордера;
+            # пришедшие позже сделки заменят эту запись, а не добавятся к ней
+            executed = float(remote["executedQty"])
+            quote = float(remote.get("cummulativeQuoteQty") or 0)
+            price = quote / executed if quote else format_units(order["price_units"])
+            if self.state.record_fill(order_id, price, format_units(missing)):
+                summary["fills"] += 1
+
+        status = remote.get("status")
+        if status in CANCELED_STATUSES and self.state.update_order_status(order_id, "CANCELED"):
+            summary["cancelled"] += 1
+        elif status == "PARTIALLY_CANCELED" and self.state.update_order_status(order_id, status):
+            summary["cancelled"] += 1
+        elif status == "FILLED" and self.state.update_order_status(order_id, "FILLED"):
+            summary["fills"] += 1
+
+    def _reconcile_paper(self, symbol, orders, summary):
+        """Исполнения бумажной биржи приходят сами; ордеров вне её книги больше нет"""
+        alive = {order["orderId"] for order in self.paper.open_orders(symbol)}
+        for order_id in orders:
+            if order_id not in alive and self.state.update_order_status(order_id, "CANCELED"):
+                summary["cancelled"] += 1
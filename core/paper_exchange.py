@@ -0,0 +1,189 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from utils.fixed_point import to_units, format_units
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+ORDER_PREFIX = "PAPER_"  # Префикс идентификаторов ордеров бумажной биржи
+
+
+class PaperExchange:
+    """Биржа в памяти для тестового режима.
+
+    Ордера на покупку исполняются, когда цена опускается до цены ордера или
+    ниже, на продажу - когда поднимается до неё или выше. Ордера каждого
+    символа лежат в двух кучах (покупки - по убыванию цены, продажи - по
+    возрастанию), поэтому тик снимает только пересечённые ордера за
+    O(k log n). Отменённые ордера удаляются из куч лениво.
+    """
+
+    def __init__(self, on_fill=None, clock=datetime.now):
+        self.on_fill = on_fill
+        self._clock = clock
+        self._books = {}
+        self._orders = {}
+        self._by_row = {}
+        self._ids = itertools.count(1)
+        self.last_prices = {}
+        self._stale = 0
+        self._lock = threading.Lock()
+
+    def _book(self, symbol):
+        book = self._books.get(symbol)
+        if book is None:
+            book = self._books[symbol] = {"BUY": [], "SELL": []}
+        return book
+
+    def place_order(self, symbol, side, type, quantity, price=None, row=None, order_id=None, **params):
+        """Ставит ордер в книгу; ответ в формате POST /order"""
+        trigger = params.get("stopPrice", price)
+        if trigger is None:
+            raise ValueError(f"{symbol}: ордер {type} без цены")
+        order = {
+            "orderId": order_id or f"{ORDER_PREFIX}{next(self._ids)}",
+            "symbol": symbol,
+            "side": side,
+            "type": type,
+            "price_units": to_units(trigger),
+            "quantity_units": to_units(quantity),
+            "row": row,
+        }
+        with self._lock:
+            if row is not None:
+                # Повторный проход по той же строке заменяет её ордер, а не дублирует
+                previous = self._by_row.pop((row, side), None)
+                if previous is not None and self._orders.pop(previous, None) is not None:
+                    self._stale += 1
+                self._by_row[(row, side)] = order["orderId"]
+            self._orders[order["orderId"]] = order
+            key = -order["price_units"] if side == "BUY" else order["price_units"]
+            heapq.heappush(self._book(symbol)[side], (key, order["orderId"]))
+            if self._stale > len(self._orders):
+                self._compact()
+            last = self.last_prices.get(symbol)
+
+        response = {
+            "orderId": order["orderId"],
+            "symbol": symbol,
+            "side": side,
+            "type": type,
+            "price": format_units(order["price_units"]),
+            "origQty": format_units(order["quantity_units"]),
+            "status": "NEW",
+        }
+        if last is not None:
+            # Ордер, уже пересечённый рынком, исполняется сразу
+            self._dispatch(self._match(symbol, last))
+        return response
+
+    def restore(self, orders):
+        """Возвращает в книгу открытые ордера прошлого запуска (записи StateStore).
+
+        Ордер встаёт на неисполненный остаток; номера новых ордеров идут после
+        восстановленных. Возвращает число восстановленных ордеров.
+        """
+        last = restored = 0
+        for order in orders:
+            if not order["order_id"].startswith(ORDER_PREFIX):
+                continue
+            self.place_order(
+                order["symbol"], order["side"], order["type"],
+                format_units(order["quantity_units"] - order["filled_units"]),
+                format_units(order["price_units"]), row=order["row"], order_id=order["order_id"]
+            )
+            suffix = order["order_id"][len(ORDER_PREFIX):]
+            if suffix.isdigit():
+                last = max(last, int(suffix))
+            restored += 1
+        self._ids = itertools.count(max(last + 1, next(self._ids)))
+        if restored:
+            logger.info(f"Восстановлено ордеров бумажной биржи: {restored}")
+        return restored
+
+    def cancel_order(self, order_id):
+        """Снимает ордер; False, если он уже исполнен или не найден"""
+        with self._lock:
+            order = self._orders.pop(order_id, None)
+            if order is None:
+                return False
+            if order["row"] is not None and self._by_row.get((order["row"], order["side"])) == order_id:
+                del self._by_row[(order["row"], order["side"])]
+            self._stale += 1
+        return True
+
+    def open_orders(self, symbol=None):
+        with self._lock:
+            return [
+                dict(order) for order in self._orders.values()
+                if symbol is None or order["symbol"] == symbol
+            ]
+
+    def symbols(self):
+        """Символы с ордерами в книге"""
+        with self._lock:
+            return sorted({order["symbol"] for order in self._orders.values()})
+
+    def _compact(self):
+        """Перестраивает кучи без снятых ордеров; вызывать под блокировкой"""
+        for book in self._books.values():
+            for side, heap in book.items():
+                book[side] = [entry for entry in heap if entry[1] in self._orders]
+                heapq.heapify(book[side])
+        self._stale = 0
+
+    def _match(self, symbol, units):
+        """Снимает с книги ордера, пересечённые ценой; вызывать без блокировки"""
+        fills = []
+        with self._lock:
+            book = self._books.get(symbol)
+            if book is None:
+                return fills
+            buys, sells = book["BUY"], book["SELL"]
+            while buys and -buys[0][0] >= units:
+                fills.append(heapq.heappop(buys)[1])
+            while sells and sells[0][0] <= units:
+                fills.append(heapq.heappop(sells)[1])
+            orders = []
+            for order_id in fills:
+                order = self._orders.pop(order_id, None)
+                if order is None:
+                    continue  # отменён или заменён
+                if order["row"] is not None:
+                    self._by_row.pop((order["row"], order["side"]), None)
+                orders.append(order)
+        return orders
+
+    def _dispatch(self, orders):
+        filled_at = self._clock()
+        fills = []
+        for order in orders:
+            fill = {
+                "orderId": order["orderId"],
+                "symbol": order["symbol"],
+                "side": order["side"],
+                "price": format_units(order["price_units"]),
+                "quantity": format_units(order["quantity_units"]),
+                "row": order["row"],
+                "time": filled_at,
+            }
+            fills.append(fill)
+            logger.info(
+                f"[PAPER] Исполнен {fill['side']} {fill['symbol']} {fill['quantity']}@{fill['price']} "
+                f"(строка {fill['row']})"
+            )
+            if self.on_fill is not None:
+                try:
+                    self.on_fill(fill)
+                except Exception as e:
+                    logger.error(f"Ошибка обработки исполнения {fill['orderId']}: {str(e)}")
+        return fills
+
+    def on_price(self, symbol, price):
+        """Новая цена символа; возвращает исполнения этого тика"""
+        units = to_units(price)
+        with self._lock:
+            self.last_prices[symbol] = units
+        return self._dispatch(self._match(symbol, units))
@@ -0,0 +1,134 @@
+from array import array
+from utils.fixed_point import SCALE, to_units, from_units, div_units_array
+
+# Денежные колонки пакета, хранятся в целых единицах 1e-8
+AMOUNT_COLUMNS = ('current_price', 'entry_price', 'exit_price', 'planned_amount')
+# Целочисленные колонки пакета
+INT_COLUMNS = ('rows', 'ticker_codes', 'status_codes') + AMOUNT_COLUMNS
+
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+class SignalBatch:
+    """Колоночное представление сигналов.
+
+    Номера строк, коды тикеров и статусов и денежные значения хранятся в
+    компактных массивах array('q'); цены и суммы - целыми единицами 1e-8.
+    Пакет заполняется за один проход, отбор и производные величины
+    считаются векторно по колонкам int64 NumPy, а индексирование и итерация
+    отдают привычные словари сигналов.
+    """
+
+    def __init__(self):
+        self.rows = array('q')
+        self.ticker_codes = array('q')
+        self.tickers = []  # Код тикера -> тикер
+        self._ticker_codes = {}  # Тикер -> код
+        self.status_codes = array('q')
+        self.status_values = []  # Код статуса -> статус
+        self._status_codes = {}  # Статус -> код
+        self.dates = []
+        for column in AMOUNT_COLUMNS:
+            setattr(self, column, array('q'))
+
+    def append(self, row, date, status, ticker, current_price, entry_price, exit_price, planned_amount):
+        """Добавляет сигнал, переводя суммы в целые единицы"""
+        units = [to_units(value) for value in (current_price, entry_price, exit_price, planned_amount)]
+        code = self._ticker_codes.get(ticker)
+        if code is None:
+            code = self._ticker_codes[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        status_code = self._status_codes.get(status)
+        if status_code is None:
+            status_code = self._status_codes[status] = len(self.status_values)
+            self.status_values.append(status)
+        self.rows.append(row)
+        self.ticker_codes.append(code)
+        self.status_codes.append(status_code)
+        self.dates.append(date)
+        for column, value in zip(AMOUNT_COLUMNS, units):
+            getattr(self, column).append(value)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        """Сигнал в виде словаря (как его возвращал построчный парсер)"""
+        return {
+            'row': self.rows[i],
+            'date': self.dates[i],
+            'status': self.status_values[self.status_codes[i]],
+            'ticker': self.tickers[self.ticker_codes[i]],
+            'current_price': from_units(self.current_price[i]),
+            'entry_price': from_units(self.entry_price[i]),
+            'exit_price': from_units(self.exit_price[i]),
+            'planned_amount': from_units(self.planned_amount[i])
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @property
+    def statuses(self):
+        """Статусы сигналов по порядку строк"""
+        return [self.status_values[code] for code in self.status_codes]
+
+    def column(self, name):
+        """Целочисленная колонка как массив int64 NumPy (копия: array('q') остаётся расширяемым)"""
+        np = _numpy()
+        return np.array(getattr(self, name), dtype=np.int64)
+
+    def ticker_at(self, i):
+        return self.tickers[self.ticker_codes[i]]
+
+    def unique_tickers(self):
+        """Тикеры, встречающиеся в пакете"""
+        return [self.tickers[code] for code in _numpy().unique(self.column('ticker_codes')).tolist()]
+
+    def where_status(self, *statuses):
+        """Индексы сигналов с указанными статусами"""
+        np = _numpy()
+        codes = [self._status_codes[status] for status in statuses if status in self._status_codes]
+        return np.flatnonzero(np.isin(self.column('status_codes'), codes))
+
+    def where_ticker(self, ticker):
+        """Индексы сигналов по тикеру"""
+        np = _numpy()
+        code = self._ticker_codes.get(ticker)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.column('ticker_codes') == code)
+
+    def select(self, indices):
+        """Новый пакет из сигналов с указанными индексами"""
+        np = _numpy()
+        indices = np.asarray(indices, dtype=np.int64)
+        batch = SignalBatch()
+        batch.tickers = list(self.tickers)
+        batch._ticker_codes = dict(self._ticker_codes)
+        batch.status_values = list(self.status_values)
+        batch._status_codes = dict(self._status_codes)
+        for column in INT_COLUMNS:
+            setattr(batch, column, array('q', self.column(column)[indices].tobytes()))
+        batch.dates = [self.dates[i] for i in indices.tolist()]
+        return batch
+
+    def quantities(self):
+        """Количество к покупке planned_amount / entry_price в единицах 1e-8.
+
+        Считается векторно по int64; если результат не помещается в int64
+        (крошечная цена входа) - целыми Python. Возвращает список целых Python.
+        """
+        np = _numpy()
+        entry = self.column('entry_price')
+        valid = entry > 0
+        try:
+            return div_units_array(np.where(valid, self.column('planned_amount'), 0), np.where(valid, entry, 1)).tolist()
+        except OverflowError:
+            return [
+                planned * SCALE // entry if entry > 0 else 0
+                for planned, entry in zip(self.planned_amount, self.entry_price)
+            ]
@@ -1,69 +1,108 @@
-from utils.logger import setup_logger
-from utils.exceptions import InvalidSignalError
-from decimal import Decimal, getcontext
-import math
-
-logger = setup_logger()
-getcontext().prec = 8
-
-class SignalProcessor:
-	def __init__(self, excel_manager):
-		self.excel = excel_manager
-	
-	def get_active_signals(self):
-		"""Получение активных сигналов с улучшенной проверкой"""
-		signals = []
-		for row in range(6, self.excel.sheet.max_row + 1):
-			try:
-				status = str(self.excel.sheet[f"B{row}"].value).strip().lower()
-				if status in ['в работе', 'в_работе', 'active']:  # Все возможные варианты
-					signal = self._parse_signal(row)
-					if signal:
-						signals.append(signal)
-			except Exception as e:
-				logger.warning(f"Ошибка обработки строки {row}: {str(e)}")
-		return signals
-	
-	def _parse_signal(self, row):
-		"""Парсит сигнал из строки Excel"""
-		try:
-			return {
-				'row': row,
-				'date': self._get_cell_value(row, 'A'),
-				'status': self._get_cell_value(row, 'B'),
-				'ticker': self._get_cell_value(row, 'C'),
-				'current_price': Decimal(str(self._get_cell_value(row, 'D') or 0)),
-				'entry_price': Decimal(str(self._get_cell_value(row, 'F') or 0)),
-				'exit_price': Decimal(str(self._get_cell_value(row, 'G') or 0)),
-				'planned_amount': Decimal(str(self._get_cell_value(row, 'I') or 0))
-			}
-		except Exception as e:
-			raise InvalidSignalError(f"Ошибка парсинга строки {row}: {str(e)}")
-	
-	def _get_cell_value(self, row, column):
-		"""Безопасное получение значения ячейки"""
-		cell = f"{column}{row}"
-		return self.excel.sheet[cell].value if self.excel.sheet[cell].value else None
-	
-	def update_signal_status(self, row, status):
-		"""Обновляет статус сигнала"""
-		try:
-			self.excel.sheet[f"B{row}"] = status
-			self.excel.save()
-			logger.debug(f"Обновлен статус строки {row} на '{status}'")
-		except Exception as e:
-			raise InvalidSignalError(f"Ошибка обновления статуса: {str(e)}")
-            
-	def get_active_signals(self):
-		"""Получение активных сигналов с улучшенной проверкой"""
-		signals = []
-		for row in range(6, self.excel.sheet.max_row + 1):
-			try:
-				status = str(self.excel.sheet[f"B{row}"].value).strip().lower()
-				if status in ['в работе', 'active']:  # Все возможные варианты статуса
-					signal = self._parse_signal(row)
-					if signal:
-						signals.append(signal)
-			except Exception as e:
-				logger.warning(f"Ошибка обработки строки {row}: {str(e)}")
-		return signals
\ No newline at end of file
+from utils.logger import setup_logger
+from utils.exceptions import InvalidSignalError
+from utils.metrics import metrics
+from core.excel_manager import normalize_status, FIRST_DATA_ROW
+from core.signal_batch import SignalBatch
+
+logger = setup_logger()
+
+# Все возможные варианты статуса активного сигнала
+ACTIVE_STATUSES = ('в работе', 'active')
+
+class SignalProcessor:
+	def __init__(self, excel_manager, source=None, state_store=None):
+		self.excel = excel_manager
+		self.source = source
+		self.state = state_store
+		self._active = {}
+		self._batch = None
+	
+	def get_active_signals(self):
+		"""Получение активных сигналов в виде списка словарей"""
+		return list(self.get_signal_batch())
+	
+	def get_signal_batch(self):
+		"""Разбор активных сигналов в колоночный пакет за один проход"""
+		if self.source is not None:
+			return self._get_source_batch()
+		batch = SignalBatch()
+		rows = self.excel.rows_with_status(*ACTIVE_STATUSES)
+		for row in rows:
+			try:
+				self._parse_signal(row, batch)
+			except Exception as e:
+				logger.warning(f"Ошибка обработки строки {row}: {str(e)}")
+		metrics.inc("signals_parsed_total", len(batch))
+		metrics.inc("signals_invalid_total", len(rows) - len(batch))
+		self._store_batch(batch)
+		return batch
+	
+	def _get_source_batch(self):
+		"""Пакет из внешнего источника: читаются только изменения с прошлого вызова"""
+		changed = 0
+		for signal in self.source.poll():
+			changed += 1
+			metrics.inc("rows_scanned_total")
+			if signal['row'] is None or signal['row'] < FIRST_DATA_ROW:
+				# Распределение и ордер пишутся в строку листа: без неё сигнал затёр бы шапку
+				logger.warning(f"Сигнал без номера строки листа (row >= {FIRST_DATA_ROW}) пропущен: {signal}")
+				metrics.inc("signals_invalid_total")
+				continue
+			status = signal['status']
+			if status is not None and normalize_status(status) in ACTIVE_STATUSES:
+				self._active[signal['row']] = signal
+			else:
+				self._active.pop(signal['row'], None)
+		if changed or self._batch is None:
+			logger.debug(f"Изменено сигналов в источнике: {changed}")
+			batch = SignalBatch()
+			for row in sorted(self._active):
+				signal = self._active[row]
+				try:
+					batch.append(**signal)
+				except Exception as e:
+					logger.warning(f"Ошибка обработки сигнала {row}: {str(e)}")
+			metrics.inc("signals_parsed_total", len(batch))
+			self._store_batch(batch)
+			self._batch = batch
+		return self._batch
+	
+	def _store_batch(self, batch):
+		"""Сигналы пакета - в хранилище состояния; его сбой не останавливает обработку"""
+		if self.state is None:
+			return
+		try:
+			self.state.sync_signals(batch)
+		except Exception as e:
+			logger.warning(f"Ошибка записи сигналов в хранилище состояния: {str(e)}")
+	
+	def _parse_signal(self, row, batch):
+		"""Парсит сигнал из строки Excel и добавляет его в пакет"""
+		try:
+			record = self.excel.records[row]
+			batch.append(
+				row=row,
+				date=record['A'] or None,
+				status=record['B'] or None,
+				ticker=record['C'] or None,
+				current_price=record['D'],
+				entry_price=record['F'],
+				exit_price=record['G'],
+				planned_amount=record['I']
+			)
+		except Exception as e:
+			raise InvalidSignalError(f"Ошибка парсинга строки {row}: {str(e)}")
+	
+	def _get_cell_value(self, row, column):
+		"""Безопасное получение значения ячейки"""
+		return self.excel.get_value(row, column) or None
+	
+	def update_signal_status(self, row, status):
+		"""Обновляет статус сигнала (сохраняется общим сохранением этапа)"""
+		try:
+			self.excel.set_cell(row, "B", status)
+			if self.state is not None:
+				self.state.record_signal_status(row, status)
+			logger.debug(f"Обновлен статус строки {row} на '{status}'")
+		except Exception as e:
+			raise InvalidSignalError(f"Ошибка обновления статуса: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+# Поля сигнала, которые отдают все источники
+SIGNAL_FIELDS = ("row", "date", "status", "ticker", "current_price", "entry_price", "exit_price", "planned_amount")
+# Колонки листа для тех же полей
+SHEET_COLUMNS = {
+    "date": "A",
+    "status": "B",
+    "ticker": "C",
+    "current_price": "D",
+    "entry_price": "F",
+    "exit_price": "G",
+    "planned_amount": "I",
+}
+
+
+def make_signal(row, values):
+    """Сигнал из словаря полей; пустые строки считаются отсутствующими значениями.
+
+    row - номер строки листа, куда пишутся распределение и ордер; без него
+    или при нечисловом значении None (такой сигнал отбрасывает SignalProcessor).
+    """
+    try:
+        row = int(row) if row not in (None, "") else None
+    except (ValueError, TypeError):
+        logger.warning(f"Нечисловой номер строки сигнала: {row!r}")
+        row = None
+    signal = {"row": row}
+    for field in SIGNAL_FIELDS[1:]:
+        value = values.get(field)
+        signal[field] = None if value == "" else value
+    return signal
+
+
+class SignalSource:
+    """Источник сигналов с инкрементальным чтением.
+
+    records(since) лениво отдаёт сигналы, изменившиеся после смещения since,
+    и по ходу чтения продвигает self.offset. Сигнал с status=None означает,
+    что строка удалена. poll() читает от сохранённого смещения.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = None
+
+    def records(self, since=None):
+        raise NotImplementedError
+
+    def poll(self):
+        """Сигналы, изменившиеся с прошлого чтения"""
+        return self.records(self.offset)
+
+
+class ExcelSource(SignalSource):
+    """Лист xlsx в режиме только для чтения.
+
+    Книгу нельзя дочитать с места, поэтому смещение - время изменения файла:
+    пока файл не менялся, чтение ничего не отдаёт. После изменения строки
+    перечитываются потоком, но отдаются только те, чьё содержимое отличается
+    от прошлого чтения.
+    """
+
+    def __init__(self, path, sheet_name=None):
+        super().__init__(path)
+        self.sheet_name = sheet_name or config.SHEET_NAME
+        self._rows = {}
+
+    def records(self, since=None):
+        import openpyxl
+        from core.excel_manager import FIRST_DATA_ROW, INDEXED_COLUMNS
+
+        mtime = os.stat(self.path).st_mtime_ns
+        if since is not None and since == mtime:
+            return
+        if since is None:
+            self._rows = {}
+
+        wb = openpyxl.load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            rows = wb[self.sheet_name].iter_rows(
+                min_row=FIRST_DATA_ROW, max_col=len(INDEXED_COLUMNS), values_only=True
+            )
+            seen = set()
+            for row, values in enumerate(rows, start=FIRST_DATA_ROW):
+                record = dict(zip(INDEXED_COLUMNS, values))
+                if not any(record.values()):
+                    continue
+                seen.add(row)
+                fingerprint = tuple(record.get(column) for column in SHEET_COLUMNS.values())
+                if self._rows.get(row) == fingerprint:
+                    continue
+                self._rows[row] = fingerprint
+                yield make_signal(row, {field: record.get(column) for field, column in SHEET_COLUMNS.items()})
+            for row in sorted(set(self._rows) - seen):
+                del self._rows[row]
+                yield make_signal(row, {})
+        finally:
+            wb.close()
+        self.offset = mtime
+
+
+class _LineSource(SignalSource):
+    """Файл, который только дописывается; смещение - позиция в байтах"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._line = 0
+
+    def _lines(self, since):
+        """Полные строки после смещения; недописанная последняя строка ждёт следующего чтения"""
+        position = since or 0
+        if position == 0:
+            self._line = 0
+        if not os.path.exists(self.path):
+            return
+        if os.path.getsize(self.path) < position:
+            logger.warning(f"{self.path} стал короче смещения, чтение с начала")
+            position = self._line = 0
+        with open(self.path, "rb") as f:
+            f.seek(position)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                position += len(raw)
+                self._line += 1
+                self.offset = position
+                yield raw.decode("utf-8")
+        self.offset = position
+
+    def follow(self, poll_interval=None, stop=None):
+        """Как tail -f: отдаёт новые сигналы по мере появления, пока не выставлен stop"""
+        poll_interval = config.SIGNAL_POLL_INTERVAL if poll_interval is None else poll_interval
+        while stop is None or not stop.is_set():
+            received = False
+            for signal in self.poll():
+                received = True
+                yield signal
+            if not received:
+                time.sleep(poll_interval)
+
+
+class CsvSource(_LineSource):
+    """CSV с заголовком из полей SIGNAL_FIELDS; колонка row - номер строки листа"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._header = None
+
+    def records(self, since=None):
+        if not since:
+            self._header = None
+        elif self._header is None:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                self._header = next(csv.reader(f))
+        for line in self._lines(since):
+            values = next(csv.reader(io.StringIO(line)), None)
+            if not values:
+                continue
+            if self._header is None:
+                self._header = [name.strip() for name in values]
+                continue
+            record = dict(zip(self._header, values))
+            yield make_signal(record.get("row"), record)
+
+
+class JsonlSource(_LineSource):
+    """JSON Lines: по объекту сигнала на строку, поле row - номер строки листа"""
+
+    def records(self, since=None):
+        for line in self._lines(since):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Пропущена некорректная строка {self._line} в {self.path}")
+                continue
+            yield make_signal(record.get("row"), record)
+
+
+class SqliteSource(SignalSource):
+    """Таблица SQLite с колонкой row (номер строки листа); смещение - наибольшее
+    значение version_column среди прочитанных.
+
+    По умолчанию это rowid (новые сигналы). Если поставщик ведёт колонку
+    версии, обновляемую при каждом изменении строки, читаются и изменённые.
+    """
+
+    def __init__(self, path, table="signals", version_column="rowid"):
+        super().__init__(path)
+        self.table = table
+        self.version_column = version_column
+
+    def records(self, since=None):
+        query = (
+            f"SELECT {self.version_column} AS _version, * FROM {self.table} "
+            f"WHERE {self.version_column} > ? ORDER BY {self.version_column}"
+        )
+        with closing(sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(query, (since if since is not None else -1,))
+            while True:
+                rows = cursor.fetchmany(config.SIGNAL_FETCH_SIZE)
+                if not rows:
+                    break
+                for values in rows:
+                    record = dict(values)
+                    self.offset = record["_version"]
+                    yield make_signal(record.get("row"), record)
+
+
+SOURCE_TYPES = {
+    ".xlsx": ExcelSource,
+    ".csv": CsvSource,
+    ".jsonl": JsonlSource,
+    ".sqlite": SqliteSource,
+    ".db": SqliteSource,
+}
+
+
+def open_source(path):
+    """Источник по расширению файла"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SOURCE_TYPES:
+        raise ValueError(f"Неизвестный формат источника сигналов: {path}")
+    return SOURCE_TYPES[extension](path)
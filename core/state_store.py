@@ -0,0 +1,354 @@
+import itertools
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from utils.fixed_point import SCALE, to_units
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Статусы ордеров как в API MEXC; открытые ещё могут исполниться
+OPEN_STATUSES = ("NEW", "PARTIALLY_FILLED")
+ORDER_COLUMNS = (
+    "id", "order_id", "row", "symbol", "side", "type", "price_units", "quantity_units",
+    "filled_units", "status", "created_at", "updated_at",
+)
+# Состояние строк одним запросом: последний ордер строки, его исполнения
+# (по строке результата на исполнение) и изменённый ботом статус сигнала
+ROW_STATES_QUERY = f"""
+WITH wanted (row) AS (SELECT value FROM json_each(?)),
+last_orders (row, id) AS (
+    SELECT row, MAX(id) FROM orders WHERE row IN (SELECT row FROM wanted) GROUP BY row
+)
+SELECT wanted.row AS state_row, {", ".join(f"orders.{column}" for column in ORDER_COLUMNS)},
+    signals.status AS signal_status,
+    fills.price_units AS fill_price_units, fills.quantity_units AS fill_quantity_units, fills.time AS fill_time
+FROM wanted
+LEFT JOIN last_orders ON last_orders.row = wanted.row
+LEFT JOIN orders ON orders.id = last_orders.id
+LEFT JOIN changes ON changes.row = wanted.row AND changes.signal_changed
+LEFT JOIN signals ON signals.row = changes.row
+LEFT JOIN fills ON fills.order_ref = orders.id
+ORDER BY wanted.row, fills.id
+"""
+
+
+def state_path(workbook_path, sheet_name):
+    """Файл хранилища листа: строки разных листов одной книги не должны смешиваться"""
+    return f"{workbook_path}.{sheet_name}.state.sqlite"
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    row INTEGER PRIMARY KEY,
+    ticker TEXT,
+    status TEXT,
+    entry_units INTEGER,
+    exit_units INTEGER,
+    planned_units INTEGER,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS signals_ticker ON signals (ticker);
+CREATE INDEX IF NOT EXISTS signals_status ON signals (status);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    row INTEGER,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    type TEXT,
+    price_units INTEGER NOT NULL,
+    quantity_units INTEGER NOT NULL,
+    filled_units INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS orders_order_id ON orders (order_id);
+CREATE INDEX IF NOT EXISTS orders_row ON orders (row);
+CREATE INDEX IF NOT EXISTS orders_symbol_status ON orders (symbol, status);
+CREATE INDEX IF NOT EXISTS orders_status ON orders (status);
+
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_ref INTEGER NOT NULL REFERENCES orders (id),
+    trade_id TEXT,
+    price_units INTEGER NOT NULL,
+    quantity_units INTEGER NOT NULL,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS fills_order_ref ON fills (order_ref);
+CREATE INDEX IF NOT EXISTS fills_trade_id ON fills (trade_id);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    ref TEXT,
+    row INTEGER,
+    old_status TEXT,
+    new_status TEXT,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS transitions_row ON transitions (row);
+
+CREATE TABLE IF NOT EXISTS changes (
+    row INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    signal_changed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class StateStore:
+    """Транзакционное хранилище сигналов, ордеров, исполнений и смены статусов.
+
+    SQLite в режиме WAL рядом с книгой, отдельный файл на лист: каждое событие - отдельная короткая
+    транзакция, поэтому падение посреди сохранения книги ничего не теряет.
+    Строки, изменённые после последней выгрузки, копятся в таблице changes;
+    их переносит в книгу ExcelExporter.
+    """
+
+    def __init__(self, path, clock=datetime.now):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.RLock()
+        # Исполнения бумажной биржи приходят из потока цен
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={config.STATE_STORE_SYNCHRONOUS}")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        last = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+        self._seq = itertools.count(last + 1)
+
+    def _now(self):
+        return self._clock().strftime(TIME_FORMAT)
+
+    def _touch(self, row, signal_changed=False):
+        """Помечает строку книги для выгрузки; статус сигнала выгружается, только если его менял бот"""
+        if row is not None:
+            self._conn.execute(
+                "INSERT INTO changes (row, seq, signal_changed) VALUES (?, ?, ?) "
+                "ON CONFLICT (row) DO UPDATE SET seq = excluded.seq, "
+                "signal_changed = MAX(changes.signal_changed, excluded.signal_changed)",
+                (row, next(self._seq), int(signal_changed))
+            )
+
+    def _transition(self, kind, ref, row, old, new):
+        self._conn.execute(
+            "INSERT INTO transitions (kind, ref, row, old_status, new_status, time) VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, ref, row, old, new, self._now())
+        )
+
+    def sync_signals(self, batch):
+        """Сохраняет сигналы пакета одним executemany; неизменённые строки не переписываются"""
+        now = self._now()
+        rows = zip(
+            batch.rows, (batch.ticker_at(i) for i in range(len(batch))), batch.statuses,
+            batch.entry_price, batch.exit_price, batch.planned_amount, itertools.repeat(now)
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO signals (row, ticker, status, entry_units, exit_units, planned_units, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (row) DO UPDATE SET ticker = excluded.ticker, status = excluded.status, "
+                "entry_units = excluded.entry_units, exit_units = excluded.exit_units, "
+                "planned_units = excluded.planned_units, updated_at = excluded.updated_at "
+                "WHERE signals.ticker IS NOT excluded.ticker OR signals.status IS NOT excluded.status "
+                "OR signals.entry_units IS NOT excluded.entry_units OR signals.exit_units IS NOT excluded.exit_units "
+                "OR signals.planned_units IS NOT excluded.planned_units",
+                rows
+            )
+
+    def record_signal_status(self, row, status):
+        """Смена статуса сигнала (колонка B)"""
+        with self._lock, self._conn:
+            current = self._conn.execute("SELECT status FROM signals WHERE row = ?", (row,)).fetchone()
+            old = current["status"] if current else None
+            if current is not None and old == status:
+                return
+            self._conn.execute(
+                "INSERT INTO signals (row, status, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (row) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at",
+                (row, status, self._now())
+            )
+            self._transition("signal", None, row, old, status)
+            self._touch(row, signal_changed=True)
+
+    def record_order(self, order_id, row, symbol, side, type, price, quantity, status="NEW"):
+        """Размещённый ордер; возвращает его внутренний id"""
+        now = self._now()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO orders (order_id, row, symbol, side, type, price_units, quantity_units, status, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(order_id), row, symbol, side, type, to_units(price), to_units(quantity), status, now, now)
+            )
+            self._transition("order", str(order_id), row, None, status)
+            self._touch(row)
+            return cursor.lastrowid
+
+    def _find_order(self, order_id):
+        """Последний ордер с таким идентификатором биржи"""
+        return self._conn.execute(
+            "SELECT * FROM orders WHERE order_id = ? ORDER BY id DESC LIMIT 1", (str(order_id),)
+        ).fetchone()
+
+    def get_order(self, order_id):
+        with self._lock:
+            order = self._find_order(order_id)
+            return dict(order) if order is not None else None
+
+    def record_fill(self, order_id, price, quantity, filled_at=None, trade_id=None):
+        """Исполнение (полное или частичное) ордера; статус открытого ордера пересчитывается.
+
+        Сделка с уже записанным trade_id повторно не учитывается (False). Сделка с trade_id
+        сначала замещает записи без trade_id (догоняющие по executedQty), исполнение ордера
+        не превышает его количества, а завершённый статус не меняется.
+        """
+        filled_at = (filled_at or self._clock()).strftime(TIME_FORMAT)
+        with self._lock, self._conn:
+            order = self._find_order(order_id)
+            if order is None:
+                logger.warning(f"Исполнение неизвестного ордера {order_id} пропущено")
+                return False
+            if trade_id is not None and self._conn.execute(
+                "SELECT 1 FROM fills WHERE trade_id = ? LIMIT 1", (trade_id,)
+            ).fetchone():
+                return False
+            quantity_units = to_units(quantity)
+            covered = 0
+            if trade_id is not None:
+                covered = self._replace_untracked_fills(order["id"], quantity_units)
+            added = max(0, min(quantity_units - covered, order["quantity_units"] - order["filled_units"]))
+            if covered + added <= 0:
+                return False
+            self._conn.execute(
+                "INSERT INTO fills (order_ref, trade_id, price_units, quantity_units, time) VALUES (?, ?, ?, ?, ?)",
+                (order["id"], trade_id, to_units(price), covered + added, filled_at)
+            )
+            filled = order["filled_units"] + added
+            status = order["status"]
+            if status in OPEN_STATUSES:
+                status = "FILLED" if filled >= order["quantity_units"] else "PARTIALLY_FILLED"
+            self._conn.execute(
+                "UPDATE orders SET filled_units = ?, status = ?, updated_at = ? WHERE id = ?",
+                (filled, status, filled_at, order["id"])
+            )
+            if status != order["status"]:
+                self._transition("order", order["order_id"], order["row"], order["status"], status)
+            self._touch(order["row"])
+            return added > 0
+
+    def _replace_untracked_fills(self, order_ref, quantity_units):
+        """Уменьшает записи без trade_id на количество сделки; возвращает уже учтённую часть"""
+        covered = 0
+        fills = self._conn.execute(
+            "SELECT id, quantity_units FROM fills WHERE order_ref = ? AND trade_id IS NULL ORDER BY id",
+            (order_ref,)
+        ).fetchall()
+        for fill in fills:
+            take = min(fill["quantity_units"], quantity_units - covered)
+            if take <= 0:
+                break
+            if take == fill["quantity_units"]:
+                self._conn.execute("DELETE FROM fills WHERE id = ?", (fill["id"],))
+            else:
+                self._conn.execute(
+                    "UPDATE fills SET quantity_units = quantity_units - ? WHERE id = ?", (take, fill["id"])
+                )
+            covered += take
+        return covered
+
+    def update_order_status(self, order_id, status):
+        """Статус ордера без исполнения (например, отмена)"""
+        with self._lock, self._conn:
+            order = self._find_order(order_id)
+            if order is None or order["status"] == status:
+                return False
+            self._conn.execute(
+                "UPDATE orders SET status = ?, updated_at = ? WHERE id = ?", (status, self._now(), order["id"])
+            )
+            self._transition("order", order["order_id"], order["row"], order["status"], status)
+            self._touch(order["row"])
+            return True
+
+    def orders(self, row=None, symbol=None, status=None):
+        """Ордера по строке, символу и статусам (строка или кортеж) в порядке размещения"""
+        conditions, params = [], []
+        if row is not None:
+            conditions.append("row = ?")
+            params.append(row)
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        if status is not None:
+            statuses = (status,) if isinstance(status, str) else tuple(status)
+            conditions.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return [dict(order) for order in self._conn.execute(f"SELECT * FROM orders{where} ORDER BY id", params)]
+
+    def open_orders(self, symbol=None):
+        return self.orders(symbol=symbol, status=OPEN_STATUSES)
+
+    def rows_with_order(self, side):
+        """Строки, последний ордер которых на стороне side не отменён или исполнен хотя бы частично"""
+        with self._lock:
+            return {
+                row for (row,) in self._conn.execute(
+                    "SELECT row FROM orders WHERE id IN "
+                    "(SELECT MAX(id) FROM orders WHERE side = ? AND row IS NOT NULL GROUP BY row) "
+                    "AND (status != 'CANCELED' OR filled_units > 0)",
+                    (side,)
+                )
+            }
+
+    def row_states(self, rows):
+        """Последний ордер строки с агрегатом его исполнений и изменённый ботом статус сигнала: {row: dict}"""
+        states = {}
+        with self._lock:
+            result = self._conn.execute(ROW_STATES_QUERY, (json.dumps([int(row) for row in rows]),)).fetchall()
+        # Стоимость суммируется целыми Python: в SQLite произведение цены на количество переполняется
+        for record in result:
+            state = states.get(record["state_row"])
+            if state is None:
+                order = {column: record[column] for column in ORDER_COLUMNS} if record["id"] is not None else None
+                state = states[record["state_row"]] = {
+                    "order": order, "fill": None, "signal_status": record["signal_status"]
+                }
+            if record["fill_quantity_units"] is None:
+                continue
+            fill = state["fill"] or {"quantity_units": 0, "cost": 0}
+            fill["time"] = record["fill_time"]
+            fill["quantity_units"] += record["fill_quantity_units"]
+            fill["cost"] += record["fill_price_units"] * record["fill_quantity_units"]
+            state["fill"] = fill
+        for state in states.values():
+            if state["fill"] is not None:
+                state["fill"]["cost_units"] = state["fill"].pop("cost") // SCALE
+        return states
+
+    def pending_changes(self):
+        """Строки, изменённые после последней выгрузки: {row: seq}"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT row, seq FROM changes").fetchall())
+
+    def has_changes(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM changes LIMIT 1").fetchone() is not None
+
+    def mark_exported(self, changes):
+        """Снимает отметки выгруженных строк, если они не менялись после чтения"""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM changes WHERE row = ? AND seq = ?", changes.items())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
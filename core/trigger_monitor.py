@@ -0,0 +1,74 @@
+import threading
+from bisect import bisect_left, bisect_right
+from utils.fixed_point import to_units
+from utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+class TriggerMonitor:
+    """Таблица последних цен и уровни входа/выхода сигналов по тикерам.
+
+    Уровни каждого тикера отсортированы, поэтому пересечение проверяется
+    двумя бинарными поисками на тик. Сработавшие строки копятся до тех пор,
+    пока их не заберёт consume().
+    """
+
+    def __init__(self, batch, price_cache=None):
+        self.price_cache = price_cache
+        self.last_prices = {}
+        self._triggered = set()
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self.reset(batch)
+
+    def reset(self, batch):
+        """Перестраивает уровни по новому пакету сигналов"""
+        levels = {}
+        for i in range(len(batch)):
+            ticker_levels = levels.setdefault(batch.ticker_at(i), [])
+            for price in (batch.entry_price[i], batch.exit_price[i]):
+                if price > 0:
+                    ticker_levels.append((price, batch.rows[i]))
+        with self._lock:
+            self._levels = {}
+            for ticker, ticker_levels in levels.items():
+                ticker_levels.sort()
+                self._levels[ticker] = ([price for price, _ in ticker_levels], [row for _, row in ticker_levels])
+        logger.debug(f"Отслеживается уровней: {sum(len(p) for p, _ in self._levels.values())}")
+
+    def symbols(self):
+        return list(self._levels)
+
+    def on_price(self, symbol, price):
+        """Обновляет последнюю цену и отмечает пересечённые уровни"""
+        units = to_units(price)
+        with self._lock:
+            previous = self.last_prices.get(symbol)
+            self.last_prices[symbol] = units
+            levels = self._levels.get(symbol)
+            if previous is None or previous == units or not levels:
+                crossed = []
+            else:
+                prices, rows = levels
+                low, high = min(previous, units), max(previous, units)
+                crossed = rows[bisect_left(prices, low):bisect_right(prices, high)]
+            if crossed:
+                self._triggered.update(crossed)
+                self._event.set()
+        if self.price_cache is not None:
+            self.price_cache.update({symbol: price})
+        if crossed:
+            logger.info(f"{symbol} {price}: пересечены уровни в строках {sorted(crossed)}")
+
+    def wait(self, timeout=None):
+        """Ждёт срабатывания хотя бы одного уровня"""
+        return self._event.wait(timeout)
+
+    def consume(self):
+        """Забирает накопленные сработавшие строки"""
+        with self._lock:
+            rows = sorted(self._triggered)
+            self._triggered.clear()
+            self._event.clear()
+        return rows
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+from contextlib import closing
+from datetime import date, datetime, time
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+TEMPORAL_TYPES = {"datetime": datetime, "date": date, "time": time}
+
+
+class WorkbookCache:
+    """Колоночный снимок листа в SQLite рядом с книгой.
+
+    Снимок действителен, пока не изменились размер, mtime и хэш содержимого
+    файла книги. Даты хранятся строками ISO, их типы - в отдельной таблице.
+    """
+
+    def __init__(self, workbook_path, sheet_name, columns):
+        self.workbook_path = workbook_path
+        self.cache_path = f"{workbook_path}.cache.sqlite"
+        self.sheet_name = sheet_name
+        self.columns = list(columns)
+
+    def _file_hash(self):
+        """SHA-256 содержимого книги"""
+        digest = hashlib.sha256()
+        with open(self.workbook_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _connect(self):
+        return sqlite3.connect(self.cache_path)
+
+    def load(self):
+        """Возвращает {row: record} из снимка или None, если снимок недействителен"""
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            stat = os.stat(self.workbook_path)
+            with closing(self._connect()) as conn, conn:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+                if meta.get("sheet") != self.sheet_name or meta.get("columns") != ",".join(self.columns):
+                    return None
+
+                same_stat = meta.get("mtime_ns") == str(stat.st_mtime_ns) and meta.get("size") == str(stat.st_size)
+                if not same_stat or config.WORKBOOK_CACHE_VERIFY_HASH:
+                    if meta.get("sha256") != self._file_hash():
+                        return None
+                    if not same_stat:
+                        # Файл перезаписан без изменений: обновляем отметку времени
+                        conn.executemany(
+                            "REPLACE INTO meta (key, value) VALUES (?, ?)",
+                            [("mtime_ns", str(stat.st_mtime_ns)), ("size", str(stat.st_size))]
+                        )
+
+                records = {}
+                for values in conn.execute(f"SELECT row, {', '.join(self.columns)} FROM rows ORDER BY row"):
+                    records[values[0]] = dict(zip(self.columns, values[1:]))
+                for row, column, kind in conn.execute("SELECT row, col, kind FROM temporal"):
+                    records[row][column] = TEMPORAL_TYPES[kind].fromisoformat(records[row][column])
+            return records
+        except (sqlite3.Error, KeyError, ValueError, OSError) as e:
+            logger.warning(f"Снимок книги повреждён, будет пересоздан: {str(e)}")
+            return None
+
+    def store(self, records):
+        """Сохраняет снимок для текущего состояния файла книги"""
+        try:
+            stat = os.stat(self.workbook_path)
+            rows = []
+            temporal = []
+            for row, record in records.items():
+                values = []
+                for column in self.columns:
+                    value = record.get(column)
+                    kind = next((name for name, cls in TEMPORAL_TYPES.items() if type(value) is cls), None)
+                    if kind:
+                        temporal.append((row, column, kind))
+                        value = value.isoformat()
+                    values.append(value)
+                rows.append([row] + values)
+
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DROP TABLE IF EXISTS rows")
+                conn.execute(f"CREATE TABLE rows (row INTEGER PRIMARY KEY, {', '.join(self.columns)})")
+                conn.execute("DROP TABLE IF EXISTS temporal")
+                conn.execute("CREATE TABLE temporal (row INTEGER, col TEXT, kind TEXT)")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                placeholders = ", ".join("?" * (len(self.columns) + 1))
+                conn.executemany(f"INSERT INTO rows VALUES ({placeholders})", rows)
+                conn.executemany("INSERT INTO temporal VALUES (?, ?, ?)", temporal)
+                conn.executemany("REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                    ("sheet", self.sheet_name),
+                    ("columns", ",".join(self.columns)),
+                    ("mtime_ns", str(stat.st_mtime_ns)),
+                    ("size", str(stat.st_size)),
+                    ("sha256", self._file_hash())
+                ])
+            logger.debug(f"Снимок книги сохранён: {self.cache_path}")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Не удалось сохранить снимок книги: {str(e)}")
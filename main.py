@@ -1,148 +1,431 @@
-import os
-import sys
-from decimal import Decimal
-from utils.api_client import MEXCClient
-from utils.logger import setup_logger
-from core.excel_manager import ExcelManager
-from core.order_executor import OrderExecutor
-from core.balance_calculator import BalanceCalculator
-from core.signal_processor import SignalProcessor
-from strategies.allocation import FundAllocator
-import config
-
-# Настройка логгера
-logger = setup_logger()
-
-def initialize_components():
-	"""Инициализация всех компонентов приложения"""
-	try:
-		# Проверка путей
-		BASE_DIR = r"D:\mexc_trading_bot"
-		CONFIG_DIR = os.path.join(BASE_DIR, "config")
-		DATA_DIR = os.path.join(BASE_DIR, "data")
-		EXCEL_PATH = os.path.join(DATA_DIR, "Fiba.xlsx")
-
-		# Проверка существования файлов
-		required_files = {
-			"API ключи": os.path.join(CONFIG_DIR, "api_keys.json"),
-			"Ключ шифрования": os.path.join(CONFIG_DIR, "secret.key"),
-			"Excel файл": EXCEL_PATH
-		}
-
-		for name, path in required_files.items():
-			if not os.path.exists(path):
-				raise FileNotFoundError(f"{name} не найден: {path}")
-
-		logger.info("=== НАСТРОЙКА СКРИПТА ===")
-		logger.info(f"Работа с файлом: {EXCEL_PATH}")
-
-		# Инициализация компонентов
-		api = MEXCClient()
-		excel = ExcelManager(EXCEL_PATH)
-		portfolio = BalanceCalculator(api)
-		signal_processor = SignalProcessor(excel)
-		order_executor = OrderExecutor(api, excel, dry_run=config.DRY_RUN)
-
-		return api, excel, portfolio, signal_processor, order_executor
-
-	except Exception as e:
-		logger.critical(f"Ошибка инициализации: {str(e)}")
-		raise
-
-def main():
-	try:
-		# Инициализация
-		api, excel, portfolio, signal_processor, order_executor = initialize_components()
-
-		# 1. Проверка подключения к API
-		logger.info("\n=== ПРОВЕРКА ПОДКЛЮЧЕНИЯ ===")
-		# Проверка структуры ответа API
-		try:
-			test_balance = api.get_account_balance()
-			logger.debug(f"Структура ответа API: {test_balance}")
-		except Exception as e:
-			logger.error(f"Ошибка теста API: {str(e)}")
-			return
-
-		# 2. Расчет баланса
-		logger.info("\n=== РАСЧЕТ БАЛАНСА ===")
-		deposit_info = portfolio.calculate_total_deposit()
-		logger.info(
-			f"Общий баланс: {deposit_info['total']:.2f} USDT\n"
-			f"- Свободно: {deposit_info['free_usdt']:.2f}\n"
-			f"- Заблокировано: {deposit_info['locked_usdt']:.2f}\n"
-			f"- Эквивалент: {deposit_info['equivalent']:.2f}"
-		)
-
-		if deposit_info['total'] < config.MIN_BALANCE and deposit_info['equivalent'] < config.MIN_EQUIVALENT:
-			logger.error(
-				f"Недостаточно средств:\n"
-				f"Требуется: {config.MIN_BALANCE} USDT или {config.MIN_EQUIVALENT} эквивалента\n"
-				f"Текущий баланс: {deposit_info['total']:.2f} USDT + {deposit_info['equivalent']:.2f} эквивалента"
-			)
-			return
-
-		# 3. Обработка сигналов
-		logger.info("\n=== ОБРАБОТКА СИГНАЛОВ ===")
-		signals = signal_processor.get_active_signals()
-		
-		if not signals:
-			logger.warning(
-				"Нет активных сигналов. Проверьте:\n"
-				"- Статус в колонке B (должно быть 'в работе')\n"
-				"- Наличие данных в строках 6 и ниже\n"
-				"- Корректность формата файла"
-			)
-			return
-
-		logger.info(f"Найдено активных сигналов: {len(signals)}")
-
-		# 4. Обновление цен
-		active_tickers = list({s['ticker'] for s in signals})
-		prices = api.get_prices(active_tickers)
-		excel.update_prices(prices)
-		logger.info(f"Обновлены цены для {len(prices)} тикеров")
-
-		# 5. Распределение средств
-		allocations = FundAllocator.calculate_allocations(
-			signals,
-			Decimal(str(deposit_info["total"])) if not isinstance(deposit_info["total"], Decimal) else deposit_info["total"]
-			)
-		
-		for alloc in allocations:
-			excel.sheet[f"I{alloc['row']}"] = float(alloc['amount'])
-		logger.info(f"Распределены средства для {len(allocations)} сигналов")
-
-		# 6. Обработка ордеров
-		logger.info("\n=== ОБРАБОТКА ОРДЕРОВ ===")
-		for signal in signals:
-			try:
-				if signal['status'] == 'в работе':
-					order_executor.place_take_profit_buy(
-						symbol=signal['ticker'],
-						price=float(signal['entry_price']),
-						quantity=float(signal['planned_amount'] / signal['entry_price']),
-						row=signal['row']
-					)
-			except Exception as e:
-				logger.error(f"Ошибка обработки сигнала в строке {signal['row']}: {str(e)}")
-				continue
-
-		# 7. Сохранение результатов
-		excel.save()
-		logger.info("\n=== РЕЗУЛЬТАТЫ ===")
-		logger.info("Все данные успешно сохранены в Excel")
-
-	except KeyboardInterrupt:
-		logger.info("Скрипт остановлен пользователем")
-	except Exception as e:
-		logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА: {str(e)}", exc_info=True)
-	finally:
-		logger.info("\n=== СКРИПТ ЗАВЕРШЕН ===")
-
-if __name__ == "__main__":
-	# Добавляем путь к проекту в PYTHONPATH
-	sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-	
-	# Запуск главной функции
-	main()
\ No newline at end of file
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from utils.api_client import MEXCClient
+from utils.logger import setup_logger, configure_logging, flush_logging
+from utils.fixed_point import from_units
+from utils.price_cache import price_cache
+from utils.metrics import metrics
+from core.excel_manager import ExcelManager
+from core.excel_exporter import ExcelExporter
+from core.state_store import StateStore, state_path
+from core.order_executor import OrderExecutor
+from core.order_reconciler import OrderReconciler
+from core.account_state import AccountState
+from core.paper_exchange import PaperExchange
+from core.balance_calculator import BalanceCalculator
+from core.signal_processor import SignalProcessor
+from core.signal_sources import open_source
+from strategies.allocation import FundAllocator
+import config
+
+# Настройка логгера
+logger = setup_logger()
+
+def initialize_components(excel_path=None, sheet_name=None, api_keys_path=None, key_path=None):
+	"""Инициализация всех компонентов приложения; по умолчанию пути из config"""
+	try:
+		EXCEL_PATH = excel_path or config.EXCEL_PATH
+		api_keys_path = api_keys_path or config.API_KEYS_PATH
+		key_path = key_path or config.SECRET_KEY_PATH
+
+		# Проверка существования файлов
+		required_files = {
+			"API ключи": api_keys_path,
+			"Ключ шифрования": key_path,
+			"Excel файл": EXCEL_PATH
+		}
+
+		for name, path in required_files.items():
+			if not os.path.exists(path):
+				raise FileNotFoundError(f"{name} не найден: {path}")
+
+		logger.info("=== НАСТРОЙКА СКРИПТА ===")
+		logger.info(f"Работа с файлом: {EXCEL_PATH}")
+
+		# Инициализация компонентов
+		api = MEXCClient(api_keys_path=api_keys_path, key_path=key_path)
+		excel = ExcelManager(EXCEL_PATH, sheet_name=sheet_name)
+		state = StateStore(state_path(EXCEL_PATH, excel.sheet_name)) if config.STATE_STORE_ENABLED else None
+		account = AccountState(api)
+		portfolio = BalanceCalculator(api, account)
+		source = open_source(config.SIGNAL_SOURCE) if config.SIGNAL_SOURCE else None
+		signal_processor = SignalProcessor(excel, source=source, state_store=state)
+		paper = PaperExchange() if config.DRY_RUN and config.PAPER_TRADING else None
+		if paper is not None and state is not None:
+			# Книга бумажной биржи живёт в памяти: открытые ордера прошлого запуска берутся из хранилища
+			paper.restore(state.open_orders())
+		order_executor = OrderExecutor(
+			api, excel, dry_run=config.DRY_RUN, account_state=account, paper_exchange=paper,
+			state_store=state
+		)
+
+		return api, excel, portfolio, signal_processor, order_executor
+
+	except Exception as e:
+		logger.critical(f"Ошибка инициализации: {str(e)}")
+		raise
+
+def run_pipeline(api, excel, portfolio, signal_processor, order_executor):
+	"""Один проход: баланс, сигналы, цены, распределение, ордера, сохранение.
+
+	Возвращает сводку по сигналам и ордерам или None, если проход остановлен.
+	"""
+	# 2. Расчет баланса
+	logger.info("\n=== РАСЧЕТ БАЛАНСА ===")
+	with metrics.stage("balance"):
+		deposit_info = portfolio.calculate_total_deposit()
+		logger.info(
+			f"Общий баланс: {deposit_info['total']:.2f} USDT\n"
+			f"- Свободно: {deposit_info['free_usdt']:.2f}\n"
+			f"- Заблокировано: {deposit_info['locked_usdt']:.2f}\n"
+			f"- Эквивалент: {deposit_info['equivalent']:.2f}"
+		)
+
+	if deposit_info['total'] < config.MIN_BALANCE and deposit_info['equivalent'] < config.MIN_EQUIVALENT:
+		logger.error(
+			f"Недостаточно средств:\n"
+			f"Требуется: {config.MIN_BALANCE} USDT или {config.MIN_EQUIVALENT} эквивалента\n"
+			f"Текущий баланс: {deposit_info['total']:.2f} USDT + {deposit_info['equivalent']:.2f} эквивалента"
+		)
+		return
+
+	# 3. Обработка сигналов
+	logger.info("\n=== ОБРАБОТКА СИГНАЛОВ ===")
+	with metrics.stage("signals"):
+		signals = signal_processor.get_signal_batch()
+	
+	if not signals:
+		logger.warning(
+			"Нет активных сигналов. Проверьте:\n"
+			"- Статус в колонке B (должно быть 'в работе')\n"
+			"- Наличие данных в строках 6 и ниже\n"
+			"- Корректность формата файла"
+		)
+		return
+
+	logger.info(f"Найдено активных сигналов: {len(signals)}")
+
+	# 4. Обновление цен
+	with metrics.stage("prices"):
+		active_tickers = signals.unique_tickers()
+		prices = api.get_prices(active_tickers)
+		excel.update_prices(prices)
+		logger.info(f"Обновлены цены для {len(prices)} тикеров")
+		if order_executor.paper is not None:
+			# Бумажная биржа исполняет ордера по тем же ценам, что видит конвейер
+			for symbol, price in prices.items():
+				order_executor.paper.on_price(symbol, price)
+
+	# 5. Распределение средств
+	with metrics.stage("allocation"):
+		allocations = FundAllocator.allocate(signals, deposit_info["total"])
+		excel.write_column("I", allocations.rows, allocations.amounts_as_floats())
+		logger.info(f"Распределены средства для {len(allocations)} сигналов")
+
+	# 6. Сверка размещённых ранее ордеров: исполнения и отмены с прошлого прохода
+	placed = set()
+	if order_executor.state is not None:
+		with metrics.stage("reconcile"):
+			OrderReconciler(api, order_executor.state, paper_exchange=order_executor.paper).reconcile()
+			placed = order_executor.state.rows_with_order("BUY")
+
+	# 7. Обработка ордеров
+	logger.info("\n=== ОБРАБОТКА ОРДЕРОВ ===")
+	with metrics.stage("orders"):
+		in_work = signals.select(signals.where_status('в работе'))
+		quantities = in_work.quantities()
+		orders = []
+		skipped = 0
+		for i in range(len(in_work)):
+			if in_work.rows[i] in placed:
+				# TP BUY по строке уже стоит или исполнен - второй был бы дубликатом
+				skipped += 1
+				continue
+			if in_work.entry_price[i] <= 0:
+				logger.error(f"Ошибка обработки сигнала в строке {in_work.rows[i]}: не задана цена входа")
+				continue
+			orders.append({
+				'symbol': in_work.ticker_at(i),
+				'price': float(from_units(in_work.entry_price[i])),
+				'quantity': float(from_units(quantities[i])),
+				'row': in_work.rows[i]
+			})
+
+		if skipped:
+			logger.info(f"Пропущено строк с уже размещённым TP BUY: {skipped}")
+
+		# Ордера отправляются пакетами или параллельно, ошибки изолированы по строкам
+		if config.BATCH_ORDERS:
+			for order in orders:
+				order_executor.queue_take_profit_buy(**order)
+			results = order_executor.submit_queued()
+		else:
+			results = asyncio.run(order_executor.place_take_profit_buys(orders))
+		for result in results:
+			if 'error' in result:
+				logger.error(f"Ошибка обработки сигнала в строке {result['row']}: {str(result['error'])}")
+
+	# 8. Сохранение результатов
+	with metrics.stage("save"):
+		save_results(excel, order_executor)
+	logger.info("\n=== РЕЗУЛЬТАТЫ ===")
+	logger.info("Все данные успешно сохранены в Excel")
+
+	summary = {
+		"signals": len(signals),
+		"orders": sum(1 for result in results if 'result' in result),
+		"errors": sum(1 for result in results if 'error' in result),
+		"skipped": skipped
+	}
+	metrics.inc("orders_placed_total", summary["orders"])
+	metrics.inc("order_errors_total", summary["errors"])
+	return summary
+
+def save_results(excel, order_executor):
+	"""Сохранение книги; с хранилищем состояния - выгрузка изменённых в нём строк"""
+	if order_executor.state is not None:
+		ExcelExporter(order_executor.state, excel).sync()
+	else:
+		excel.save()
+
+def main():
+	try:
+		# Инициализация
+		with metrics.stage("init"):
+			api, excel, portfolio, signal_processor, order_executor = initialize_components()
+
+		# 1. Проверка подключения к API
+		logger.info("\n=== ПРОВЕРКА ПОДКЛЮЧЕНИЯ ===")
+		# Проверка структуры ответа API
+		try:
+			# Первая загрузка балансов в локальное состояние аккаунта
+			test_balance = order_executor.account.load()
+			logger.debug(f"Структура ответа API: {test_balance}")
+		except Exception as e:
+			logger.error(f"Ошибка теста API: {str(e)}")
+			return
+
+		with metrics.stage("pipeline"):
+			run_pipeline(api, excel, portfolio, signal_processor, order_executor)
+			excel.wait_for_save()
+
+	except KeyboardInterrupt:
+		logger.info("Скрипт остановлен пользователем")
+	except Exception as e:
+		logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА: {str(e)}", exc_info=True)
+	finally:
+		_export_metrics()
+		logger.info("\n=== СКРИПТ ЗАВЕРШЕН ===")
+
+def _export_metrics(periodic=False):
+	"""Экспорт метрик прогона; ошибка записи не влияет на торговлю"""
+	try:
+		path = metrics.export_if_due() if periodic else metrics.export()
+		if path:
+			logger.debug(f"Метрики сохранены: {path}")
+	except Exception as e:
+		logger.warning(f"Не удалось сохранить метрики: {str(e)}")
+
+def _process_entry(entry):
+	"""Прогон одной записи манифеста в процессе пула; ошибка не выходит за пределы записи"""
+	name = entry.get("name") or entry["workbook"]
+	started = time.perf_counter()
+	excel = None
+	try:
+		api, excel, portfolio, signal_processor, order_executor = initialize_components(
+			excel_path=entry["workbook"],
+			sheet_name=entry.get("sheet"),
+			api_keys_path=entry.get("keys"),
+			key_path=entry.get("secret")
+		)
+		order_executor.account.load()
+		summary = run_pipeline(api, excel, portfolio, signal_processor, order_executor)
+		return {"name": name, "status": "ok" if summary else "skipped", "summary": summary,
+				"elapsed": time.perf_counter() - started}
+	except Exception as e:
+		logger.error(f"[{name}] Ошибка прогона: {str(e)}", exc_info=True)
+		return {"name": name, "status": "error", "error": str(e), "elapsed": time.perf_counter() - started}
+	finally:
+		if excel is not None:
+			excel.wait_for_save()
+		# Процесс пула завершается без atexit: накопленные сообщения дописываем сейчас
+		flush_logging()
+
+def _process_group(entries):
+	"""Записи одной книги идут подряд в одном процессе: параллельные сохранения затёрли бы друг друга.
+
+	Метрики процесса возвращаются вместе с результатами и сводятся в родителе.
+	"""
+	results = [_process_entry(entry) for entry in entries]
+	return {"results": results, "metrics": metrics.drain()}
+
+def _init_worker(prices):
+	"""Процесс пула начинает с общего снимка цен вместо собственного запроса"""
+	# После fork поток записи лога остался в родителе - запускаем свой
+	configure_logging()
+	price_cache.ttl = config.MANIFEST_PRICE_TTL
+	if prices:
+		price_cache.update(prices, refresh=True)
+
+def run_manifest(manifest_path, workers=None):
+	"""Параллельный прогон книг и аккаунтов из манифеста в пуле процессов.
+
+	Манифест - JSON-список записей {name, workbook, sheet, keys, secret}.
+	Цены всех символов запрашиваются один раз и передаются каждому процессу,
+	метрики процессов сводятся и экспортируются, как в обычном прогоне.
+	"""
+	try:
+		with metrics.stage("manifest"):
+			return _run_manifest(manifest_path, workers)
+	finally:
+		_export_metrics()
+
+def _run_manifest(manifest_path, workers):
+	with open(manifest_path, "r", encoding="utf-8") as f:
+		entries = json.load(f)
+	logger.info(f"\n=== МАНИФЕСТ: {len(entries)} записей ===")
+
+	try:
+		# Публичный эндпоинт, ключи не нужны
+		prices = MEXCClient(api_key="", secret_key="").get_all_prices()
+	except Exception as e:
+		logger.warning(f"Общий снимок цен не получен, процессы запросят цены сами: {str(e)}")
+		prices = {}
+
+	groups = {}
+	for i, entry in enumerate(entries):
+		groups.setdefault(os.path.abspath(entry["workbook"]), []).append(i)
+
+	results = [None] * len(entries)
+	workers = min(workers or config.MANIFEST_WORKERS, len(groups)) or 1
+	with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(prices,)) as pool:
+		futures = {
+			pool.submit(_process_group, [entries[i] for i in indices]): indices
+			for indices in groups.values()
+		}
+		for future in as_completed(futures):
+			indices = futures[future]
+			try:
+				payload = future.result()
+				metrics.merge(payload["metrics"])
+				for i, result in zip(indices, payload["results"]):
+					results[i] = result
+			except Exception as e:
+				# Процесс упал целиком (например, нехватка памяти)
+				for i in indices:
+					name = entries[i].get("name") or entries[i]["workbook"]
+					logger.error(f"[{name}] Процесс пула завершился аварийно: {str(e)}")
+					results[i] = {"name": name, "status": "error", "error": str(e), "elapsed": None}
+
+	logger.info("\n=== СВОДКА ПО МАНИФЕСТУ ===")
+	for result in results:
+		summary = result.get("summary") or {}
+		logger.info(
+			f"{result['name']}: {result['status']}, сигналов {summary.get('signals', 0)}, "
+			f"ордеров {summary.get('orders', 0)}, ошибок {summary.get('errors', 0)}"
+			+ (f" - {result['error']}" if result.get("error") else "")
+		)
+	failed = sum(1 for result in results if result["status"] == "error")
+	logger.info(f"Успешно: {len(results) - failed}, с ошибкой: {failed}")
+	return results
+
+def run_daemon():
+	"""Постоянная работа: поток цен и перезапуск конвейера при пересечении уровней"""
+	from core.history_store import HistoryStore
+	from core.trigger_monitor import TriggerMonitor
+	from utils.price_stream import PriceStream
+
+	stream = None
+	excel = None
+	try:
+		components = initialize_components()
+		api, excel, portfolio, signal_processor, order_executor = components
+
+		logger.info("\n=== РЕЖИМ ДЕМОНА ===")
+		if config.USER_DATA_STREAM_ENABLED and not config.DRY_RUN:
+			try:
+				order_executor.account.start_user_stream()
+			except Exception as e:
+				logger.warning(f"Приватный поток недоступен, балансы сверяются по интервалу: {str(e)}")
+
+		run_pipeline(*components)
+
+		monitor = TriggerMonitor(signal_processor.get_signal_batch(), price_cache=api.price_cache)
+		paper = order_executor.paper
+		store = HistoryStore() if config.HISTORY_RECORD_TICKS else None
+		reconciler = OrderReconciler(api, order_executor.state, paper_exchange=paper) if order_executor.state else None
+
+		def on_price(symbol, price):
+			monitor.on_price(symbol, price)
+			if paper is not None:
+				paper.on_price(symbol, price)
+			if store is not None:
+				store.append_ticks(symbol, [(time.time() * 1000, price, 0.0)])
+
+		def stream_symbols():
+			return set(monitor.symbols()) | set(paper.symbols() if paper is not None else ())
+
+		stream = PriceStream(stream_symbols(), on_price)
+		stream.start()
+
+		while True:
+			_export_metrics(periodic=True)
+			# Без проходов конвейера ключ приватного потока иначе истёк бы
+			order_executor.account.keepalive_if_due()
+			if not monitor.wait(timeout=config.DAEMON_IDLE_TIMEOUT):
+				if reconciler is not None:
+					reconciler.reconcile_if_due()
+				# Исполнения бумажной биржи и найденные сверкой между проходами
+				state = order_executor.state
+				if excel.is_dirty or (state is not None and state.has_changes()):
+					try:
+						save_results(excel, order_executor)
+					except Exception as e:
+						# Изменения остаются отмеченными и сохранятся на следующей итерации
+						logger.error(f"Ошибка сохранения результатов: {str(e)}")
+				continue
+			rows = monitor.consume()
+			logger.info(f"Сработали уровни в строках {rows}, перезапуск конвейера")
+			try:
+				with metrics.stage("pipeline"):
+					run_pipeline(*components)
+			except Exception as e:
+				logger.error(f"Ошибка прохода конвейера: {str(e)}", exc_info=True)
+			monitor.reset(signal_processor.get_signal_batch())
+			stream.update_symbols(stream_symbols())
+
+	except KeyboardInterrupt:
+		logger.info("Скрипт остановлен пользователем")
+	except Exception as e:
+		logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА: {str(e)}", exc_info=True)
+	finally:
+		if stream is not None:
+			stream.stop()
+			order_executor.account.stop_user_stream()
+		if excel is not None:
+			excel.wait_for_save()
+		_export_metrics()
+		logger.info("\n=== СКРИПТ ЗАВЕРШЕН ===")
+
+if __name__ == "__main__":
+	# Добавляем путь к проекту в PYTHONPATH
+	sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+	
+	parser = argparse.ArgumentParser(description="Выставление ордеров по листу сигналов")
+	mode = parser.add_mutually_exclusive_group()
+	mode.add_argument("--daemon", action="store_true", help="Постоянная работа от потока цен")
+	mode.add_argument("--manifest", metavar="FILE", help="Параллельный прогон книг и аккаунтов из манифеста")
+	args = parser.parse_args()
+
+	# Запуск главной функции
+	if args.manifest:
+		run_manifest(args.manifest)
+	elif args.daemon:
+		run_daemon()
+	else:
+		main()
\ No newline at end of file
@@ -1,55 +1,144 @@
-from decimal import Decimal, getcontext
-from utils.logger import setup_logger
-
-logger = setup_logger()
-getcontext().prec = 8  # Устанавливаем точность вычислений
-
-class FundAllocator:
-    @staticmethod
-    def calculate_allocations(signals, total_deposit):
-        """
-        Рассчитывает распределение средств с защитой от ошибок
-        """
-        try:
-            # Преобразуем total_deposit в Decimal, если это еще не сделано
-            if not isinstance(total_deposit, Decimal):
-                total_deposit = Decimal(str(total_deposit))
-            
-            deposit_percentage = Decimal('0.1')  # 10% от депозита
-            base_amount = (total_deposit * deposit_percentage).quantize(Decimal('0.00000001'))
-            
-            ticker_groups = {}
-            
-            # Группируем сигналы по тикерам
-            for signal in signals:
-                if signal['ticker'] not in ticker_groups:
-                    ticker_groups[signal['ticker']] = []
-                ticker_groups[signal['ticker']].append(signal)
-            
-            allocations = []
-            for ticker, ticker_signals in ticker_groups.items():
-                group_count = len(ticker_signals)
-                
-                # Определяем коэффициенты распределения
-                if group_count == 3:
-                    ratios = [Decimal('0.2'), Decimal('0.3'), Decimal('0.5')]
-                elif group_count == 2:
-                    ratios = [Decimal('0.5'), Decimal('0.5')]
-                else:
-                    ratios = [Decimal('1')]
-                
-                for i, signal in enumerate(ticker_signals):
-                    if i < len(ratios):
-                        allocated = (base_amount * ratios[i]).quantize(Decimal('0.00000001'))
-                        allocations.append({
-                            'row': signal['row'],
-                            'ticker': ticker,
-                            'amount': float(allocated),
-                            'entry_price': signal['entry_price']
-                        })
-            
-            return allocations
-            
-        except Exception as e:
-            logger.error(f"Ошибка расчета распределения средств: {str(e)}")
-            return []
\ No newline at end of file
+from array import array
+from core.signal_batch import SignalBatch
+from utils.fixed_point import SCALE, to_units, from_units, div_round
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+def _numpy():
+    import numpy
+    return numpy
+
+
+class AllocationResult:
+    """Результат распределения: параллельные массивы строк и сумм в единицах 1e-8"""
+
+    def __init__(self, batch, indices, amounts):
+        self.batch = batch
+        self.indices = indices
+        self.rows = array('q', batch.column('rows')[indices].tobytes()) if indices else array('q')
+        self.amounts = amounts
+
+    def __len__(self):
+        return len(self.rows)
+
+    def amounts_as_floats(self):
+        return [float(from_units(amount)) for amount in self.amounts]
+
+    def to_dicts(self):
+        """Построчное представление для кода, работающего со словарями"""
+        return [
+            {
+                'row': self.batch.rows[i],
+                'ticker': self.batch.ticker_at(i),
+                'amount': float(from_units(amount)),
+                'entry_price': from_units(self.batch.entry_price[i])
+            }
+            for i, amount in zip(self.indices, self.amounts)
+        ]
+
+
+class FundAllocator:
+    @staticmethod
+    def _ratio_units(ratios, group_size):
+        """Коэффициенты для группы; без настроенных или при неверной длине - поровну"""
+        if ratios is not None and len(ratios) != group_size:
+            logger.warning(
+                f"Коэффициенты {ratios} не подходят для группы из {group_size} сигналов, "
+                f"средства разделены поровну"
+            )
+            ratios = None
+        if ratios is None:
+            return [SCALE // group_size] * group_size
+        return [to_units(ratio) for ratio in ratios]
+
+    @staticmethod
+    def allocate(batch, total_deposit, ratio_table=None, deposit_percentage=None,
+                 ticker_ratios=None, max_exposure=None):
+        """
+        Распределяет средства по всем сигналам пакета групповой операцией.
+
+        Суммы считаются один раз на вариант коэффициентов (размер группы и
+        своя таблица тикера) и раскладываются по сигналам по позиции в группе.
+        """
+        np = _numpy()
+        ratio_table = config.ALLOCATION_RATIOS if ratio_table is None else ratio_table
+        ticker_ratios = config.TICKER_ALLOCATION_RATIOS if ticker_ratios is None else ticker_ratios
+        deposit_percentage = config.DEPOSIT_PERCENTAGE if deposit_percentage is None else deposit_percentage
+        max_exposure = config.MAX_TOTAL_EXPOSURE if max_exposure is None else max_exposure
+
+        deposit_units = to_units(total_deposit)
+        base_units = div_round(deposit_units * to_units(deposit_percentage), SCALE)
+        if not len(batch):
+            return AllocationResult(batch, [], array('q'))
+
+        # Группы по коду тикера в порядке первого появления, внутри - в порядке строк
+        codes = batch.column('ticker_codes')
+        positions = np.arange(len(codes))
+        first = np.full(len(batch.tickers), len(codes))
+        np.minimum.at(first, codes, positions)
+        order = np.argsort(first[codes], kind='stable')
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        sizes = np.diff(np.r_[starts, len(codes)])
+        rank = positions - np.repeat(starts, sizes)
+
+        # Своя таблица тикера задаёт только перечисленные размеры групп, остальные - из общей
+        group_keys = []
+        tables = []
+        table_keys = {}
+        for code, size in zip(sorted_codes[starts].tolist(), sizes.tolist()):
+            ratios = ticker_ratios.get(batch.tickers[code], {}).get(size)
+            key = (batch.tickers[code] if ratios is not None else None, size)
+            if key not in table_keys:
+                if ratios is None:
+                    ratios = ratio_table.get(size)
+                table_keys[key] = len(tables)
+                ratio_units = FundAllocator._ratio_units(ratios, size)
+                tables.append([div_round(base_units * ratio, SCALE) for ratio in ratio_units])
+            group_keys.append(table_keys[key])
+        keys = np.repeat(np.array(group_keys, dtype=np.int64), sizes)
+
+        # Суммы всех вариантов в одной таблице: строка - вариант, колонка - позиция в группе
+        lookup = np.zeros((len(tables), max(len(table) for table in tables)), dtype=np.int64)
+        for i, table in enumerate(tables):
+            lookup[i, :len(table)] = table
+        indices = order.tolist()
+        amounts = array('q', lookup[keys, rank].tobytes())
+
+        # Ограничение суммарной нагрузки на депозит (если задано)
+        cap_units = deposit_units * to_units(max_exposure) // SCALE if max_exposure else 0
+        total_units = sum(amounts)
+        if total_units > cap_units > 0:
+            logger.warning(
+                f"Сумма распределения {from_units(total_units)} превышает лимит {from_units(cap_units)}, "
+                f"суммы уменьшены пропорционально"
+            )
+            # Целые Python: произведение сумм выходит за пределы int64
+            amounts = array('q', (div_round(amount * cap_units, total_units) for amount in amounts))
+
+        return AllocationResult(batch, indices, amounts)
+
+    @staticmethod
+    def calculate_allocations(signals, total_deposit):
+        """
+        Рассчитывает распределение средств с защитой от ошибок
+        """
+        try:
+            if not isinstance(signals, SignalBatch):
+                batch = SignalBatch()
+                for signal in signals:
+                    batch.append(
+                        signal['row'], signal.get('date'), signal.get('status'), signal['ticker'],
+                        signal.get('current_price'), signal['entry_price'],
+                        signal.get('exit_price'), signal.get('planned_amount')
+                    )
+                signals = batch
+
+            return FundAllocator.allocate(signals, total_deposit).to_dicts()
+
+        except Exception as e:
+            logger.error(f"Ошибка расчета распределения средств: {str(e)}")
+            return []
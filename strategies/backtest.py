@@ -0,0 +1,274 @@
+import argparse
+import os
+from datetime import datetime, date
+from strategies.allocation import FundAllocator
+from utils.fixed_point import INT64_MAX, SCALE, div_units_array
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+# Имена колонок истории: время открытия свечи в мс и цены OHLC
+TIME_COLUMNS = ("open_time", "time", "timestamp")
+PRICE_COLUMNS = ("open", "high", "low", "close")
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d.%m.%Y %H:%M", "%d.%m.%Y")
+
+
+def _numpy():
+    # NumPy нужен только для бэктеста, основной конвейер его не импортирует
+    import numpy
+    return numpy
+
+
+def load_history(path):
+    """Свечи из CSV или Parquet: словарь массивов time (мс), open, high, low, close"""
+    np = _numpy()
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+        names = [name.lower() for name in table.column_names]
+        time_name = table.column_names[names.index(next(n for n in TIME_COLUMNS if n in names))]
+        history = {"time": table.column(time_name).to_numpy().astype(np.int64)}
+        for column in PRICE_COLUMNS:
+            history[column] = table.column(table.column_names[names.index(column)]).to_numpy().astype(np.float64)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            header = [name.strip().lower() for name in f.readline().split(",")]
+        time_index = header.index(next(n for n in TIME_COLUMNS if n in header))
+        usecols = [time_index] + [header.index(column) for column in PRICE_COLUMNS]
+        data = np.loadtxt(path, delimiter=",", skiprows=1, usecols=usecols, ndmin=2)
+        history = {"time": data[:, 0].astype(np.int64)}
+        for i, column in enumerate(PRICE_COLUMNS, start=1):
+            history[column] = data[:, i]
+
+    order = np.argsort(history["time"], kind="stable")
+    if (order != np.arange(len(order))).any():
+        history = {key: values[order] for key, values in history.items()}
+    return history
+
+
+def load_history_dir(directory, symbols):
+    """История по символам из файлов <SYMBOL>.parquet или <SYMBOL>.csv"""
+    histories = {}
+    for symbol in symbols:
+        for extension in (".parquet", ".csv"):
+            path = os.path.join(directory, symbol + extension)
+            if os.path.exists(path):
+                histories[symbol] = load_history(path)
+                break
+        else:
+            logger.warning(f"Нет истории для {symbol} в {directory}")
+    return histories
+
+
+def _block_minima(values):
+    """Минимумы блоков по BACKTEST_BLOCK_SIZE значений"""
+    np = _numpy()
+    size = config.BACKTEST_BLOCK_SIZE
+    padded = np.full(-(-len(values) // size) * size, np.inf)
+    padded[:len(values)] = values
+    return padded.reshape(-1, size).min(axis=1)
+
+
+def _first_at_or_below(values, minima, start, threshold):
+    """Первый индекс >= start, где значение не выше порога, или -1.
+
+    Сначала проверяется остаток текущего блока, затем минимумы блоков,
+    и только найденный блок просматривается целиком.
+    """
+    np = _numpy()
+    size = config.BACKTEST_BLOCK_SIZE
+    if start >= len(values):
+        return -1
+    block = start // size
+    head = np.flatnonzero(values[start:(block + 1) * size] <= threshold)
+    if len(head):
+        return start + int(head[0])
+    later = np.flatnonzero(minima[block + 1:] <= threshold)
+    if not len(later):
+        return -1
+    block += 1 + int(later[0])
+    return block * size + int(np.flatnonzero(values[block * size:(block + 1) * size] <= threshold)[0])
+
+
+def signal_time_ms(value):
+    """Дата сигнала из колонки A в мс; None - сигнал действует с начала истории"""
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, date):
+        return int(datetime(value.year, value.month, value.day).timestamp() * 1000)
+    if isinstance(value, str) and value.strip():
+        for date_format in DATE_FORMATS:
+            try:
+                return int(datetime.strptime(value.strip(), date_format).timestamp() * 1000)
+            except ValueError:
+                continue
+    return None
+
+
+class Backtester:
+    """Бэктест пакета сигналов по истории свечей.
+
+    Логика исполнения та же, что у бумажной биржи: покупка по цене входа,
+    когда минимум свечи опускается до неё, продажа по цене выхода, когда
+    максимум поднимается до неё (не раньше следующей свечи после входа).
+    Моменты входа и выхода ищутся векторными операциями по минимумам блоков
+    истории, без прохода по свечам. Они не зависят от распределения средств,
+    поэтому считаются один раз, а варианты FundAllocator пересчитываются
+    только по суммам.
+    """
+
+    def __init__(self, batch, histories, symbol_filters=None):
+        np = _numpy()
+        self.batch = batch
+        self.histories = histories
+        count = len(batch)
+        # Цены и ограничения ордера в единицах 1e-8, как в SymbolFilters.prepare
+        self.entry_units = batch.column('entry_price')
+        self.exit_units = batch.column('exit_price')
+        self.step_size = np.zeros(count, dtype=np.int64)
+        self.min_qty = np.zeros(count, dtype=np.int64)
+        # Минимальная сумма ордера, пересчитанная в минимальное количество по цене входа
+        self.min_notional_qty = np.zeros(count, dtype=np.int64)
+        if symbol_filters is not None:
+            self._apply_filters(symbol_filters)
+        self.entry_price = self.entry_units / SCALE
+        self.exit_price = self.exit_units / SCALE
+
+        self.entry_index = np.full(count, -1, dtype=np.int64)
+        self.exit_index = np.full(count, -1, dtype=np.int64)
+        self.last_close = np.zeros(count)
+        self._find_triggers()
+
+    def _apply_filters(self, symbol_filters):
+        """Округление цен и ограничения количества, как у OrderExecutor"""
+        for i in range(len(self.batch)):
+            filters = symbol_filters.get(self.batch.ticker_at(i))
+            if filters is None:
+                continue
+            entry = filters.round_price("BUY", self.batch.entry_price[i])
+            self.entry_units[i] = entry
+            self.exit_units[i] = filters.round_price("SELL", self.batch.exit_price[i])
+            self.step_size[i] = filters.step_size
+            self.min_qty[i] = filters.min_qty
+            if entry > 0:
+                # price * quantity // SCALE >= min_notional  <=>  quantity >= ceil(min_notional * SCALE / price)
+                self.min_notional_qty[i] = min(-(-filters.min_notional * SCALE // entry), INT64_MAX)
+
+    def _find_triggers(self):
+        np = _numpy()
+        starts = [signal_time_ms(value) for value in self.batch.dates]
+        for code, ticker in enumerate(self.batch.tickers):
+            members = self.batch.where_ticker(ticker)
+            history = self.histories.get(ticker)
+            if not len(members) or history is None or not len(history["time"]):
+                continue
+            times = history["time"]
+            low = history["low"]
+            neg_high = -history["high"]
+            low_minima = _block_minima(low)
+            high_maxima = _block_minima(neg_high)
+            self.last_close[members] = history["close"][-1]
+
+            for i in members:
+                if self.entry_price[i] <= 0:
+                    continue
+                start = 0 if starts[i] is None else int(np.searchsorted(times, starts[i]))
+                # Вход: первая свеча от даты сигнала с минимумом не выше цены входа
+                entry = _first_at_or_below(low, low_minima, start, self.entry_price[i])
+                self.entry_index[i] = entry
+                if entry < 0 or self.exit_price[i] <= 0:
+                    continue
+                # Выход: первая свеча после входа с максимумом не ниже цены выхода
+                self.exit_index[i] = _first_at_or_below(neg_high, high_maxima, entry + 1, -self.exit_price[i])
+
+    def run(self, total_deposit, ratio_table=None, deposit_percentage=None, ticker_ratios=None, max_exposure=None):
+        """Результат одного варианта распределения средств"""
+        np = _numpy()
+        allocation = FundAllocator.allocate(
+            self.batch, total_deposit, ratio_table=ratio_table, deposit_percentage=deposit_percentage,
+            ticker_ratios=ticker_ratios, max_exposure=max_exposure
+        )
+        amounts = np.zeros(len(self.batch), dtype=np.int64)
+        amounts[np.array(allocation.indices, dtype=np.int64)] = np.array(allocation.amounts, dtype=np.int64)
+
+        # Количество в единицах 1e-8 с округлением вниз до шага, как в SymbolFilters.prepare
+        priced = self.entry_units > 0
+        try:
+            units = div_units_array(np.where(priced, amounts, 0), np.where(priced, self.entry_units, 1))
+        except OverflowError:
+            # Крошечная цена входа: количество не помещается в int64, считаем целыми Python
+            units = np.array([
+                amount * SCALE // entry if entry > 0 else 0
+                for amount, entry in zip(amounts.tolist(), self.entry_units.tolist())
+            ], dtype=object)
+        step = np.where(self.step_size > 0, self.step_size, 1)
+        units = units - units % step
+        valid = priced & (units > 0) & (units >= self.min_qty) & (units >= self.min_notional_qty)
+        quantity = np.where(valid, units, 0).astype(np.float64) / SCALE
+
+        filled = valid & (self.entry_index >= 0)
+        closed = filled & (self.exit_index >= 0)
+        exit_value = np.where(closed, self.exit_price, self.last_close)
+        pnl = np.where(filled, (exit_value - self.entry_price) * quantity, 0.0)
+        invested = float((self.entry_price * quantity)[filled].sum())
+
+        return {
+            "deposit_percentage": config.DEPOSIT_PERCENTAGE if deposit_percentage is None else deposit_percentage,
+            "signals": len(self.batch),
+            "rejected": int((~valid).sum()),
+            "filled": int(filled.sum()),
+            "closed": int(closed.sum()),
+            "invested": invested,
+            "realized_pnl": float(pnl[closed].sum()),
+            "unrealized_pnl": float(pnl[filled & ~closed].sum()),
+            "pnl": float(pnl.sum()),
+            "return_pct": float(pnl.sum()) / float(total_deposit) * 100 if total_deposit else 0.0,
+        }
+
+    def run_variants(self, total_deposit, variants):
+        """Прогон нескольких вариантов: variants - словари аргументов run()"""
+        return [self.run(total_deposit, **variant) for variant in variants]
+
+
+def main(argv=None):
+    from core.excel_manager import ExcelManager
+    from core.signal_processor import SignalProcessor
+
+    parser = argparse.ArgumentParser(description="Бэктест сигналов листа по истории свечей")
+    parser.add_argument("workbook", help="Книга Excel с листом сигналов")
+    parser.add_argument("history", help="Каталог с файлами <SYMBOL>.csv или <SYMBOL>.parquet")
+    parser.add_argument("--store", action="store_true", help="Каталог истории - HistoryStore")
+    parser.add_argument("--interval", default="1m", help="Интервал свечей HistoryStore")
+    parser.add_argument("--deposit", type=float, default=1000.0, help="Депозит в USDT")
+    parser.add_argument("--percentage", type=float, nargs="*", help="Варианты DEPOSIT_PERCENTAGE")
+    parser.add_argument("--no-filters", action="store_true", help="Без фильтров символов exchangeInfo")
+    args = parser.parse_args(argv)
+
+    batch = SignalProcessor(ExcelManager(args.workbook)).get_signal_batch()
+    if args.store:
+        from core.history_store import HistoryStore
+
+        store = HistoryStore(args.history)
+        histories = {symbol: store.history(symbol, args.interval) for symbol in batch.unique_tickers()}
+    else:
+        histories = load_history_dir(args.history, batch.unique_tickers())
+    symbol_filters = None
+    if not args.no_filters:
+        from utils.api_client import MEXCClient
+        from utils.symbol_filters import SymbolFilterCache
+
+        # Публичный exchangeInfo или кэш на диске, ключи API не нужны
+        symbol_filters = SymbolFilterCache(MEXCClient(api_key="", secret_key=""))
+    backtester = Backtester(batch, histories, symbol_filters=symbol_filters)
+    variants = [{"deposit_percentage": value} for value in args.percentage or [config.DEPOSIT_PERCENTAGE]]
+    for result in backtester.run_variants(args.deposit, variants):
+        logger.info(
+            f"Доля {result['deposit_percentage']}: вошло {result['filled']}/{result['signals']}, "
+            f"закрыто {result['closed']}, PnL {result['pnl']:.2f} USDT ({result['return_pct']:.2f}%)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import pytest
+
+from core.account_state import AccountState
+from utils.exceptions import InsufficientBalanceError
+from utils.fixed_point import FixedPoint
+
+
+class FakeAPI:
+    def __init__(self, free="100", locked="0"):
+        self.balances = {"USDT": {"free": free, "locked": locked}}
+        self.loads = 0
+
+    def get_account_balance(self):
+        self.loads += 1
+        return {asset: dict(values) for asset, values in self.balances.items()}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_account(free="100"):
+    api = FakeAPI(free)
+    clock = Clock()
+    account = AccountState(api, reconcile_interval=300, clock=clock)
+    account.load()
+    return account, api, clock
+
+
+def test_reserve_reduces_available_and_rejects_overdraft():
+    account, _, _ = make_account("100")
+    account.reserve(7, "USDT", "60")
+    assert account.available() == FixedPoint.from_value("40")
+    with pytest.raises(InsufficientBalanceError):
+        account.reserve(8, "USDT", "40.00000001")
+    account.reserve(8, "USDT", "40")
+    assert account.available() == 0
+
+
+def test_release_returns_reserved_funds():
+    account, _, _ = make_account("100")
+    account.reserve(7, "USDT", "60")
+    account.release(7)
+    account.release(7)
+    assert account.available() == FixedPoint.from_value("100")
+
+
+def test_commit_moves_reserve_to_locked_once():
+    account, _, _ = make_account("100")
+    account.reserve(7, "USDT", "60")
+    account.commit(7)
+    account.commit(7)
+    assert account.available() == FixedPoint.from_value("40")
+    assert account.get_balances()["USDT"] == {"free": "40.00000000", "locked": "60.00000000"}
+
+
+def test_reservations_survive_reconcile():
+    account, api, clock = make_account("100")
+    account.reserve(7, "USDT", "30")
+    api.balances["USDT"]["free"] = "90"
+    clock.now = 299
+    assert account.available() == FixedPoint.from_value("70")
+    assert api.loads == 1
+    clock.now = 300
+    assert account.available() == FixedPoint.from_value("60")
+    assert api.loads == 2
+
+
+def test_stream_update_replaces_balance():
+    account, _, _ = make_account("100")
+    account.handle_stream_message({"c": "spot@private.account.v3.api", "d": {"a": "USDT", "f": "55.5", "l": "4.5"}})
+    assert account.available() == FixedPoint.from_value("55.5")
+    assert account.get_balances()["USDT"]["locked"] == "4.50000000"
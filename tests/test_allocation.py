@@ -0,0 +1,55 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+
+from core.signal_batch import SignalBatch
+from strategies.allocation import FundAllocator
+from utils.fixed_point import to_units
+
+RATIOS = {1: [1], 2: [0.5, 0.5], 3: [0.2, 0.3, 0.5]}
+
+
+def make_batch(tickers):
+    batch = SignalBatch()
+    for i, ticker in enumerate(tickers):
+        batch.append(6 + i, None, "в работе", ticker, 1, 1, 2, 0)
+    return batch
+
+
+def quantize(value):
+    return to_units(value.quantize(Decimal("0.00000001"), rounding=ROUND_HALF_EVEN))
+
+
+def test_groups_by_ticker_in_order_of_first_row():
+    batch = make_batch(["A", "B", "A", "C", "B", "A"])
+    result = FundAllocator.allocate(batch, 1000, ratio_table=RATIOS, ticker_ratios={}, deposit_percentage=0.1)
+    assert result.indices == [0, 2, 5, 1, 4, 3]
+    assert list(result.rows) == [6, 8, 11, 7, 10, 9]
+    assert result.amounts_as_floats() == [20, 30, 50, 50, 50, 100]
+
+
+def test_amounts_round_half_even_like_decimal():
+    batch = make_batch(["A", "A", "A"])
+    deposit = Decimal("123.45678917")
+    result = FundAllocator.allocate(batch, deposit, ratio_table=RATIOS, ticker_ratios={}, deposit_percentage=0.1)
+    base = (deposit * Decimal("0.1")).quantize(Decimal("0.00000001"), rounding=ROUND_HALF_EVEN)
+    assert list(result.amounts) == [quantize(base * Decimal(ratio)) for ratio in ("0.2", "0.3", "0.5")]
+
+
+def test_groups_outside_table_split_equally_and_overrides_apply_by_size():
+    batch = make_batch(["A"] * 4 + ["B", "B"])
+    result = FundAllocator.allocate(
+        batch, 1000, ratio_table=RATIOS, ticker_ratios={"B": {2: [0.4, 0.6]}, "A": {3: [1, 0, 0]}},
+        deposit_percentage=0.1
+    )
+    assert result.amounts_as_floats() == [25, 25, 25, 25, 40, 60]
+
+
+def test_exposure_cap_scales_amounts():
+    batch = make_batch(["A", "B", "C", "D"])
+    result = FundAllocator.allocate(
+        batch, 1000, ratio_table=RATIOS, ticker_ratios={}, deposit_percentage=0.1, max_exposure=0.2
+    )
+    assert result.amounts_as_floats() == [50, 50, 50, 50]
+
+
+def test_empty_batch():
+    assert len(FundAllocator.allocate(SignalBatch(), 1000)) == 0
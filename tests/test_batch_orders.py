@@ -0,0 +1,46 @@
+import json
+
+import config
+from utils.api_client import MEXCClient
+from utils.exceptions import APIError
+
+
+def make_client(monkeypatch, respond):
+    client = MEXCClient(api_key="key", secret_key="secret")
+    calls = []
+
+    def request(method, path, params=None, signed=False):
+        batch = json.loads(params["batchOrders"])
+        calls.append(batch)
+        return respond(batch)
+
+    monkeypatch.setattr(client, "_request", request)
+    monkeypatch.setattr(config, "BATCH_ORDER_MAX_SIZE", 2)
+    return client, calls
+
+
+def order(symbol, price):
+    return {"symbol": symbol, "side": "BUY", "type": "LIMIT", "quantity": "1", "price": price, "newClientOrderId": None}
+
+
+def test_orders_are_grouped_by_symbol_and_chunked(monkeypatch):
+    client, calls = make_client(monkeypatch, lambda batch: [{"orderId": item["price"]} for item in batch])
+    orders = [order("A", "1"), order("B", "2"), order("A", "3"), order("A", "4")]
+    results = client.place_batch_orders(orders)
+    assert [[item["price"] for item in batch] for batch in calls] == [["1", "3"], ["4"], ["2"]]
+    assert all("newClientOrderId" not in item for batch in calls for item in batch)
+    assert [result["result"]["orderId"] for result in results] == ["1", "2", "3", "4"]
+
+
+def test_errors_stay_with_their_orders(monkeypatch):
+    def respond(batch):
+        if batch[0]["symbol"] == "B":
+            raise APIError("сбой")
+        return [{"code": 30004, "msg": "Insufficient position"}]
+
+    client, _ = make_client(monkeypatch, respond)
+    results = client.place_batch_orders([order("A", "1"), order("A", "2"), order("B", "3")])
+    assert "30004" in str(results[0]["error"])
+    # Ответ короче пакета: ордер без ответа считается ошибкой
+    assert isinstance(results[1]["error"], APIError)
+    assert "сбой" in str(results[2]["error"])
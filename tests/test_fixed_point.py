@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from utils.fixed_point import SCALE, FixedPoint, div_round, div_units_array, format_units, from_units, to_units
+
+
+def test_to_units_rounds_half_even():
+    assert to_units("0.000000005") == 0
+    assert to_units("0.000000015") == 2
+    assert to_units("0.000000025") == 2
+    assert to_units("-0.000000015") == -2
+    assert to_units(0.1) == 10000000
+    assert to_units("1.5") == 150000000
+    assert to_units(None) == 0
+    assert to_units("") == 0
+
+
+def test_from_units_and_format_round_trip():
+    for value in ("0", "1.5", "-0.00000001", "123456.789", "92233720368.54775807"):
+        assert format_units(to_units(value)) == value
+        assert to_units(from_units(to_units(value))) == to_units(value)
+
+
+def test_div_round_ties_to_even():
+    assert div_round(5, 10) == 0
+    assert div_round(15, 10) == 2
+    assert div_round(25, 10) == 2
+    assert div_round(26, 10) == 3
+    assert div_round(-15, 10) == -2
+
+
+def test_fixed_point_arithmetic_rounds_half_even():
+    value = FixedPoint.from_value
+    assert value("0.00000001") * "0.5" == 0
+    assert value("0.00000003") * "0.5" == value("0.00000002")
+    assert value(1) / 3 == value("0.33333333")
+    assert value(2) / 3 == value("0.66666667")
+    assert value("0.1") + value("0.2") == value("0.3")
+    with pytest.raises(ZeroDivisionError):
+        value(1) / "0"
+
+
+def test_fixed_point_int_truncates_toward_zero():
+    assert int(FixedPoint.from_value("1.9")) == 1
+    assert int(FixedPoint.from_value("-1.9")) == -1
+    assert int(FixedPoint.from_value("-0.5")) == 0
+
+
+def test_div_units_array_matches_integer_division():
+    rng = random.Random(1)
+    numerator = [rng.randrange(-10 ** 14, 10 ** 14) for _ in range(1000)]
+    denominator = [rng.randrange(1, 10 ** 13) for _ in range(1000)]
+    result = div_units_array(np.array(numerator, dtype=np.int64), np.array(denominator, dtype=np.int64))
+    assert result.tolist() == [a * SCALE // b for a, b in zip(numerator, denominator)]
+
+
+def test_div_units_array_raises_when_result_overflows():
+    with pytest.raises(OverflowError):
+        div_units_array(np.array([10 ** 14], dtype=np.int64), np.array([1], dtype=np.int64))
@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from core.ledger import Ledger
+
+
+def tx(type, amount, timestamp=None, asset="USDT"):
+    record = {"type": type, "asset": asset, "amount": amount}
+    if timestamp is not None:
+        record["timestamp"] = timestamp
+    return record
+
+
+def test_balances_and_aggregates():
+    ledger = Ledger([tx("deposit", "100", 1), tx("withdrawal", "30.5", 2), tx("deposit", "1", 3, "BTC")])
+    assert ledger.balance("USDT") == Decimal("69.5")
+    assert ledger.deposits("USDT") == Decimal("100")
+    assert ledger.withdrawals("USDT") == Decimal("30.5")
+    assert ledger.total() == Decimal("70.5")
+    assert ledger.balance("ETH") == 0
+    assert sorted(ledger.assets()) == ["BTC", "USDT"]
+
+
+def test_balance_at_with_late_transaction():
+    ledger = Ledger([tx("deposit", "100", 10), tx("withdrawal", "50", 30)])
+    ledger.append(tx("deposit", "5", 20))
+    assert ledger.balance_at("USDT", 5) == 0
+    assert ledger.balance_at("USDT", 10) == Decimal("100")
+    assert ledger.balance_at("USDT", 25) == Decimal("105")
+    assert ledger.balance_at("USDT", 30) == Decimal("55")
+    assert ledger.balance("USDT") == Decimal("55")
+
+
+def test_untimestamped_transaction_goes_last():
+    ledger = Ledger([tx("deposit", "100", 1000), tx("withdrawal", "40")])
+    assert ledger.balance_at("USDT", 999) == 0
+    assert ledger.balance_at("USDT", 1000) == Decimal("60")
+
+
+def test_unknown_type_is_ignored():
+    ledger = Ledger([tx("deposit", "1", 1), tx("transfer", "5", 2)])
+    assert ledger.count == 1
+    assert ledger.balance("USDT") == Decimal("1")
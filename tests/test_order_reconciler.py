@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from core.order_reconciler import OrderReconciler
+from core.state_store import StateStore
+from utils.fixed_point import to_units
+
+
+@pytest.fixture
+def store(tmp_path):
+    state = StateStore(str(tmp_path / "state.sqlite"))
+    yield state
+    state.close()
+
+
+class FakeAPI:
+    """Открытые ордера, сделки и статусы одного символа, как их отдаёт MEXC"""
+
+    def __init__(self):
+        self.open_orders = {}
+        self.orders = {}
+        self.trades = []
+
+    def get_open_orders(self, symbol):
+        return list(self.open_orders.values())
+
+    def get_my_trades(self, symbol, start_time=None, limit=None):
+        return list(self.trades)
+
+    def get_order(self, symbol, order_id):
+        return self.orders[order_id]
+
+
+def trade(trade_id, order_id, price, qty):
+    return {"id": trade_id, "orderId": order_id, "price": price, "qty": qty, "time": int(time.time() * 1000)}
+
+
+def test_record_fill_ignores_repeated_trade(store):
+    store.record_order("1", 7, "BTCUSDT", "BUY", "LIMIT", "10", "3")
+    assert store.record_fill("1", "10", "1", trade_id="a")
+    assert not store.record_fill("1", "10", "1", trade_id="a")
+    order = store.get_order("1")
+    assert order["filled_units"] == to_units("1")
+    assert order["status"] == "PARTIALLY_FILLED"
+
+
+def test_record_fill_is_capped_at_order_quantity(store):
+    store.record_order("1", 7, "BTCUSDT", "BUY", "LIMIT", "10", "3")
+    assert store.record_fill("1", "10", "5", trade_id="a")
+    assert not store.record_fill("1", "10", "1", trade_id="b")
+    order = store.get_order("1")
+    assert order["filled_units"] == to_units("3")
+    assert order["status"] == "FILLED"
+    assert store.row_states([7])[7]["fill"]["quantity_units"] == to_units("3")
+
+
+def test_record_fill_keeps_terminal_status(store):
+    store.record_order("1", 7, "BTCUSDT", "BUY", "LIMIT", "10", "3")
+    store.update_order_status("1", "CANCELED")
+    assert store.record_fill("1", "10", "1")
+    order = store.get_order("1")
+    assert order["status"] == "CANCELED"
+    assert order["filled_units"] == to_units("1")
+
+
+def test_trade_replaces_catch_up_fill(store):
+    store.record_order("1", 7, "BTCUSDT", "BUY", "LIMIT", "10", "3")
+    assert store.record_fill("1", "10", "2")
+    assert not store.record_fill("1", "9.5", "1.5", trade_id="a")
+    assert store.record_fill("1", "9", "1", trade_id="b")
+    assert store.get_order("1")["filled_units"] == to_units("2.5")
+    fill = store.row_states([7])[7]["fill"]
+    assert fill["quantity_units"] == to_units("2.5")
+    # 1.5 по 9.5 из сделки a, 0.5 по 10 из догоняющей записи заменены сделкой b по 9
+    assert fill["cost_units"] == to_units("14.25") + to_units("9")
+
+
+def test_reconcile_is_idempotent_when_trades_arrive_late(store):
+    store.record_order("1", 7, "BTCUSDT", "BUY", "LIMIT", "10", "3")
+    api = FakeAPI()
+    api.open_orders["1"] = {"orderId": "1", "status": "PARTIALLY_FILLED", "executedQty": "1",
+                            "cummulativeQuoteQty": "10"}
+    reconciler = OrderReconciler(api, store)
+
+    # Сделка ещё не видна в myTrades: исполнение догоняется по executedQty
+    assert reconciler.reconcile().get("fills") == 1
+    assert store.get_order("1")["filled_units"] == to_units("1")
+
+    # Сделка появилась: она заменяет догоняющую запись, а не добавляется к ней
+    api.trades = [trade(11, "1", "10", "1")]
+    assert not reconciler.reconcile().get("fills")
+    assert store.get_order("1")["filled_units"] == to_units("1")
+
+    # Ордер исполнен и пропал из открытых
+    api.trades.append(trade(12, "1", "10", "2"))
+    api.open_orders.clear()
+    api.orders["1"] = {"orderId": "1", "status": "FILLED", "executedQty": "3", "cummulativeQuoteQty": "30"}
+    assert reconciler.reconcile().get("fills") == 1
+    assert not reconciler.reconcile().get("fills")
+    order = store.get_order("1")
+    assert order["filled_units"] == to_units("3")
+    assert order["status"] == "FILLED"
+    assert store.open_orders() == []
+
+
+def test_reconcile_records_cancel(store):
+    store.record_order("1", 7, "BTCUSDT", "BUY", "LIMIT", "10", "3")
+    api = FakeAPI()
+    api.orders["1"] = {"orderId": "1", "status": "PARTIALLY_CANCELED", "executedQty": "1", "cummulativeQuoteQty": "10"}
+    summary = OrderReconciler(api, store).reconcile()
+    assert summary["cancelled"] == 1
+    order = store.get_order("1")
+    assert order["status"] == "PARTIALLY_CANCELED"
+    assert order["filled_units"] == to_units("1")
+    assert store.rows_with_order("BUY") == {7}
@@ -0,0 +1,46 @@
+from core.paper_exchange import PaperExchange
+
+
+def test_orders_fill_when_price_crosses():
+    fills = []
+    paper = PaperExchange(on_fill=fills.append)
+    paper.place_order("BTCUSDT", "BUY", "LIMIT", "0.5", "100", row=6)
+    paper.place_order("BTCUSDT", "SELL", "LIMIT", "0.5", "120", row=7)
+    assert paper.on_price("BTCUSDT", "101") == []
+    assert [fill["row"] for fill in paper.on_price("BTCUSDT", "100")] == [6]
+    assert [fill["row"] for fill in paper.on_price("BTCUSDT", "125")] == [7]
+    assert [(fill["side"], fill["price"], fill["quantity"]) for fill in fills] == [
+        ("BUY", "100", "0.5"), ("SELL", "120", "0.5")
+    ]
+    assert paper.open_orders() == []
+
+
+def test_order_crossed_on_placement_fills_at_once():
+    fills = []
+    paper = PaperExchange(on_fill=fills.append)
+    paper.on_price("BTCUSDT", "90")
+    paper.place_order("BTCUSDT", "BUY", "LIMIT", "1", "100")
+    assert len(fills) == 1
+
+
+def test_same_row_replaces_order_and_cancel():
+    paper = PaperExchange()
+    first = paper.place_order("BTCUSDT", "BUY", "LIMIT", "1", "100", row=6)["orderId"]
+    second = paper.place_order("BTCUSDT", "BUY", "LIMIT", "1", "99", row=6)["orderId"]
+    assert [order["orderId"] for order in paper.open_orders()] == [second]
+    assert not paper.cancel_order(first)
+    assert paper.cancel_order(second)
+    assert paper.on_price("BTCUSDT", "1") == []
+
+
+def test_restore_places_remaining_quantity_and_continues_ids():
+    paper = PaperExchange()
+    restored = paper.restore([
+        {"order_id": "PAPER_5", "symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "row": 6,
+         "price_units": 100 * 10 ** 8, "quantity_units": 3 * 10 ** 8, "filled_units": 10 ** 8},
+        {"order_id": "12345", "symbol": "BTCUSDT", "side": "BUY", "type": "LIMIT", "row": 7,
+         "price_units": 100 * 10 ** 8, "quantity_units": 10 ** 8, "filled_units": 0},
+    ])
+    assert restored == 1
+    assert [(order["orderId"], order["quantity_units"]) for order in paper.open_orders()] == [("PAPER_5", 2 * 10 ** 8)]
+    assert paper.place_order("ETHUSDT", "BUY", "LIMIT", "1", "10")["orderId"] == "PAPER_6"
@@ -0,0 +1,62 @@
+import pytest
+
+from utils.rate_limiter import WeightScheduler
+
+
+class FakeTime:
+    """Часы, которые sleep двигает вперёд"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_scheduler(fake, **kwargs):
+    params = dict(capacity=100, refill_per_second=10, endpoint_capacity=100,
+                  lane_reserves={"market": 0.5}, clock=fake.clock, sleep=fake.sleep)
+    params.update(kwargs)
+    return WeightScheduler(**params)
+
+
+def test_within_budget_does_not_wait():
+    fake = FakeTime()
+    scheduler = make_scheduler(fake)
+    assert scheduler.acquire("GET", "/account") == 0
+    assert scheduler.usage["/account"] == 10
+    assert fake.sleeps == []
+
+
+def test_market_lane_keeps_reserve_for_orders():
+    fake = FakeTime()
+    scheduler = make_scheduler(fake)
+    for _ in range(25):
+        scheduler.acquire("GET", "/ticker/price")
+    assert fake.sleeps == []
+    # Рыночным данным осталось ровно на резерв: следующий запрос ждёт пополнения
+    waited = scheduler.acquire("GET", "/ticker/price")
+    assert waited == pytest.approx(0.2)
+    # Ордер берёт вес из резерва без ожидания
+    assert scheduler.acquire("POST", "/order") == 0
+
+
+def test_endpoint_bucket_limits_single_endpoint():
+    fake = FakeTime()
+    scheduler = make_scheduler(fake, capacity=1000, endpoint_capacity=20, refill_per_second=100)
+    scheduler.acquire("GET", "/myTrades")
+    scheduler.acquire("GET", "/myTrades")
+    assert scheduler.acquire("GET", "/account") == 0
+    assert scheduler.acquire("GET", "/myTrades") == pytest.approx(5.0)
+
+
+def test_rate_limited_drains_budget():
+    fake = FakeTime()
+    scheduler = make_scheduler(fake)
+    scheduler.on_rate_limited("/order")
+    assert scheduler.acquire("POST", "/order") == pytest.approx(0.1)
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+from core.signal_batch import SignalBatch
+from utils.fixed_point import SCALE
+
+
+def make_batch():
+    batch = SignalBatch()
+    batch.append(6, None, "в работе", "BTCUSDT", 1, "60000", 0, "100")
+    batch.append(7, None, "Отмена", "ETHUSDT", 1, "3000", 0, "50")
+    batch.append(8, None, "в работе", "ETHUSDT", 1, "0", 0, "50")
+    batch.append(9, None, "в работе", "PEPEUSDT", 1, "0.00000001", 0, "1000000")
+    return batch
+
+
+def test_filters_and_select():
+    batch = make_batch()
+    assert batch.where_status("в работе").tolist() == [0, 2, 3]
+    assert batch.where_status("нет такого").tolist() == []
+    assert batch.where_ticker("ETHUSDT").tolist() == [1, 2]
+    assert batch.where_ticker("XRPUSDT").tolist() == []
+    selected = batch.select(batch.where_status("в работе"))
+    assert list(selected.rows) == [6, 8, 9]
+    assert selected.statuses == ["в работе"] * 3
+    assert selected[1] == batch[2]
+    assert selected.unique_tickers() == ["BTCUSDT", "ETHUSDT", "PEPEUSDT"]
+
+
+def test_row_view():
+    signal = make_batch()[0]
+    assert signal["row"] == 6
+    assert signal["ticker"] == "BTCUSDT"
+    assert signal["entry_price"] == Decimal("60000")
+    assert signal["planned_amount"] == Decimal("100")
+
+
+def test_quantities_are_exact_python_ints():
+    batch = make_batch()
+    quantities = batch.quantities()
+    expected = [
+        planned * SCALE // entry if entry > 0 else 0
+        for planned, entry in zip(batch.planned_amount, batch.entry_price)
+    ]
+    assert quantities == expected
+    assert all(type(quantity) is int for quantity in quantities)
+    # Крошечная цена входа: количество за пределами int64
+    assert quantities[3] == 10 ** 14 * SCALE
+
+
+def test_quantities_without_overflow_stay_vectorized():
+    batch = make_batch().select([0, 1, 2])
+    assert batch.quantities() == [166666, 1666666, 0]
@@ -0,0 +1,56 @@
+import json
+import sqlite3
+
+import pytest
+
+from core.signal_sources import CsvSource, JsonlSource, SqliteSource, make_signal, open_source
+
+
+def test_make_signal_row_values():
+    assert make_signal("7", {"ticker": "BTCUSDT", "entry_price": ""}) == {
+        "row": 7, "date": None, "status": None, "ticker": "BTCUSDT", "current_price": None,
+        "entry_price": None, "exit_price": None, "planned_amount": None,
+    }
+    assert make_signal("", {})["row"] is None
+    assert make_signal("abc", {})["row"] is None
+    assert make_signal([1], {})["row"] is None
+
+
+def test_csv_reads_only_appended_complete_lines(tmp_path):
+    path = tmp_path / "signals.csv"
+    path.write_text("row,ticker,status\n7,BTCUSDT,в работе\nx,ETHUSDT,в работе\n8,XRP", encoding="utf-8")
+    source = open_source(str(path))
+    assert isinstance(source, CsvSource)
+    assert [(signal["row"], signal["ticker"]) for signal in source.poll()] == [(7, "BTCUSDT"), (None, "ETHUSDT")]
+    assert list(source.poll()) == []
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("USDT,в работе\n")
+    assert [(signal["row"], signal["ticker"]) for signal in source.poll()] == [(8, "XRPUSDT")]
+
+
+def test_jsonl_skips_broken_lines(tmp_path):
+    path = tmp_path / "signals.jsonl"
+    path.write_text(
+        json.dumps({"row": 7, "ticker": "BTCUSDT"}) + "\n{broken\n" + json.dumps({"ticker": "ETHUSDT"}) + "\n",
+        encoding="utf-8"
+    )
+    source = JsonlSource(str(path))
+    assert [(signal["row"], signal["ticker"]) for signal in source.poll()] == [(7, "BTCUSDT"), (None, "ETHUSDT")]
+
+
+def test_sqlite_reads_new_rows_after_offset(tmp_path):
+    path = str(tmp_path / "signals.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE signals (row INTEGER, ticker TEXT, status TEXT)")
+        conn.executemany("INSERT INTO signals VALUES (?, ?, ?)", [(7, "BTCUSDT", "в работе"), (8, "ETHUSDT", None)])
+    source = SqliteSource(path)
+    assert [signal["row"] for signal in source.poll()] == [7, 8]
+    assert list(source.poll()) == []
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT INTO signals VALUES (9, 'XRPUSDT', 'в работе')")
+    assert [signal["ticker"] for signal in source.poll()] == ["XRPUSDT"]
+
+
+def test_unknown_extension():
+    with pytest.raises(ValueError):
+        open_source("signals.txt")
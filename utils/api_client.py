@@ -1,95 +1,313 @@
-import requests
-import hmac
-import hashlib
-import time
-import json
-from urllib.parse import urlencode
-from utils.logger import setup_logger
-import config
-
-logger = setup_logger()
-
-class MEXCClient:
-    def __init__(self):
-        self.base_url = "https://api.mexc.com/api/v3"
-        self._load_api_keys()
-    
-    def _load_api_keys(self):
-        """Загрузка API ключей"""
-        try:
-            from utils.crypto_utils import decrypt_keys
-            keys = decrypt_keys()
-            self.api_key = keys["api_key"]
-            self.secret_key = keys["secret_key"]
-        except Exception as e:
-            logger.error(f"Ошибка загрузки API ключей: {str(e)}")
-            raise
-
-    def _sign_request(self, params):
-        """Подпись запроса"""
-        params["timestamp"] = int(time.time() * 1000)
-        query_string = urlencode(sorted(params.items()))
-        signature = hmac.new(
-            self.secret_key.encode(),
-            query_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        params["signature"] = signature
-        return params
-
-    def get_account_balance(self):
-        """Получение баланса с правильной обработкой структуры MEXC API v3"""
-        try:
-            params = self._sign_request({})
-            response = requests.get(
-                f"{self.base_url}/account",
-                params=params,
-                headers={"X-MEXC-APIKEY": self.api_key},
-                timeout=config.API_TIMEOUT
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Правильная обработка структуры MEXC API v3
-            if not isinstance(data, dict) or 'balances' not in data:
-                logger.error("Некорректный формат ответа от API")
-                return {}
-                
-            # Преобразуем список балансов в словарь
-            balances = {}
-            for item in data['balances']:
-                if isinstance(item, dict) and 'asset' in item:
-                    balances[item['asset']] = {
-                        'free': item.get('free', '0'),
-                        'locked': item.get('locked', '0')
-                    }
-            return balances
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения баланса: {str(e)}")
-            return {}
-
-    def get_prices(self, symbols):
-        """Получение текущих цен для списка символов"""
-        try:
-            if not symbols:
-                return {}
-
-            params = {"symbols": json.dumps(symbols)}
-            response = requests.get(
-                f"{self.base_url}/ticker/price",
-                params=params,
-                timeout=config.API_TIMEOUT
-            )
-            response.raise_for_status()
-            
-            # Преобразуем ответ в удобный формат
-            prices = {}
-            for item in response.json():
-                if isinstance(item, dict) and "symbol" in item and "price" in item:
-                    prices[item["symbol"]] = float(item["price"])
-            return prices
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения цен: {str(e)}")
-            return {}
\ No newline at end of file
+import requests
+from requests.adapters import HTTPAdapter
+import hmac
+import hashlib
+import random
+import time
+import json
+from collections import defaultdict, deque
+from urllib.parse import urlencode
+from utils.logger import setup_logger
+from utils.exceptions import APIError
+from utils.metrics import metrics
+from utils.price_cache import price_cache as shared_price_cache
+from utils.rate_limiter import WeightScheduler
+import config
+
+logger = setup_logger()
+
+# Коды ответа, после которых запрос имеет смысл повторить
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Методы, повтор которых не создаст дубликат на бирже
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+
+class MEXCClient:
+    def __init__(self, price_cache=None, base_url=None, api_key=None, secret_key=None,
+                 pool_size=None, max_retries=None, scheduler=None, api_keys_path=None, key_path=None):
+        self.base_url = base_url or config.API_BASE_URL
+        self.price_cache = price_cache or shared_price_cache
+        self.max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.scheduler = scheduler or WeightScheduler()
+        self.session = self._create_session(pool_size or config.HTTP_POOL_SIZE)
+        self.latencies = defaultdict(lambda: deque(maxlen=config.LATENCY_HISTORY_SIZE))
+        if api_key is not None and secret_key is not None:
+            self.api_key = api_key
+            self.secret_key = secret_key
+        else:
+            self._load_api_keys(api_keys_path, key_path)
+
+    @staticmethod
+    def _create_session(pool_size):
+        """Создание сессии с пулом постоянных соединений"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _load_api_keys(self, api_keys_path=None, key_path=None):
+        """Загрузка API ключей"""
+        try:
+            from utils.crypto_utils import decrypt_keys
+            keys = decrypt_keys(api_keys_path, key_path)
+            self.api_key = keys["api_key"]
+            self.secret_key = keys["secret_key"]
+        except Exception as e:
+            logger.error(f"Ошибка загрузки API ключей: {str(e)}")
+            raise
+
+    def _sign_request(self, params):
+        """Подпись запроса"""
+        params["timestamp"] = int(time.time() * 1000)
+        query_string = urlencode(sorted(params.items()))
+        signature = hmac.new(
+            self.secret_key.encode(),
+            query_string.encode(),
+            hashlib.sha256
+        ).hexdigest()
+        params["signature"] = signature
+        return params
+
+    def _backoff_delay(self, attempt, response=None):
+        """Пауза перед повтором: Retry-After или экспонента с джиттером"""
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        delay = min(config.HTTP_BACKOFF_MAX, config.HTTP_BACKOFF_BASE * 2 ** attempt)
+        return random.uniform(0, delay)
+
+    def _request(self, method, path, params=None, signed=False):
+        """Запрос к API с повторами и замером задержки"""
+        url = f"{self.base_url}{path}"
+        headers = {"X-MEXC-APIKEY": self.api_key} if signed else None
+
+        for attempt in range(self.max_retries + 1):
+            query = dict(params or {})
+            if signed:
+                # Подпись заново на каждую попытку: timestamp должен быть свежим
+                signature = self._sign_request(query).pop("signature")
+                query = sorted(query.items()) + [("signature", signature)]
+
+            # POST повторяем только после 429: такой запрос биржа не исполнила
+            retryable = method in IDEMPOTENT_METHODS
+            # Ожидание веса по полосе приоритета до отправки запроса
+            waited = self.scheduler.acquire(method, path)
+            if waited:
+                metrics.observe("api_weight_wait_seconds", waited, endpoint=path)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method, url, params=query, headers=headers, timeout=config.API_TIMEOUT
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record_latency(path, started)
+                metrics.inc("api_errors_total", endpoint=path, reason="connection")
+                if retryable and attempt < self.max_retries:
+                    metrics.inc("api_retries_total", endpoint=path)
+                    delay = self._backoff_delay(attempt)
+                    logger.warning(f"Сбой соединения {path}: {str(e)}. Повтор через {delay:.2f} с")
+                    time.sleep(delay)
+                    continue
+                raise APIError(f"Сбой соединения {path}: {str(e)}")
+
+            self._record_latency(path, started)
+            if response.status_code >= 400:
+                metrics.inc("api_errors_total", endpoint=path, reason=str(response.status_code))
+            if response.status_code == 429:
+                self.scheduler.on_rate_limited(path)
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries and (
+                retryable or response.status_code == 429
+            ):
+                metrics.inc("api_retries_total", endpoint=path)
+                delay = self._backoff_delay(attempt, response)
+                logger.warning(f"Ответ {response.status_code} от {path}. Повтор через {delay:.2f} с")
+                time.sleep(delay)
+                continue
+
+            if response.status_code >= 400:
+                raise APIError(f"HTTP {response.status_code} от {path}: {response.text[:200]}")
+            return response.json()
+
+    def _record_latency(self, path, started):
+        """Сохраняет задержку запроса к эндпоинту"""
+        elapsed = time.perf_counter() - started
+        self.latencies[path].append(elapsed)
+        metrics.observe("api_request_seconds", elapsed, endpoint=path)
+        logger.debug(f"{path}: {elapsed * 1000:.1f} мс")
+
+    def get_latency_stats(self):
+        """Сводка задержек по эндпоинтам в миллисекундах"""
+        stats = {}
+        for path, samples in self.latencies.items():
+            if samples:
+                stats[path] = {
+                    "count": len(samples),
+                    "avg_ms": sum(samples) / len(samples) * 1000,
+                    "max_ms": max(samples) * 1000
+                }
+        return stats
+
+    def get_account_balance(self):
+        """Получение баланса с правильной обработкой структуры MEXC API v3"""
+        try:
+            data = self._request("GET", "/account", signed=True)
+            
+            # Правильная обработка структуры MEXC API v3
+            if not isinstance(data, dict) or 'balances' not in data:
+                logger.error("Некорректный формат ответа от API")
+                return {}
+                
+            # Преобразуем список балансов в словарь
+            balances = {}
+            for item in data['balances']:
+                if isinstance(item, dict) and 'asset' in item:
+                    balances[item['asset']] = {
+                        'free': item.get('free', '0'),
+                        'locked': item.get('locked', '0')
+                    }
+            return balances
+            
+        except Exception as e:
+            logger.error(f"Ошибка получения баланса: {str(e)}")
+            return {}
+
+    def get_prices(self, symbols):
+        """Получение текущих цен для списка символов из общего снимка"""
+        if not symbols:
+            return {}
+
+        snapshot = self.price_cache.get_snapshot(self.get_all_prices)
+        return {symbol: snapshot[symbol] for symbol in symbols if symbol in snapshot}
+
+    def get_all_prices(self):
+        """Получение цен всех символов одним запросом"""
+        try:
+            data = self._request("GET", "/ticker/price")
+            
+            # Преобразуем ответ в удобный формат
+            prices = {}
+            for item in data:
+                if isinstance(item, dict) and "symbol" in item and "price" in item:
+                    prices[item["symbol"]] = float(item["price"])
+            return prices
+            
+        except Exception as e:
+            logger.error(f"Ошибка получения цен: {str(e)}")
+            return {}
+
+    def get_klines(self, symbol, interval="1m", start_time=None, end_time=None, limit=None):
+        """Свечи символа: [open_time, open, high, low, close, volume, close_time, quote_volume]"""
+        params = {"symbol": symbol, "interval": interval, "limit": limit or config.HISTORY_KLINE_LIMIT}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        if end_time is not None:
+            params["endTime"] = int(end_time)
+        return self._request("GET", "/klines", params)
+
+    def sync_klines(self, store, symbol, interval="1m", start_time=None, end_time=None):
+        """Догружает в HistoryStore только закрытые свечи после последней сохранённой"""
+        from core.history_store import INTERVAL_MS
+
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        # Формирующаяся свеча не сохраняется: следующая синхронизация начнётся после неё
+        end_time = min(end_time or now, now - now % step - 1)
+        last = store.last_kline_time(symbol, interval)
+        if last is not None:
+            start_time = last + step
+        elif start_time is None:
+            start_time = end_time - config.HISTORY_SYNC_DAYS * 86400000
+
+        added = 0
+        while start_time <= end_time:
+            received = self.get_klines(symbol, interval, start_time=start_time, end_time=end_time)
+            klines = [kline for kline in received or [] if int(kline[6]) < now]
+            if not klines:
+                break
+            added += store.append_klines(symbol, interval, klines)
+            next_start = int(klines[-1][0]) + step
+            if next_start <= start_time or len(received) < config.HISTORY_KLINE_LIMIT or len(klines) < len(received):
+                break
+            start_time = next_start
+        logger.info(f"{symbol} {interval}: догружено свечей {added}")
+        return added
+
+    def get_exchange_info(self):
+        """Правила торговли всех символов"""
+        return self._request("GET", "/exchangeInfo")
+
+    def place_order(self, symbol, side, type, quantity, price=None, **params):
+        """Размещение ордера"""
+        order = {"symbol": symbol, "side": side, "type": type, "quantity": quantity}
+        if price is not None:
+            order["price"] = price
+        order.update({key: value for key, value in params.items() if value is not None})
+        return self._request("POST", "/order", params=order, signed=True)
+
+    def get_open_orders(self, symbol):
+        """Открытые ордера символа одним запросом"""
+        return self._request("GET", "/openOrders", params={"symbol": symbol}, signed=True)
+
+    def get_my_trades(self, symbol, start_time=None, limit=None):
+        """Собственные сделки символа начиная с start_time (мс)"""
+        params = {"symbol": symbol, "limit": limit or config.RECONCILE_TRADES_LIMIT}
+        if start_time is not None:
+            params["startTime"] = int(start_time)
+        return self._request("GET", "/myTrades", params=params, signed=True)
+
+    def get_order(self, symbol, order_id):
+        """Статус и исполнение одного ордера"""
+        return self._request("GET", "/order", params={"symbol": symbol, "orderId": order_id}, signed=True)
+
+    def create_listen_key(self):
+        """Ключ приватного потока событий аккаунта"""
+        return self._request("POST", "/userDataStream", signed=True)["listenKey"]
+
+    def keepalive_listen_key(self, listen_key):
+        """Продление ключа приватного потока"""
+        return self._request("PUT", "/userDataStream", params={"listenKey": listen_key}, signed=True)
+
+    def place_batch_orders(self, orders):
+        """Пакетное размещение ордеров через /batchOrders.
+
+        Биржа принимает в одном запросе до BATCH_ORDER_MAX_SIZE ордеров одного
+        символа, поэтому ордера группируются по символу и режутся на части.
+        Возвращает список результатов в порядке входных ордеров:
+        {'result': ответ} или {'error': APIError}.
+        """
+        results = [None] * len(orders)
+        by_symbol = {}
+        for position, order in enumerate(orders):
+            by_symbol.setdefault(order["symbol"], []).append(position)
+
+        size = config.BATCH_ORDER_MAX_SIZE
+        for positions in by_symbol.values():
+            for start in range(0, len(positions), size):
+                chunk = positions[start:start + size]
+                payload = [
+                    {key: value for key, value in orders[position].items() if value is not None}
+                    for position in chunk
+                ]
+                try:
+                    response = self._request(
+                        "POST", "/batchOrders",
+                        params={"batchOrders": json.dumps(payload, separators=(",", ":"))},
+                        signed=True
+                    )
+                except Exception as e:
+                    for position in chunk:
+                        results[position] = {"error": APIError(str(e))}
+                    continue
+
+                if not isinstance(response, list):
+                    response = []
+                for position, item in zip(chunk, response):
+                    if isinstance(item, dict) and item.get("code") not in (None, 0, 200):
+                        results[position] = {"error": APIError(f"{item.get('code')}: {item.get('msg')}")}
+                    else:
+                        results[position] = {"result": item}
+                for position in chunk[len(response):]:
+                    results[position] = {"error": APIError("Нет ответа по ордеру в пакете")}
+        return results
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+from utils.api_client import MEXCClient
+
+
+class AsyncMEXCClient:
+    """Асинхронная обёртка над MEXCClient с тем же набором методов запросов.
+
+    Запросы выполняются в пуле потоков поверх общей сессии MEXCClient,
+    поэтому пул соединений и повторы работают так же, как в синхронном клиенте.
+    """
+
+    def __init__(self, client=None, **client_kwargs):
+        self.client = client or MEXCClient(**client_kwargs)
+
+    async def get_account_balance(self):
+        return await asyncio.to_thread(self.client.get_account_balance)
+
+    async def get_prices(self, symbols):
+        return await asyncio.to_thread(self.client.get_prices, symbols)
+
+    async def get_all_prices(self):
+        return await asyncio.to_thread(self.client.get_all_prices)
+
+    async def get_klines(self, symbol, interval="1m", start_time=None, end_time=None, limit=None):
+        return await asyncio.to_thread(self.client.get_klines, symbol, interval, start_time, end_time, limit)
+
+    async def sync_klines(self, store, symbol, interval="1m", start_time=None, end_time=None):
+        return await asyncio.to_thread(self.client.sync_klines, store, symbol, interval, start_time, end_time)
+
+    async def get_exchange_info(self):
+        return await asyncio.to_thread(self.client.get_exchange_info)
+
+    async def place_order(self, symbol, side, type, quantity, price=None, **params):
+        return await asyncio.to_thread(
+            self.client.place_order, symbol, side, type, quantity, price, **params
+        )
+
+    async def place_batch_orders(self, orders):
+        return await asyncio.to_thread(self.client.place_batch_orders, orders)
+
+    async def get_open_orders(self, symbol):
+        return await asyncio.to_thread(self.client.get_open_orders, symbol)
+
+    async def get_my_trades(self, symbol, start_time=None, limit=None):
+        return await asyncio.to_thread(self.client.get_my_trades, symbol, start_time, limit)
+
+    async def get_order(self, symbol, order_id):
+        return await asyncio.to_thread(self.client.get_order, symbol, order_id)
+
+    async def create_listen_key(self):
+        return await asyncio.to_thread(self.client.create_listen_key)
+
+    async def keepalive_listen_key(self, listen_key):
+        return await asyncio.to_thread(self.client.keepalive_listen_key, listen_key)
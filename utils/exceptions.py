@@ -1,19 +1,23 @@
-class TradingError(Exception):
-    """Базовое исключение для торговых операций"""
-    pass
-
-class InsufficientBalanceError(TradingError):
-    """Недостаточно средств для ордера"""
-    pass
-
-class APIError(TradingError):
-    """Ошибка API запроса"""
-    pass
-
-class InvalidSignalError(TradingError):
-    """Некорректный сигнал в данных"""
-    pass
-
-class ExcelFormatError(TradingError):
-    """Ошибка формата Excel файла"""
-    pass
\ No newline at end of file
+class TradingError(Exception):
+    """Базовое исключение для торговых операций"""
+    pass
+
+class InsufficientBalanceError(TradingError):
+    """Недостаточно средств для ордера"""
+    pass
+
+class APIError(TradingError):
+    """Ошибка API запроса"""
+    pass
+
+class InvalidSignalError(TradingError):
+    """Некорректный сигнал в данных"""
+    pass
+
+class ExcelFormatError(TradingError):
+    """Ошибка формата Excel файла"""
+    pass
+
+class OrderValidationError(TradingError):
+    """Ордер не проходит фильтры символа биржи"""
+    pass
@@ -0,0 +1,169 @@
+from array import array
+from decimal import Decimal, ROUND_HALF_EVEN, localcontext
+from functools import total_ordering
+import config
+
+PRECISION = config.DECIMAL_PRECISION  # Знаков после запятой
+SCALE = 10 ** PRECISION  # Единиц в 1.0
+# До этого порога float переводится напрямую без потери последнего знака
+FLOAT_FAST_LIMIT = 10 ** 6
+INT64_MAX = 2 ** 63 - 1
+
+
+def to_units(value):
+    """Переводит число в целые единицы 1e-8 с банковским округлением"""
+    if value is None or value == "":
+        return 0
+    if isinstance(value, int):
+        return value * SCALE
+    if isinstance(value, float) and abs(value) < FLOAT_FAST_LIMIT:
+        return round(value * SCALE)
+    if isinstance(value, str):
+        units = _parse_plain_decimal(value)
+        if units is not None:
+            return units
+    with localcontext() as ctx:
+        # Точность с запасом: глобальный контекст может быть урезан
+        ctx.prec = 50
+        return int((Decimal(str(value)) * SCALE).to_integral_value(ROUND_HALF_EVEN))
+
+
+def _parse_plain_decimal(text):
+    """Быстрый разбор строки вида '-123.456' без Decimal; None для прочих форматов"""
+    body = text.strip()
+    negative = body.startswith('-')
+    body = body.lstrip('+-')
+    whole, _, fraction = body.partition('.')
+    if not (whole or fraction) or len(fraction) > PRECISION:
+        return None
+    for part in (whole, fraction):
+        if part and not (part.isascii() and part.isdigit()):
+            return None
+    units = int(whole or 0) * SCALE + int(fraction.ljust(PRECISION, '0'))
+    return -units if negative else units
+
+
+def from_units(units):
+    """Переводит целые единицы обратно в Decimal с 8 знаками (точно, без контекста)"""
+    sign = 1 if units < 0 else 0
+    return Decimal((sign, tuple(int(digit) for digit in str(abs(units))), -PRECISION))
+
+
+def format_units(units):
+    """Строка без экспоненты и лишних нулей: 150000000 -> '1.5'"""
+    text = f"{from_units(units):f}"
+    return text.rstrip('0').rstrip('.') if '.' in text else text
+
+
+def units_array(values):
+    """Пакетный перевод значений в массив int64 единиц"""
+    return array('q', (to_units(value) for value in values))
+
+
+def div_round(numerator, denominator):
+    """Целочисленное деление с банковским округлением"""
+    quotient, remainder = divmod(numerator, denominator)
+    doubled = 2 * remainder
+    if doubled > denominator or (doubled == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def div_units_array(numerator, denominator):
+    """numerator * SCALE // denominator для массивов int64 NumPy (делитель положителен).
+
+    Делится столбиком по одному знаку, поэтому промежуточные произведения не
+    выходят за пределы int64; OverflowError, если в них не помещается результат.
+    """
+    quotient, remainder = divmod(numerator, denominator)
+    if len(quotient) and (abs(quotient).max() > INT64_MAX // SCALE or denominator.max() > INT64_MAX // 10):
+        raise OverflowError("Результат деления не помещается в int64")
+    for _ in range(PRECISION):
+        digit, remainder = divmod(remainder * 10, denominator)
+        quotient = quotient * 10 + digit
+    return quotient
+
+
+@total_ordering
+class FixedPoint:
+    """Денежная сумма или количество: целое число единиц 1e-8.
+
+    Сложение и сравнение точные, умножение и деление округляются до 1e-8
+    по-банковски. Перевод в Decimal/float и обратно - только на границах
+    с API и Excel.
+    """
+
+    __slots__ = ('units',)
+
+    def __init__(self, units=0):
+        self.units = int(units)
+
+    @classmethod
+    def from_value(cls, value):
+        if isinstance(value, FixedPoint):
+            return value
+        return cls(to_units(value))
+
+    def to_decimal(self):
+        return from_units(self.units)
+
+    def __float__(self):
+        return self.units / SCALE
+
+    def __int__(self):
+        # Целочисленное деление: float теряет точность на больших суммах
+        whole = abs(self.units) // SCALE
+        return whole if self.units >= 0 else -whole
+
+    def __add__(self, other):
+        return FixedPoint(self.units + FixedPoint.from_value(other).units)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return FixedPoint(self.units - FixedPoint.from_value(other).units)
+
+    def __rsub__(self, other):
+        return FixedPoint(FixedPoint.from_value(other).units - self.units)
+
+    def __neg__(self):
+        return FixedPoint(-self.units)
+
+    def __abs__(self):
+        return FixedPoint(abs(self.units))
+
+    def __mul__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return FixedPoint(self.units * other)
+        return FixedPoint(div_round(self.units * FixedPoint.from_value(other).units, SCALE))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, int) and not isinstance(other, bool):
+            return FixedPoint(div_round(self.units, other))
+        divisor = FixedPoint.from_value(other).units
+        if divisor == 0:
+            raise ZeroDivisionError("Деление на ноль")
+        return FixedPoint(div_round(self.units * SCALE, divisor))
+
+    def __eq__(self, other):
+        try:
+            return self.units == FixedPoint.from_value(other).units
+        except (TypeError, ValueError, ArithmeticError):
+            return NotImplemented
+
+    def __lt__(self, other):
+        return self.units < FixedPoint.from_value(other).units
+
+    def __hash__(self):
+        return hash(self.units)
+
+    def __bool__(self):
+        return self.units != 0
+
+    def __str__(self):
+        return f"{self.to_decimal():f}"
+
+    def __repr__(self):
+        return f"FixedPoint('{self}')"
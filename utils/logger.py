@@ -1,17 +1,130 @@
-import logging
-from datetime import datetime
-import os
-
-def setup_logger():
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(f'logs/trading_{datetime.now().strftime("%Y%m%d")}.log'),
-            logging.StreamHandler()
-        ]
-    )
-    return logging.getLogger('trading_bot')
\ No newline at end of file
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import config
+
+LOGGER_NAME = 'trading_bot'
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_lock = threading.Lock()
+_listener = None
+_configured_pid = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Запись лога одной строкой JSON; трассировка исключения уже в message (QueueHandler.prepare)"""
+
+    def format(self, record):
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        return json.dumps(data, ensure_ascii=False)
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """Ограничивает DEBUG-сообщения из одного места кода (построчные циклы).
+
+    Пропускает не больше rate сообщений в секунду с каждой строки исходника;
+    о пропущенных сообщает следующее пропущенное в лог сообщение.
+    """
+
+    def __init__(self, rate=None, clock=time.monotonic):
+        super().__init__()
+        self.rate = config.LOG_DEBUG_RATE if rate is None else rate
+        self._clock = clock
+        self._sites = {}
+
+    def filter(self, record):
+        if record.levelno != logging.DEBUG or not self.rate:
+            return True
+        site = (record.pathname, record.lineno)
+        now = self._clock()
+        window, passed, dropped = self._sites.get(site, (now, 0, 0))
+        if now - window >= 1.0:
+            window, passed = now, 0
+        if passed >= self.rate:
+            self._sites[site] = (window, passed, dropped + 1)
+            return False
+        if dropped:
+            record.msg = f"{record.msg} (пропущено похожих: {dropped})"
+        self._sites[site] = (window, passed + 1, 0)
+        return True
+
+
+def _handlers():
+    os.makedirs(config.LOG_DIR, exist_ok=True)
+    day = datetime.now().strftime("%Y%m%d")
+    text = logging.Formatter(TEXT_FORMAT)
+    handlers = [
+        logging.FileHandler(os.path.join(config.LOG_DIR, f"trading_{day}.log"), encoding="utf-8"),
+        logging.StreamHandler(),
+    ]
+    for handler in handlers:
+        handler.setFormatter(text)
+    if config.LOG_JSON:
+        json_handler = logging.FileHandler(os.path.join(config.LOG_DIR, f"trading_{day}.jsonl"), encoding="utf-8")
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+    return handlers
+
+
+def configure_logging():
+    """Единственная настройка логирования процесса.
+
+    Модули кладут записи в очередь, а файлы и консоль пишет фоновый поток
+    QueueListener, так что медленный диск не задерживает торговый поток.
+    В дочернем процессе (другой pid) настройка выполняется заново.
+    """
+    global _listener, _configured_pid
+    with _lock:
+        if _configured_pid == os.getpid():
+            return
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(DebugRateLimitFilter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(getattr(logging, config.LOG_LEVEL, logging.INFO))
+
+        _listener = logging.handlers.QueueListener(log_queue, *_handlers(), respect_handler_level=True)
+        _listener.start()
+        if _configured_pid is None:
+            atexit.register(stop_logging)
+        _configured_pid = os.getpid()
+
+
+def flush_logging():
+    """Дожидается записи накопленных сообщений (перед выходом рабочего процесса)"""
+    with _lock:
+        if _listener is not None and _configured_pid == os.getpid():
+            _listener.stop()
+            _listener.start()
+
+
+def stop_logging():
+    global _listener, _configured_pid
+    with _lock:
+        if _listener is not None and _configured_pid == os.getpid():
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _listener = None
+        _configured_pid = None
+
+
+def setup_logger():
+    configure_logging()
+    return logging.getLogger(LOGGER_NAME)
@@ -0,0 +1,211 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+import config
+
+# Границы корзин гистограмм в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    """Значение метки для текстового формата Prometheus"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, как в Prometheus"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Накопленные счётчики по корзинам le, последняя - +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """Счётчики, значения и гистограммы с метками; экспорт в Prometheus или JSON"""
+
+    def __init__(self, prefix=None, clock=time.monotonic):
+        self.prefix = config.METRICS_PREFIX if prefix is None else prefix
+        self._clock = clock
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._exported_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def stage(self, name):
+        """Замер этапа конвейера: последняя длительность и гистограмма"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.set("stage_last_seconds", elapsed, stage=name)
+            self.observe("stage_seconds", elapsed, stage=name)
+
+    def drain(self):
+        """Забирает накопленные метрики для передачи в другой процесс и обнуляет реестр"""
+        with self._lock:
+            state = {
+                "counters": self.counters,
+                "gauges": self.gauges,
+                "histograms": {
+                    key: (h.buckets, h.counts, h.sum, h.count) for key, h in self.histograms.items()
+                },
+            }
+            self.counters, self.gauges, self.histograms = {}, {}, {}
+        return state
+
+    def merge(self, state):
+        """Добавляет метрики, полученные drain() в другом процессе"""
+        with self._lock:
+            for key, value in state["counters"].items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(state["gauges"])
+            for key, (buckets, counts, total, count) in state["histograms"].items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(buckets)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+
+    def cache_hit_rates(self):
+        """Доля попаданий по кэшам из счётчика cache_requests_total"""
+        totals = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                if name != "cache_requests_total":
+                    continue
+                labels = dict(labels)
+                hits, total = totals.get(labels.get("cache"), (0, 0))
+                totals[labels.get("cache")] = (hits + (value if labels.get("result") == "hit" else 0), total + value)
+        return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+    def snapshot(self):
+        """Все метрики в виде словаря для JSON"""
+        def labelled(key):
+            name, labels = key
+            return {"name": name, "labels": dict(labels)}
+
+        with self._lock:
+            data = {
+                "timestamp": time.time(),
+                "counters": [dict(labelled(key), value=value) for key, value in self.counters.items()],
+                "gauges": [dict(labelled(key), value=value) for key, value in self.gauges.items()],
+                "histograms": [
+                    dict(labelled(key), sum=h.sum, count=h.count,
+                         buckets={str(bound): count for bound, count in h.cumulative()})
+                    for key, h in self.histograms.items()
+                ],
+            }
+        data["cache_hit_rates"] = self.cache_hit_rates()
+        return data
+
+    def _name(self, name):
+        return f"{self.prefix}_{name}" if self.prefix else name
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+    def to_prometheus(self):
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        with self._lock:
+            for kind, series in (("counter", self.counters), ("gauge", self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {self._name(name)} {kind}")
+                        typed.add(name)
+                    lines.append(f"{self._name(name)}{self._labels(labels)} {value}")
+            typed = set()
+            for (name, labels), h in sorted(self.histograms.items()):
+                full = self._name(name)
+                if name not in typed:
+                    lines.append(f"# TYPE {full} histogram")
+                    typed.add(name)
+                for bound, count in h.cumulative():
+                    lines.append(f"{full}_bucket{self._labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{full}_sum{self._labels(labels)} {h.sum}")
+                lines.append(f"{full}_count{self._labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None, fmt=None):
+        """Записывает метрики в файл атомарной заменой; формат prometheus или json"""
+        fmt = fmt or config.METRICS_FORMAT
+        path = path or config.METRICS_PATH
+        if not fmt or not path:
+            return None
+        text = self.to_prometheus() if fmt == "prometheus" else json.dumps(self.snapshot(), ensure_ascii=False)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._exported_at = self._clock()
+        return path
+
+    def export_if_due(self, interval=None):
+        """Периодический экспорт в режиме демона"""
+        interval = config.METRICS_EXPORT_INTERVAL if interval is None else interval
+        if self._exported_at is None or self._clock() - self._exported_at >= interval:
+            return self.export()
+        return None
+
+
+# Общий реестр процесса
+metrics = Metrics()
@@ -0,0 +1,52 @@
+import threading
+import time
+from utils.metrics import metrics
+import config
+
+
+class PriceCache:
+    """Общий снимок цен всех символов с ограниченным временем жизни"""
+
+    def __init__(self, ttl=None, clock=time.monotonic):
+        self.ttl = config.PRICE_CACHE_TTL if ttl is None else ttl
+        self._clock = clock
+        self._prices = {}
+        self._updated_at = None
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        """Проверяет, не истекло ли время жизни снимка"""
+        return self._updated_at is not None and self._clock() - self._updated_at < self.ttl
+
+    def get_snapshot(self, loader):
+        """Возвращает снимок цен, загружая его через loader при устаревании"""
+        with self._lock:
+            fresh = self.is_fresh()
+            metrics.inc("cache_requests_total", cache="prices", result="hit" if fresh else "miss")
+            if not fresh:
+                prices = loader()
+                # Пустой ответ не затирает последний удачный снимок
+                if prices:
+                    self._prices = dict(prices)
+                    self._updated_at = self._clock()
+            return dict(self._prices)
+
+    def update(self, prices, refresh=False):
+        """Дополняет снимок внешними ценами (поток, другой процесс).
+
+        С refresh=True снимок считается свежим целиком; иначе срок жизни
+        не продлевается и остальные символы обновятся по TTL.
+        """
+        with self._lock:
+            self._prices.update(prices)
+            if refresh:
+                self._updated_at = self._clock()
+
+    def invalidate(self):
+        """Помечает снимок устаревшим"""
+        with self._lock:
+            self._updated_at = None
+
+
+# Общий кэш процесса: один запрос цен на весь запуск
+price_cache = PriceCache()
@@ -0,0 +1,150 @@
+import json
+import random
+import threading
+import time
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+class PriceStream:
+    """Потоковые цены по одному websocket-соединению в фоновом потоке.
+
+    Подписывается на сделки по каждому символу и вызывает on_price(symbol, price)
+    на каждую новую цену. Формат сообщений - JSON публичных каналов MEXC
+    (его же отдаёт локальный сервер-заглушка). При обрыве соединение
+    восстанавливается с экспоненциальной паузой.
+    """
+
+    def __init__(self, symbols, on_price, url=None):
+        self.url = url or config.PRICE_STREAM_URL
+        self.on_price = on_price
+        self._symbols = set(symbols)
+        self._subscribed = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+
+    def start(self):
+        """Запускает поток чтения"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="price-stream", daemon=True)
+        self._thread.start()
+        logger.info(f"Поток цен запущен: {len(self._symbols)} символов")
+
+    def stop(self):
+        """Останавливает поток и закрывает соединение"""
+        self._stop.set()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=config.PRICE_STREAM_PING_INTERVAL)
+            self._thread = None
+
+    def update_symbols(self, symbols):
+        """Меняет набор символов; новые подписки отправляются без переподключения"""
+        with self._lock:
+            self._symbols = set(symbols)
+        if self._ws is not None:
+            try:
+                self._subscribe(self._ws)
+            except Exception as e:
+                logger.warning(f"Ошибка обновления подписок: {str(e)}")
+
+    def _channel(self, symbol):
+        return config.PRICE_STREAM_CHANNEL.format(symbol=symbol)
+
+    def _subscribe(self, ws):
+        """Подписка на каналы, которых ещё нет, и отписка от лишних"""
+        with self._lock:
+            new = sorted(self._symbols - self._subscribed)
+            gone = sorted(self._subscribed - self._symbols)
+            self._subscribed = set(self._symbols)
+        if gone:
+            ws.send(json.dumps({"method": "UNSUBSCRIPTION", "params": [self._channel(s) for s in gone]}))
+        if new:
+            ws.send(json.dumps({"method": "SUBSCRIPTION", "params": [self._channel(s) for s in new]}))
+
+    def _run(self):
+        # Клиент websocket нужен только в режиме демона
+        import websocket
+
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                self._ws = websocket.create_connection(self.url, timeout=config.PRICE_STREAM_PING_INTERVAL)
+                with self._lock:
+                    self._subscribed = set()
+                self._subscribe(self._ws)
+                attempt = 0
+                logger.info(f"Подключено к потоку цен: {self.url}")
+
+                while not self._stop.is_set():
+                    try:
+                        message = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        # Тишина в канале: поддерживаем соединение
+                        self._ws.send(json.dumps({"method": "PING"}))
+                        continue
+                    self._handle(message)
+            except Exception as e:
+                if self._stop.is_set():
+                    break
+                delay = random.uniform(0, min(config.HTTP_BACKOFF_MAX, config.HTTP_BACKOFF_BASE * 2 ** attempt))
+                attempt += 1
+                logger.warning(f"Обрыв потока цен: {str(e)}. Переподключение через {delay:.2f} с")
+                time.sleep(delay)
+            finally:
+                if self._ws is not None:
+                    try:
+                        self._ws.close()
+                    except Exception:
+                        pass
+                    self._ws = None
+
+    def _handle(self, message):
+        """Разбор сообщения о сделках или мини-тикере"""
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(data, dict) or not isinstance(data.get("d"), dict):
+            return
+
+        payload = data["d"]
+        symbol = data.get("s") or payload.get("s")
+        if "deals" in payload and payload["deals"]:
+            price = payload["deals"][-1].get("p")
+        else:
+            price = payload.get("p")
+        if symbol and price is not None:
+            try:
+                self.on_price(symbol, float(price))
+            except Exception as e:
+                logger.error(f"Ошибка обработки цены {symbol}: {str(e)}")
+
+
+class UserDataStream(PriceStream):
+    """Приватный поток аккаунта: те же соединение и переподключение, другие каналы"""
+
+    def __init__(self, channels, on_message, url):
+        super().__init__(channels, on_price=None, url=url)
+        self.on_message = on_message
+
+    def _channel(self, channel):
+        return channel
+
+    def _handle(self, message):
+        try:
+            data = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        try:
+            self.on_message(data)
+        except Exception as e:
+            logger.error(f"Ошибка обработки события аккаунта: {str(e)}")
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import Counter
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+# Полосы приоритета, от высшего к низшему
+LANES = ("orders", "cancels", "account", "market")
+
+# (метод, эндпоинт) -> (полоса, вес запроса)
+ENDPOINT_RULES = {
+    ("POST", "/order"): ("orders", 1),
+    ("POST", "/batchOrders"): ("orders", 1),
+    ("DELETE", "/order"): ("cancels", 1),
+    ("DELETE", "/openOrders"): ("cancels", 1),
+    ("GET", "/account"): ("account", 10),
+    ("GET", "/openOrders"): ("account", 3),
+    ("GET", "/order"): ("account", 2),
+    ("GET", "/myTrades"): ("account", 10),
+    ("POST", "/userDataStream"): ("account", 1),
+    ("PUT", "/userDataStream"): ("account", 1),
+    ("GET", "/ticker/price"): ("market", 2),
+    ("GET", "/exchangeInfo"): ("market", 10),
+    ("GET", "/klines"): ("market", 1),
+}
+
+
+class TokenBucket:
+    """Ведро токенов с равномерным пополнением"""
+
+    def __init__(self, capacity, refill_per_second, clock=time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._clock = clock
+        self.tokens = capacity
+        self._updated_at = clock()
+
+    def refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    def can_consume(self, weight, reserve=0):
+        self.refill()
+        return self.tokens - weight >= reserve
+
+    def consume(self, weight):
+        self.tokens -= weight
+
+    def time_until(self, weight, reserve=0):
+        """Секунд до момента, когда можно будет взять weight, не трогая резерв"""
+        self.refill()
+        missing = weight + reserve - self.tokens
+        return max(0.0, missing / self.refill_per_second)
+
+    def drain(self):
+        self.refill()
+        self.tokens = 0
+
+
+class WeightScheduler:
+    """Клиентский учёт веса запросов MEXC с полосами приоритета.
+
+    Каждый эндпоинт расходует своё ведро (лимит биржи на эндпоинт) и общее
+    ведро ключа/IP. В общем ведре за низшими полосами держится резерв:
+    рыночные данные могут брать токены, только пока их остаётся больше
+    резерва, а ордера - до нуля. Пока ждёт запрос высшей полосы, низшие
+    ждут за ним. Часы и sleep подменяются для тестов.
+    """
+
+    def __init__(self, capacity=None, refill_per_second=None, endpoint_capacity=None,
+                 lane_reserves=None, clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        capacity = config.API_WEIGHT_CAPACITY if capacity is None else capacity
+        refill = config.API_WEIGHT_REFILL if refill_per_second is None else refill_per_second
+        self.endpoint_capacity = config.API_ENDPOINT_WEIGHT_CAPACITY if endpoint_capacity is None else endpoint_capacity
+        self.endpoint_refill = self.endpoint_capacity * refill / capacity
+        self.bucket = TokenBucket(capacity, refill, clock)
+        self._endpoint_buckets = {}
+        reserves = config.API_LANE_RESERVES if lane_reserves is None else lane_reserves
+        self.lane_reserves = {lane: capacity * reserves.get(lane, 0) for lane in LANES}
+        self.usage = Counter()
+        self._waiting = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def classify(method, endpoint):
+        """Полоса и вес запроса; неизвестные считаются рыночными данными"""
+        return ENDPOINT_RULES.get((method, endpoint), ("market", 1))
+
+    def _endpoint_bucket(self, endpoint):
+        bucket = self._endpoint_buckets.get(endpoint)
+        if bucket is None:
+            bucket = self._endpoint_buckets[endpoint] = TokenBucket(
+                self.endpoint_capacity, self.endpoint_refill, self._clock
+            )
+        return bucket
+
+    def _higher_waiting(self, lane):
+        return any(self._waiting[other] for other in LANES[:LANES.index(lane)])
+
+    def acquire(self, method, endpoint, lane=None, weight=None):
+        """Блокирует до появления веса; возвращает время ожидания в секундах"""
+        default_lane, default_weight = self.classify(method, endpoint)
+        lane = lane or default_lane
+        weight = default_weight if weight is None else weight
+        # Резерв не может сделать запрос невыполнимым в принципе
+        reserve = min(self.lane_reserves[lane], max(0, self.bucket.capacity - weight))
+        waited = 0.0
+        registered = False
+        try:
+            while True:
+                with self._lock:
+                    endpoint_bucket = self._endpoint_bucket(endpoint)
+                    if (not self._higher_waiting(lane)
+                            and self.bucket.can_consume(weight, reserve)
+                            and endpoint_bucket.can_consume(weight)):
+                        self.bucket.consume(weight)
+                        endpoint_bucket.consume(weight)
+                        self.usage[endpoint] += weight
+                        return waited
+                    if not registered:
+                        self._waiting[lane] += 1
+                        registered = True
+                    delay = max(
+                        self.bucket.time_until(weight, reserve),
+                        endpoint_bucket.time_until(weight),
+                        config.API_SCHEDULER_MIN_WAIT
+                    )
+                logger.debug(f"{method} {endpoint} ({lane}) ждёт вес {weight}: {delay:.3f} с")
+                self._sleep(delay)
+                waited += delay
+        finally:
+            if registered:
+                with self._lock:
+                    self._waiting[lane] -= 1
+
+    def on_rate_limited(self, endpoint=None):
+        """Ответ 429: считаем бюджет исчерпанным, чтобы не усугублять блокировку"""
+        with self._lock:
+            self.bucket.drain()
+            if endpoint is not None:
+                self._endpoint_bucket(endpoint).drain()
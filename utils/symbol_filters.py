@@ -0,0 +1,173 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from utils.exceptions import OrderValidationError
+from utils.fixed_point import SCALE, to_units, format_units
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger()
+
+
+class SymbolFilters:
+    """Ограничения символа в единицах 1e-8: шаг цены, шаг и минимум количества, минимальная сумма"""
+
+    __slots__ = ('symbol', 'tick_size', 'step_size', 'min_qty', 'min_notional')
+
+    def __init__(self, symbol, tick_size=0, step_size=0, min_qty=0, min_notional=0):
+        self.symbol = symbol
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.min_qty = min_qty
+        self.min_notional = min_notional
+
+    @classmethod
+    def from_exchange_info(cls, info):
+        """Фильтры из записи exchangeInfo: поля точности MEXC и фильтры в стиле Binance"""
+        filters = cls(info["symbol"])
+        if info.get("quotePrecision") is not None:
+            filters.tick_size = SCALE // 10 ** min(int(info["quotePrecision"]), config.DECIMAL_PRECISION)
+        if info.get("baseAssetPrecision") is not None:
+            filters.step_size = SCALE // 10 ** min(int(info["baseAssetPrecision"]), config.DECIMAL_PRECISION)
+        if info.get("baseSizePrecision"):
+            filters.min_qty = to_units(info["baseSizePrecision"])
+        if info.get("quoteAmountPrecision"):
+            filters.min_notional = to_units(info["quoteAmountPrecision"])
+
+        for item in info.get("filters") or []:
+            kind = item.get("filterType")
+            if kind == "PRICE_FILTER" and item.get("tickSize"):
+                filters.tick_size = to_units(item["tickSize"])
+            elif kind == "LOT_SIZE":
+                if item.get("stepSize"):
+                    filters.step_size = to_units(item["stepSize"])
+                if item.get("minQty"):
+                    filters.min_qty = to_units(item["minQty"])
+            elif kind in ("MIN_NOTIONAL", "NOTIONAL") and item.get("minNotional"):
+                filters.min_notional = to_units(item["minNotional"])
+        return filters
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    @staticmethod
+    def _round_down(units, step):
+        return units - units % step if step > 0 else units
+
+    @staticmethod
+    def _round_up(units, step):
+        return -SymbolFilters._round_down(-units, step) if step > 0 else units
+
+    def round_price(self, side, price_units):
+        """Цена по шагу: покупки - вниз, продажи - вверх (единицы 1e-8)"""
+        if side == "BUY":
+            return self._round_down(price_units, self.tick_size)
+        return self._round_up(price_units, self.tick_size)
+
+    def prepare(self, side, price, quantity):
+        """Округляет цену и количество и проверяет ограничения.
+
+        Цена покупки округляется вниз, продажи - вверх; количество - всегда вниз.
+        Возвращает строки без лишних нулей, готовые для API.
+        """
+        price_units = self.round_price(side, to_units(price))
+        quantity_units = self._round_down(to_units(quantity), self.step_size)
+
+        if price_units <= 0:
+            raise OrderValidationError(f"{self.symbol}: цена {price} меньше шага цены")
+        if quantity_units <= 0 or quantity_units < self.min_qty:
+            raise OrderValidationError(
+                f"{self.symbol}: количество {quantity} меньше минимального {format_units(max(self.min_qty, self.step_size))}"
+            )
+        notional = price_units * quantity_units // SCALE
+        if notional < self.min_notional:
+            raise OrderValidationError(
+                f"{self.symbol}: сумма {format_units(notional)} меньше минимальной {format_units(self.min_notional)}"
+            )
+        return format_units(price_units), format_units(quantity_units)
+
+
+class SymbolFilterCache:
+    """Кэш фильтров exchangeInfo на диске с временем жизни SYMBOL_FILTERS_TTL"""
+
+    def __init__(self, api_client, path=None, ttl=None, clock=time.time):
+        self.api = api_client
+        self.path = path or config.SYMBOL_FILTERS_PATH
+        self.ttl = config.SYMBOL_FILTERS_TTL if ttl is None else ttl
+        self._clock = clock
+        self._filters = None
+        self._fetched_at = 0
+        self._refreshed_on_miss = False
+        self._retry_at = 0
+        self._lock = threading.Lock()
+
+    def _load_from_disk(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._filters = {
+                symbol: SymbolFilters(**values) for symbol, values in data["symbols"].items()
+            }
+            self._fetched_at = data["fetched_at"]
+            logger.debug(f"Фильтры символов загружены с диска: {len(self._filters)}")
+        except (OSError, ValueError, KeyError, TypeError):
+            self._filters = None
+
+    def refresh(self):
+        """Загружает exchangeInfo и сохраняет фильтры на диск"""
+        info = self.api.get_exchange_info()
+        filters = {}
+        for item in info.get("symbols", []):
+            try:
+                filters[item["symbol"]] = SymbolFilters.from_exchange_info(item)
+            except (KeyError, ValueError, TypeError) as e:
+                logger.debug(f"Пропущен символ exchangeInfo: {str(e)}")
+        if not filters:
+            logger.warning("exchangeInfo не содержит символов, фильтры не обновлены")
+            return
+        self._filters = filters
+        self._fetched_at = self._clock()
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # Свой временный файл: процессы манифеста могут обновлять кэш одновременно
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({
+                        "fetched_at": self._fetched_at,
+                        "symbols": {symbol: rules.to_dict() for symbol, rules in filters.items()}
+                    }, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить фильтры символов: {str(e)}")
+        logger.info(f"Фильтры символов обновлены: {len(filters)}")
+
+    def get(self, symbol):
+        """Фильтры символа или None, если биржа о нём не сообщила"""
+        with self._lock:
+            if self._filters is None:
+                self._load_from_disk()
+            if self._filters is None or self._clock() - self._fetched_at >= self.ttl:
+                self._safe_refresh()
+            elif symbol not in self._filters and not self._refreshed_on_miss:
+                # Возможно, новый листинг: одно обновление на запуск
+                self._refreshed_on_miss = True
+                self._safe_refresh()
+            return (self._filters or {}).get(symbol)
+
+    def _safe_refresh(self):
+        if self._clock() < self._retry_at:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # Пока биржа недоступна, работаем по старым фильтрам без повторов на каждый ордер
+            self._retry_at = self._clock() + config.SYMBOL_FILTERS_RETRY
+            logger.warning(f"Ошибка загрузки exchangeInfo: {str(e)}")